@@ -1,7 +1,14 @@
+import datetime
 from abc import ABC, abstractmethod
+from typing import Optional
+
+from checkers.check import AbstractCheck
+from utils.timeseries_storage import StatusTimeseriesStorage
 
 
 class AbstractChecker(ABC):
+    status_storage: StatusTimeseriesStorage  # status history, set by the checkers
+
     @abstractmethod
     def store_status(self):
         pass
@@ -18,6 +25,40 @@ class AbstractChecker(ABC):
     def request_stop(self):
         pass
 
-    @abstractmethod
     def get_status_timeseries(self, time_from=None):
-        pass
+        return self.status_storage.get_status_timeseries(AbstractChecker._get_time_from(time_from))
+
+    def get_entity_timeseries(self, entity, field, time_from=None):
+        # field: path inside the status of the entity (container, service), e.g. stats.cpu_usage_percent
+        return self.status_storage.get_timeseries(entity, field, AbstractChecker._get_time_from(time_from))
+
+    def get_next_check_time(self, run_started: Optional[datetime.datetime] = None) -> Optional[datetime.datetime]:
+        # checks which have never been executed, or are overdue without having been executed
+        # in the run started at run_started, are either not applicable or blocked by something
+        # else (e.g. missing container) - they must not make the scheduler spin;
+        # a check executed in that run is already due again when the run took longer than
+        # its interval, its (past) time is returned and the scheduler applies its minimal delay
+        now = datetime.datetime.now()
+        next_time = None
+        for check in AbstractChecker._iter_checks(getattr(self, 'checks', {})):
+            if check.last_execution_time is None:
+                continue
+            check_time = check.get_next_execution_time()
+            if check_time <= now and (run_started is None or check.last_execution_time < run_started):
+                continue
+            if next_time is None or check_time < next_time:
+                next_time = check_time
+        return next_time
+
+    @staticmethod
+    def _get_time_from(time_from):
+        # the last day by default
+        return time_from if time_from is not None else datetime.datetime.now() - datetime.timedelta(days=1)
+
+    @staticmethod
+    def _iter_checks(checks):
+        for check in checks.values():
+            if isinstance(check, AbstractCheck):
+                yield check
+            elif isinstance(check, dict):
+                yield from AbstractChecker._iter_checks(check)
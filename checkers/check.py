@@ -72,6 +72,12 @@ class AbstractCheck(ABC):
         return datetime.datetime.now() - self.last_execution_time > \
                datetime.timedelta(seconds=self.check_repeat_interval)
 
+    def get_next_execution_time(self) -> datetime.datetime:
+        if self.check_repeat_interval is None or self.last_execution_time is None:
+            return datetime.datetime.now()
+
+        return self.last_execution_time + datetime.timedelta(seconds=self.check_repeat_interval)
+
     def get_last_status(self):
         return self.last_status
 
@@ -0,0 +1,98 @@
+import datetime
+import heapq
+import itertools
+import logging
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import docker.errors
+
+from checkers.abstract_checker import AbstractChecker
+from checkers.check import AbstractCheck
+
+
+class CheckScheduler:
+    MIN_DELAY = 1.0  # minimal delay between two runs of the same checker, in seconds
+    SLACK = 0.1  # added to the due time so that AbstractCheck.shall_repeat() is already true
+
+    def __init__(self, checkers: List[AbstractChecker], num_workers: int = None):
+        self.checkers = checkers
+        self.stop_flag = False
+        self.queue = []  # heap of (due time on the monotonic clock, sequence number, checker)
+        self.sequence = itertools.count()
+        self.cond = threading.Condition()
+        self.executor = ThreadPoolExecutor(
+            max_workers=num_workers if num_workers else max(1, len(checkers)),
+            thread_name_prefix="checker")
+        self.thread = threading.Thread(target=self._run, name="check-scheduler")
+
+    def start(self):
+        now = time.monotonic()
+        with self.cond:
+            for checker in self.checkers:
+                self._push(now, checker)
+        self.thread.start()
+
+    def stop(self):
+        with self.cond:
+            self.stop_flag = True
+            self.queue.clear()
+            self.cond.notify_all()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def join(self, wait_time=5.0):
+        self.thread.join(wait_time)
+
+    def _push(self, due, checker):
+        heapq.heappush(self.queue, (due, next(self.sequence), checker))
+
+    def _run(self):
+        with self.cond:
+            while not self.stop_flag:
+                if not self.queue:
+                    self.cond.wait()
+                    continue
+                due, _, checker = self.queue[0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self.cond.wait(delay)
+                    continue
+                heapq.heappop(self.queue)
+                # a checker is re-queued only when its run has finished,
+                # so the same checker never runs twice at the same time
+                self.executor.submit(self._run_checker, checker)
+
+    def _run_checker(self, checker: AbstractChecker):
+        started = time.monotonic()
+        run_started = datetime.datetime.now()
+        try:
+            checker.check()
+            checker.store_status()
+        except docker.errors.APIError as error:
+            logging.error(error)
+            traceback.print_exc()
+        except OSError as error:
+            logging.error(error)
+            traceback.print_exc()
+        # any other failure is logged as well: a checker which is not re-queued would never run again
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            logging.error(error)
+            traceback.print_exc()
+
+        next_time = checker.get_next_check_time(run_started)
+        if next_time is None:
+            delay = AbstractCheck.DEFAULT_CHECK_REPEAT_INTERVAL
+        else:
+            delay = (next_time - datetime.datetime.now()).total_seconds() + CheckScheduler.SLACK
+        due = max(time.monotonic() + delay, started + CheckScheduler.MIN_DELAY)
+
+        logging.debug(f"{checker.__class__.__name__} will run again in {due - time.monotonic():.1f}s")
+
+        with self.cond:
+            if self.stop_flag:
+                return
+            self._push(due, checker)
+            self.cond.notify_all()
@@ -1,19 +1,30 @@
 import logging
 import datetime
 import os
+import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Optional
 import re
 
 import dateutil.parser
 import docker
 import docker.errors
+import requests
 
 from alarms.alarm import AlarmSeverity, AlarmSender
 from checkers.abstract_checker import AbstractChecker
 from checkers.check import AbstractCheck, OverallStatusAccumulator
+from utils.disk_usage_cache import DiskUsageCache
 from utils.git_tools import has_diff_between_two_branches
+from utils.docker_events import DockerEventsMonitor
+from utils.container_inventory import ContainerInventory
+from utils.counter_rates import CounterRateTracker
 from utils.dockers_pool import DockersPool
+from utils.port_prober import probe_ports
+from utils.probe_manager import ProbeManager
+from utils.stats_collector import ContainerStatsCollector
+from utils.timeseries_storage import StatusTimeseriesStorage
 from utils.restart_notification_manager import RestartNotificationManager
 
 
@@ -40,41 +51,37 @@ class CheckFreeDiskSpace(AbstractCheck):
         self._report_check()
 
         docker_client = kwargs.get('docker_client')
-        local_source = kwargs.get('local_source')
+        docker_id = kwargs.get('docker_id', None)
+        local_sources = kwargs.get('local_sources')
+        disk_usage_cache: DiskUsageCache = kwargs.get('disk_usage_cache')
 
         self._update_exec_time()
 
-        if not docker_client:
+        if not docker_client or not disk_usage_cache:
             self._set_status(AbstractCheck.CheckResult.EXEC_FAILURE)
             self.status_acc.fail()
             self.last_return_value = None
             return self.last_return_value
 
         try:
-            logs = docker_client.containers.run("busybox:latest",
-                                                "df -P /dir_to_check",
-                                                remove=True,
-                                                volumes={local_source: {'bind': '/dir_to_check', 'mode': 'ro'}})
-            logs = logs.decode('utf-8').split("\n")[1]
-            logs = logs.split()
-            mount_point = logs[0]
-            total_bytes = int(logs[1]) * 1024
-            used_bytes = int(logs[2]) * 1024
-            usage_percentage = 100.0 * used_bytes / total_bytes if total_bytes > 0 else None
-            self.last_return_value = {
-                'mount_point': mount_point,
-                'total_bytes': total_bytes,
-                'used_bytes': used_bytes,
-                'usage_percentage': usage_percentage
-            }
-            if usage_percentage is not None and self.is_disk_usage_too_high(mount_point, usage_percentage):
-                logging.warning(f"{self.obj_name} disk {mount_point} usage is too high ({usage_percentage:.2f}%)")
-
+            usage = disk_usage_cache.get(docker_id, docker_client, local_sources)
+            # sources residing on the same filesystem are reported once
+            disks = list({x['mount_point']: x for x in usage.values()}.values())
+
+            too_high = []
+            for disk in disks:
+                usage_percentage = disk['usage_percentage']
+                if usage_percentage is not None and self.is_disk_usage_too_high(disk['mount_point'], usage_percentage):
+                    logging.warning(f"{self.obj_name} disk {disk['mount_point']} "
+                                    f"usage is too high ({usage_percentage:.2f}%)")
+                    too_high.append(f"{disk['mount_point']} ({usage_percentage:.2f}%)")
+
+            self.last_return_value = disks
+            if too_high:
                 self._set_status(AbstractCheck.CheckResult.NEGATIVE)
 
                 self._send_smart_alarm(
-                    f"container {self.obj_name} disk {mount_point} "
-                    f"usage is too high ({usage_percentage:.2f}%)",
+                    f"container {self.obj_name} disk usage is too high: {', '.join(too_high)}",
                     AlarmSeverity.ALARM)
 
                 self.status_acc.fail()
@@ -87,6 +94,8 @@ class CheckFreeDiskSpace(AbstractCheck):
             logging.error(f"failed to retrieve disk space: {str(error)}")
         except docker.errors.DockerException as error:
             logging.error(f"failed to retrieve disk space: {str(error)}")
+        except ValueError as error:
+            logging.error(f"failed to parse disk space: {str(error)}")
 
         self._set_status(AbstractCheck.CheckResult.EXEC_FAILURE)
         self.last_return_value = None
@@ -122,6 +131,7 @@ class CheckIfImageUpdateIsAvailable(AbstractCheck):
 
         cont = kwargs.get('container')
         cont_config = kwargs.get('cont_config')
+        image_attrs = kwargs.get('image_attrs')
 
         self._update_exec_time()
 
@@ -151,9 +161,10 @@ class CheckIfImageUpdateIsAvailable(AbstractCheck):
         docker_client = cont.client
 
         update_available = None
-        # image_tag = cont.image.tags[0]
-        # image_id = cont.image.id
-        image_attrs = cont.image.attrs
+        if image_attrs is None:
+            self._set_status(AbstractCheck.CheckResult.EXEC_FAILURE)
+            self.last_return_value = None
+            return self.last_return_value
         if len(image_attrs['RepoDigests']) == 0:
             self._set_status(AbstractCheck.CheckResult.NEGATIVE)
             self.last_return_value = False
@@ -276,31 +287,46 @@ class CheckIfRestarted(AbstractCheck):
         name = self.obj_name
         cont = kwargs.get("container")
         prev_inventory = kwargs.get("prev_inventory")
+        # restarts and OOM kills reported by the docker events stream since the previous check;
+        # None if the events of the container's host are not tracked
+        restarts: Optional[int] = kwargs.get("restarts", None)
+        ooms: int = kwargs.get("ooms", 0)
         started_at = dateutil.parser.isoparse(cont.attrs['State']['StartedAt'])
 
         self._update_exec_time()
 
-        if prev_inventory is not None:
+        restarted = restarts is not None and restarts > 0
+
+        if not restarted and prev_inventory is not None:
             if name in prev_inventory:
                 prev_cont = prev_inventory[name]
                 if prev_cont['status'] == 'running':
                     prev_started_at = dateutil.parser.isoparse(prev_cont['started_at'])
                     if prev_started_at != started_at:
-                        planned = self.restart_notification_manager.check_notification_present(
-                            name, 'container', datetime.datetime.now())
-                        severity = AlarmSeverity.INFO if planned else AlarmSeverity.ALARM
-                        planned = 'as planned' if planned else 'UNPLANNED'
+                        restarted = True
+
+        if restarted:
+            planned = self.restart_notification_manager.check_notification_present(
+                name, 'container', datetime.datetime.now())
+            severity = AlarmSeverity.INFO if planned else AlarmSeverity.ALARM
+            planned = 'as planned' if planned else 'UNPLANNED'
+
+            self._set_status(AbstractCheck.CheckResult.POSITIVE)
 
-                        self._set_status(AbstractCheck.CheckResult.POSITIVE)
+            details = ''
+            if restarts is not None and restarts > 1:
+                details += f", {restarts} times since the last check"
+            if ooms:
+                details += f", killed by OOM killer {ooms} time(s)"
 
-                        logging.warning(f"{name} restarted ({planned})")
+            logging.warning(f"{name} restarted ({planned}){details}")
 
-                        self._send_smart_alarm(f"container {name} "
-                                               f"has been restarted at {started_at} ({planned})",
-                                               severity)
-                        self.status_acc.fail()
-                        self.last_return_value = True
-                        return self.last_return_value
+            self._send_smart_alarm(f"container {name} "
+                                   f"has been restarted at {started_at} ({planned}){details}",
+                                   severity)
+            self.status_acc.fail()
+            self.last_return_value = True
+            return self.last_return_value
 
         self._set_status(AbstractCheck.CheckResult.NEGATIVE)
         self.last_return_value = False
@@ -319,34 +345,44 @@ class CheckIfContainerStatusChanged(AbstractCheck):
         name = self.obj_name
         cur_status = kwargs.get("cur_status")
         prev_inventory = kwargs.get("prev_inventory")
+        # status transitions (from, to, time) reported by the docker events stream since the previous
+        # check; None if the events of the container's host are not tracked
+        transitions = kwargs.get("transitions", None)
 
         self._update_exec_time()
 
-        if prev_inventory is not None:
-            if name in prev_inventory:
-                prev_cont = prev_inventory[name]
-                if prev_cont['status'] != cur_status:
-                    self._set_status(AbstractCheck.CheckResult.POSITIVE)
+        prev_status = None
+        seen_statuses = []
+        if transitions:
+            prev_status = transitions[0][0]
+            seen_statuses = [x[1] for x in transitions]
+        elif prev_inventory is not None and name in prev_inventory:
+            prev_status = prev_inventory[name]['status']
+            if prev_status != cur_status:
+                seen_statuses = [cur_status]
+
+        if seen_statuses:
+            self._set_status(AbstractCheck.CheckResult.POSITIVE)
 
-                    planned = self.restart_notification_manager.check_notification_present(
-                        name, 'container', datetime.datetime.now())
-                    severity = AlarmSeverity.INFO if planned else AlarmSeverity.ALARM
-                    planned = 'as planned' if planned else 'UNPLANNED'
+            planned = self.restart_notification_manager.check_notification_present(
+                name, 'container', datetime.datetime.now())
+            severity = AlarmSeverity.INFO if planned else AlarmSeverity.ALARM
+            planned = 'as planned' if planned else 'UNPLANNED'
 
-                    logging.warning(f"{name} status changed from {prev_cont['status']} to {cur_status} ({planned})")
+            # the container may have already recovered, e.g. running -> exited -> running
+            via = f" via {', '.join(seen_statuses[:-1])}" if len(seen_statuses) > 1 else ''
 
-                    if cur_status != 'running':
-                        self._send_smart_alarm(f"container {name} status "
-                                               f"changed from {prev_cont['status']} "
-                                               f"to {cur_status} ({planned})",
-                                               severity)
+            logging.warning(f"{name} status changed from {prev_status} to {cur_status}{via} ({planned})")
 
-                        self.status_acc.fail()
-                    self.last_return_value = True
-                    return self.last_return_value
-                self._set_status(AbstractCheck.CheckResult.NEGATIVE)
-                self.last_return_value = False
-                return self.last_return_value
+            if any(x != 'running' for x in seen_statuses) or cur_status != 'running':
+                self._send_smart_alarm(f"container {name} status "
+                                       f"changed from {prev_status} "
+                                       f"to {cur_status}{via} ({planned})",
+                                       severity)
+
+                self.status_acc.fail()
+            self.last_return_value = True
+            return self.last_return_value
 
         self._set_status(AbstractCheck.CheckResult.NEGATIVE)
         self.last_return_value = False
@@ -364,10 +400,11 @@ class CheckIfContainerStatusIsNotRunning(AbstractCheck):
 
         name = self.obj_name
         cur_status = kwargs.get("cur_status")
+        health = kwargs.get("health", None)
 
         self._update_exec_time()
 
-        if cur_status != 'running':
+        if cur_status != 'running' or health == 'unhealthy':
             self._set_status(AbstractCheck.CheckResult.POSITIVE)
 
             planned = self.restart_notification_manager.check_notification_present(
@@ -375,10 +412,14 @@ class CheckIfContainerStatusIsNotRunning(AbstractCheck):
             severity = AlarmSeverity.INFO if planned else AlarmSeverity.ALARM
             planned = 'as planned' if planned else 'UNPLANNED'
 
-            logging.warning(f"{name} status is not RUNNING ({cur_status}) ({planned})")
+            if cur_status != 'running':
+                message = f"status is not RUNNING ({cur_status})"
+            else:
+                message = "is running but UNHEALTHY"
+
+            logging.warning(f"{name} {message} ({planned})")
 
-            self._send_smart_alarm(f"container {name} status "
-                                   f"is not RUNNING ({cur_status}) ({planned})",
+            self._send_smart_alarm(f"container {name} {message} ({planned})",
                                    severity)
 
             self.status_acc.fail()
@@ -455,6 +496,7 @@ class CheckIfPortIsOpenInContainer(AbstractCheck):
             restart_notification_manager: RestartNotificationManager = None):
         super().__init__(obj_name, status_acc, alarm_sender, restart_notification_manager)
         self.port = port
+        self.last_latency_ms = None
 
     def do_check(self, **kwargs):
         if not self.shall_repeat():
@@ -464,46 +506,42 @@ class CheckIfPortIsOpenInContainer(AbstractCheck):
 
         self._report_check()
 
-        docker_client = kwargs.get('docker_client')
+        # results of the batched probe of all ports of the container; None if the probe failed
+        port_result: Optional[dict] = kwargs.get('port_result', None)
 
         port = self.port
         container_name = self.obj_name
 
         self._update_exec_time()
 
-        try:
-            docker_client.containers.run("busybox:latest",
-                                         f"nc -zw10 {container_name} {port}",
-                                         remove=True,
-                                         network_mode=f"container:{container_name}")
-            logging.debug(f"port {port} is open on {container_name}")
+        self.last_latency_ms = port_result['latency_ms'] if port_result else None
+        if port_result is None:
+            logging.error(f"failed to check open port {port} on {container_name}")
+            self._set_status(AbstractCheck.CheckResult.EXEC_FAILURE)
+            self.status_acc.fail()
+            self.last_return_value = False
+            return self.last_return_value
+
+        if port_result['open']:
+            logging.debug(f"port {port} is open on {container_name} ({port_result['latency_ms']} ms)")
             self._set_status(AbstractCheck.CheckResult.POSITIVE)
             self.last_return_value = True
             return self.last_return_value
-        except docker.errors.ContainerError as err:
-            if err.exit_status != 1:
-                logging.error(f"unexpected exit status: {str(err)}")
 
-            logging.debug(f"port {port} is NOT open on {container_name}")
-            self._set_status(AbstractCheck.CheckResult.NEGATIVE)
+        logging.debug(f"port {port} is NOT open on {container_name}")
+        self._set_status(AbstractCheck.CheckResult.NEGATIVE)
 
-            planned = self.restart_notification_manager.check_notification_present(
-                container_name, 'container', datetime.datetime.now())
-            severity = AlarmSeverity.INFO if planned else AlarmSeverity.ALARM
-            planned = 'as planned' if planned else 'UNPLANNED'
-            logging.warning(f"container {container_name}:{port} is DOWN ({planned})")
-            self._send_smart_alarm(f"container {container_name} "
-                                   f"is not responding on port {port} ({planned})",
-                                   severity)
-            self.status_acc.fail()
-            self.last_return_value = False
-            return self.last_return_value
-        except docker.errors.DockerException as err:
-            logging.error(f"failed to check open port: {str(err)}")
-            self._set_status(AbstractCheck.CheckResult.EXEC_FAILURE)
-            self.status_acc.fail()
-            self.last_return_value = False
-            return self.last_return_value
+        planned = self.restart_notification_manager.check_notification_present(
+            container_name, 'container', datetime.datetime.now())
+        severity = AlarmSeverity.INFO if planned else AlarmSeverity.ALARM
+        planned = 'as planned' if planned else 'UNPLANNED'
+        logging.warning(f"container {container_name}:{port} is DOWN ({planned})")
+        self._send_smart_alarm(f"container {container_name} "
+                               f"is not responding on port {port} ({planned})",
+                               severity)
+        self.status_acc.fail()
+        self.last_return_value = False
+        return self.last_return_value
 
 
 class CheckAllOk(AbstractCheck):
@@ -544,25 +582,36 @@ class DockerChecker(AbstractChecker):
     CHECK_WAS_RESTARTED = "was_restarted"
     CHECK_STATUS_IS_NOT_RUNNING = "status_is_not_running"
 
-    def __init__(self, config, mongo_db, dockers_pool, alarm_sender, restart_notification_manager):
+    DEFAULT_CONCURRENCY = 8  # number of containers checked in parallel
+
+    def __init__(self, config, mongo_db, dockers_pool, alarm_sender, restart_notification_manager, *,
+                 probe_manager: ProbeManager, events_monitor: DockerEventsMonitor = None):
         self.config = config
         self.mongo_db = mongo_db
         self.dockers_pool: DockersPool = dockers_pool
         self.alarm_sender = alarm_sender
         self.restart_notification_manager = restart_notification_manager
+        self.events_monitor = events_monitor
+        self.probe_manager = probe_manager
+        self.inventory = ContainerInventory(self.dockers_pool, self.events_monitor)
+        self.stats_collector = ContainerStatsCollector()
+        self.rate_tracker = CounterRateTracker()
+        self.disk_usage_cache = DiskUsageCache(self.dockers_pool, self.probe_manager)
         self.stop_flag = False
 
         self.prev_inventory = None
         self.prev_container_status = {}
 
-        self.last_repo_scan: Optional[datetime.datetime] = None
-        self.repo_scan_interval_minutes = 30
+        self.concurrency = max(1, int(os.getenv("DOCKER_CHECK_CONCURRENCY", str(DockerChecker.DEFAULT_CONCURRENCY))))
+        self.status_lock = threading.Lock()
+        self.container_locks = {}
 
         self.checks = {}
         self.status_acc = {}
 
         for container in self.config['blueprint']:
             cont_name = container['name']
+            self.container_locks[cont_name] = threading.Lock()
             cont_checks = {}
             status_acc = OverallStatusAccumulator()
 
@@ -631,157 +680,240 @@ class DockerChecker(AbstractChecker):
                 self.prev_container_status[cont_name]['src'] \
                     = container['src']
 
-        mongo_db['container_status'].create_index([('timestamp', -1)])
+        self.status_storage = StatusTimeseriesStorage(mongo_db, 'container_status')
 
-        last_status = self.mongo_db['container_status'].find_one(sort=[('timestamp', -1)])
-        if last_status:
-            for obj_name in last_status.get('status', {}):
-                if obj_name in self.prev_container_status:
-                    if 'status' in last_status['status'][obj_name]:
-                        self.prev_container_status[obj_name]['status'] = last_status['status'][obj_name]['status']
-                    if 'stats' in last_status['status'][obj_name]:
-                        self.prev_container_status[obj_name]['stats'] = last_status['status'][obj_name]['stats']
+        for obj_name, prev_status in self.prev_container_status.items():
+            last_status = self.status_storage.get_last(obj_name)
+            if last_status:
+                if 'status' in last_status:
+                    prev_status['status'] = last_status['status']
+                if 'stats' in last_status:
+                    prev_status['stats'] = last_status['stats']
 
     def request_stop(self):
         self.stop_flag = True
+        self.stats_collector.stop()
 
     def check(self):
         logging.debug("starting verification procedure")
 
         inventory = {}
 
-        for template in self.config['blueprint']:
-            if self.stop_flag:
-                return
+        # one container list per docker host instead of a lookup per container
+        hosts = {self.dockers_pool.resolve_id(x.get('docker', None)): x for x in self.config['blueprint']}
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="docker-checker") as executor:
+            for template in hosts.values():
+                docker_client = self.get_docker_client_for_container(template)
+                if docker_client is not None:
+                    executor.submit(self.inventory.refresh, template.get('docker', None), docker_client)
 
-            cont_name = template['name']
-            logging.debug(f"checking {cont_name}")
+        if self.stop_flag:
+            return
 
-            checks = self.checks[cont_name]
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="docker-checker") as executor:
+            futures = {executor.submit(self._check_container_locked, template): template['name']
+                       for template in self.config['blueprint']}
+            for future in as_completed(futures):
+                cont_name = futures[future]
+                try:
+                    cont_rec = future.result()
+                except (docker.errors.DockerException, requests.exceptions.RequestException, OSError) as error:
+                    logging.error(f"failed to check container {cont_name}: {error}")
+                    traceback.print_exc()
+                    cont_rec = None
+                if cont_rec is None:
+                    # keep what we knew about the container, so that restarts and
+                    # status changes are still detected on the next cycle
+                    if self.prev_inventory and cont_name in self.prev_inventory:
+                        inventory[cont_name] = self.prev_inventory[cont_name]
+                    continue
+                inventory[cont_rec['name']] = cont_rec
+
+        if self.stop_flag:
+            return
 
-            docker_client = self.get_docker_client_for_container(template)
+        self.stats_collector.retain({x['id'] for x in inventory.values() if x.get('id', None)})
+        self.prev_inventory = inventory
 
-            if docker_client is None:
-                logging.warning(f"docker client not yet available for {template['name']}")
-                continue
+    def _check_container_locked(self, template):
+        # the same container can be listed several times in the blueprint;
+        # its checks and status accumulator must not be used concurrently
+        with self.container_locks[template['name']]:
+            return self._check_container(template)
 
-            try:
-                cont = docker_client.containers.get(cont_name)
-            except docker.errors.NotFound:
-                logging.error(f"container {template['name']} not found")
-                continue
-            except docker.errors.APIError as e:
-                logging.error(f"error retrieving container {template['name']}"+str(e))
-                continue
-
-            logging.debug(f"loading data for container {cont.name}")
-
-            update_available: Optional[bool] = \
-                    checks[DockerChecker.CHECK_IMAGE_UPDATE_AVAIL].do_check(container=cont, cont_config=template)
-
-            src_update_available: Optional[bool] = \
-                    checks[DockerChecker.CHECK_GIT_UPDATED].do_check(cont_config=template)
-
-            stats = self._compute_stats(docker_client, cont, checks)
-            cont_rec = {
-                'name': cont.name,
-                'short_id': cont.short_id,
-                'status': cont.status,  # running
-                'created': cont.attrs['Created'],
-                'state': cont.attrs['State'],
-                'started_at': cont.attrs['State']['StartedAt'],
-                'restart_count': cont.attrs['RestartCount'],
-                'env': cont.attrs['Config']['Env'],
-                'networks': cont.attrs['NetworkSettings']['Networks'],  # .preprod.Aliases[0]
-                'stats': stats,
-                'update_available': update_available,
-                'src_update_available': src_update_available
-            }
-
-            inventory[cont.name] = cont_rec
-
-            status_acc = self.status_acc[cont_name]
-            status_acc.reset_status()
-
-            checks[DockerChecker.CHECK_STATUS_IS_NOT_RUNNING].do_check(
-                cur_status=cont_rec['status'])
-
-            checks[DockerChecker.CHECK_STATUS_CHANGED].do_check(
-                cur_status=cont_rec['status'],
-                prev_inventory=self.prev_inventory
-            )
-
-            checks[DockerChecker.CHECK_WAS_RESTARTED].do_check(
-                container=cont,
-                prev_inventory=self.prev_inventory
-            )
-
-            for port in template.get('ports', []):
-                checks[DockerChecker.CHECK_PORT_OPEN][port].do_check(docker_client=docker_client)
-
-            if status_acc.is_ok():
-                logging.debug('all OK')
-
-            container_status = 'OK' if status_acc.is_ok() else 'NOK'
+    def _check_container(self, template):
+        if self.stop_flag:
+            return None
 
+        cont_name = template['name']
+        logging.debug(f"checking {cont_name}")
+
+        checks = self.checks[cont_name]
+
+        docker_client = self.get_docker_client_for_container(template)
+
+        if docker_client is None:
+            logging.warning(f"docker client not yet available for {template['name']}")
+            return None
+
+        try:
+            cont = self.inventory.get(template.get('docker', None), docker_client, cont_name)
+        except docker.errors.NotFound:
+            logging.error(f"container {template['name']} not found")
+            return None
+        except docker.errors.APIError as e:
+            logging.error(f"error retrieving container {template['name']}"+str(e))
+            return None
+
+        logging.debug(f"loading data for container {cont.name}")
+
+        update_available: Optional[bool] = \
+                checks[DockerChecker.CHECK_IMAGE_UPDATE_AVAIL].do_check(
+                    container=cont, cont_config=template,
+                    image_attrs=self.inventory.get_image_attrs(template.get('docker', None), docker_client,
+                                                               cont.attrs['Image']))
+
+        src_update_available: Optional[bool] = \
+                checks[DockerChecker.CHECK_GIT_UPDATED].do_check(cont_config=template)
+
+        stats = self._compute_stats(docker_client, template.get('docker', None), cont, checks)
+
+        # with the events stream the status is known without polling and
+        # changes which happened between two checks are not lost
+        # the events are consumed only by the checks which are due, the others find them on their next run
+        events = self.events_monitor.consume(
+            template.get('docker', None), cont_name,
+            restarts=checks[DockerChecker.CHECK_WAS_RESTARTED].shall_repeat(),
+            transitions=checks[DockerChecker.CHECK_STATUS_CHANGED].shall_repeat()) \
+            if self.events_monitor else None
+        cur_status = cont.status
+        health = cont.attrs['State'].get('Health', {}).get('Status', None)
+        if events and events['state']['status'] is not None:
+            cur_status = events['state']['status']
+            health = events['state']['health'] if events['state']['health'] is not None else health
+
+        cont_rec = {
+            'name': cont.name,
+            'id': cont.id,
+            'short_id': cont.short_id,
+            'status': cur_status,  # running
+            'health': health,
+            'created': cont.attrs['Created'],
+            'state': cont.attrs['State'],
+            'started_at': cont.attrs['State']['StartedAt'],
+            'restart_count': cont.attrs['RestartCount'],
+            'env': cont.attrs['Config']['Env'],
+            'networks': cont.attrs['NetworkSettings']['Networks'],  # .preprod.Aliases[0]
+            'stats': stats,
+            'update_available': update_available,
+            'src_update_available': src_update_available
+        }
+
+        status_acc = self.status_acc[cont_name]
+        status_acc.reset_status()
+
+        checks[DockerChecker.CHECK_STATUS_IS_NOT_RUNNING].do_check(
+            cur_status=cont_rec['status'],
+            health=cont_rec['health'])
+
+        checks[DockerChecker.CHECK_STATUS_CHANGED].do_check(
+            cur_status=cont_rec['status'],
+            prev_inventory=self.prev_inventory,
+            transitions=events['transitions'] if events else None
+        )
+
+        checks[DockerChecker.CHECK_WAS_RESTARTED].do_check(
+            container=cont,
+            prev_inventory=self.prev_inventory,
+            restarts=events['restarts'] if events else None,
+            ooms=events['ooms'] if events else 0
+        )
+
+        # one probe execution for all ports which are due
+        port_checks = checks[DockerChecker.CHECK_PORT_OPEN]
+        due_ports = [port for port in template.get('ports', []) if port_checks[port].shall_repeat()]
+        port_results = {}
+        if due_ports:
+            try:
+                port_results = probe_ports(self.probe_manager, docker_client, cont_name, due_ports,
+                                           network_target=cont_name,
+                                           target_key=f"{cont.id}/{cont.attrs['State'].get('StartedAt', '')}")
+            except docker.errors.DockerException as err:
+                logging.error(f"failed to check open ports of {cont_name}: {str(err)}")
+        for port in template.get('ports', []):
+            port_checks[port].do_check(port_result=port_results.get(port, None))
+        cont_rec['stats']['ports'] = [{'port': port, 'open': port_checks[port].last_return_value,
+                                       'latency_ms': port_checks[port].last_latency_ms}
+                                      for port in template.get('ports', [])]
+
+        if status_acc.is_ok():
+            logging.debug('all OK')
+
+        container_status = 'OK' if status_acc.is_ok() else 'NOK'
+
+        with self.status_lock:
             if cont_name not in self.prev_container_status:
                 self.prev_container_status[cont_name] = {'status': container_status}
 
             prev_container_status = self.prev_container_status[cont_name]
 
-            if cont_name in self.prev_container_status and \
-                    container_status != prev_container_status['status']:
-                if container_status == 'OK':
-                    logging.info(f"container {cont_name} has been repaired")
-                    self.alarm_sender.push_alarm(f"container {cont_name} is OK again", AlarmSeverity.INFO)
-                else:
-                    planned = self.restart_notification_manager.check_notification_present(
-                        cont_name, 'container', datetime.datetime.now())
-                    severity = AlarmSeverity.INFO if planned else AlarmSeverity.ALARM
-                    planned = 'as planned' if planned else 'UNPLANNED'
-                    logging.warning(f"service {cont_name} is BROKEN ({planned})")
-                    self.alarm_sender.push_alarm(f"container {cont_name} is BROKEN ({planned})",
-                                                 severity)
-
+        if container_status != prev_container_status['status']:
+            if container_status == 'OK':
+                logging.info(f"container {cont_name} has been repaired")
+                self.alarm_sender.push_alarm(f"container {cont_name} is OK again", AlarmSeverity.INFO)
+            else:
+                planned = self.restart_notification_manager.check_notification_present(
+                    cont_name, 'container', datetime.datetime.now())
+                severity = AlarmSeverity.INFO if planned else AlarmSeverity.ALARM
+                planned = 'as planned' if planned else 'UNPLANNED'
+                logging.warning(f"service {cont_name} is BROKEN ({planned})")
+                self.alarm_sender.push_alarm(f"container {cont_name} is BROKEN ({planned})",
+                                             severity)
+
+        with self.status_lock:
             prev_container_status['status'] = container_status
             if container_status != 'OK':
                 prev_container_status['last_failure'] \
                     = datetime.datetime.now(datetime.timezone.utc).isoformat()
-            if cont_rec:
-                prev_container_status['stats'] = cont_rec['stats']
-                if cont_rec['update_available'] is not None:
-                    prev_container_status['update_available']: bool = cont_rec['update_available']
-                elif self.prev_container_status[cont_name].get('update_available', None) is None:
-                    prev_container_status['update_available']: bool = False
-                if cont_rec['src_update_available'] is not None:
-                    prev_container_status['src_update_available'] = cont_rec['src_update_available']
-
-        self.prev_inventory = inventory
-
-    @staticmethod
-    def _compute_stats(docker_client, cont, checks):
-        checker: AbstractCheck = checks[DockerChecker.CHECK_DISK_SPACE]  # TODO: use one check per mount point
-        df_root = checker.do_check(docker_client=docker_client, local_source='/')
+            prev_container_status['stats'] = cont_rec['stats']
+            if cont_rec['update_available'] is not None:
+                prev_container_status['update_available']: bool = cont_rec['update_available']
+            elif prev_container_status.get('update_available', None) is None:
+                prev_container_status['update_available']: bool = False
+            if cont_rec['src_update_available'] is not None:
+                prev_container_status['src_update_available'] = cont_rec['src_update_available']
+
+        return cont_rec
+
+    def _compute_stats(self, docker_client, docker_id, cont, checks):
+        checker: AbstractCheck = checks[DockerChecker.CHECK_DISK_SPACE]
+        sources = ['/'] + [x['Source'] for x in cont.attrs['Mounts'] if x.get('Source', None)]
+        df = checker.do_check(docker_client=docker_client, docker_id=docker_id, local_sources=sources,
+                              disk_usage_cache=self.disk_usage_cache)
 
         now = datetime.datetime.now(datetime.timezone.utc)
         started_at = dateutil.parser.isoparse(cont.attrs['State']['StartedAt'])
         uptime = now - started_at
 
-        ins = docker_client.api.inspect_container(cont.name)
-        df = {df_root['mount_point']: df_root} if df_root else {}
-        mounts = ins['Mounts']
-        for mount in mounts:
-            source = mount.get('Source', None)
-            if source:
-                df_mount = checker.do_check(docker_client=docker_client, local_source=source)
-                if df_mount and not df_mount['mount_point'] in df:
-                    df[df_mount['mount_point']] = df_mount
-
-        st = cont.stats(stream=False)
+        sample = self.stats_collector.get_stats(cont)
+        stats = self._parse_container_stats(sample)
+        # rates against the previous sample; the counters restart with the container
+        sample_time = dateutil.parser.isoparse(sample['read']) if sample and sample.get('read', None) else now
+        self.rate_tracker.add_rates(cont.name, stats, sample_time.timestamp(),
+                                    instance=(cont.id, cont.attrs['State']['StartedAt']))
+        stats['uptime_seconds'] = uptime.total_seconds()
+        stats['disk_usage'] = df if df else []
+        return stats
+
+    @staticmethod
+    def _parse_container_stats(st):
+        if st is None:
+            # no samples for containers which are not running
+            st = {}
         network_if = None
-        if 'networks' in st:
+        if st.get('networks', None):
             network_if = list(st['networks'].items())[0][1]
-        blkio_stat = st['blkio_stats']['io_service_bytes_recursive']
+        blkio_stat = st.get('blkio_stats', {}).get('io_service_bytes_recursive', None)
         bytes_written = 0
         bytes_read = 0
         if blkio_stat is not None:
@@ -791,67 +923,54 @@ class DockerChecker(AbstractChecker):
                     bytes_written += x['value']
                 elif op == 'read':
                     bytes_read += x['value']
-        cpu_delta = st['cpu_stats']['cpu_usage'].get('total_usage', 0) - \
-                    st['precpu_stats']['cpu_usage']['total_usage']
-        system_cpu_delta = st['cpu_stats'].get('system_cpu_usage', 0) - st['precpu_stats'].get('system_cpu_usage', 0)
-        number_cpus = st['cpu_stats']['online_cpus']
-        cpu_usage = (cpu_delta / system_cpu_delta) * number_cpus
 
-        used_memory_bytes = st['memory_stats']['usage'] - st['memory_stats']['stats'].get('cache', 0)
-        available_memory_bytes = st['memory_stats']['limit']
-        memory_usage = used_memory_bytes / available_memory_bytes
+        # the first one-shot sample of a container has nothing to compare against
+        cpu_usage = None
+        cpu_stats = st.get('cpu_stats', {})
+        precpu_stats = st.get('precpu_stats', {})
+        if cpu_stats.get('cpu_usage', None) and precpu_stats.get('cpu_usage', None):
+            cpu_delta = cpu_stats['cpu_usage'].get('total_usage', 0) - \
+                        precpu_stats['cpu_usage'].get('total_usage', 0)
+            system_cpu_delta = cpu_stats.get('system_cpu_usage', 0) - precpu_stats.get('system_cpu_usage', 0)
+            number_cpus = cpu_stats.get('online_cpus', 1)
+            if system_cpu_delta > 0:
+                cpu_usage = (cpu_delta / system_cpu_delta) * number_cpus
+
+        used_memory_bytes = None
+        available_memory_bytes = None
+        memory_usage = None
+        memory_stats = st.get('memory_stats', {})
+        if 'usage' in memory_stats and memory_stats.get('limit', None):
+            used_memory_bytes = memory_stats['usage'] - memory_stats.get('stats', {}).get('cache', 0)
+            available_memory_bytes = memory_stats['limit']
+            memory_usage = used_memory_bytes / available_memory_bytes
 
         return {
-            'cpu_usage_percent': 100.0 * cpu_usage,
+            'cpu_usage_percent': 100.0 * cpu_usage if cpu_usage is not None else None,
             'memory_usage_bytes': used_memory_bytes,
             'memory_available_bytes': available_memory_bytes,
-            'memory_usage_percent': 100.0 * memory_usage,
-            'pids': st['pids_stats']['current'],
+            'memory_usage_percent': 100.0 * memory_usage if memory_usage is not None else None,
+            'pids': st.get('pids_stats', {}).get('current', None),
             'network_received_bytes': network_if['rx_bytes'] if network_if else None,
             'network_sent_bytes': network_if['tx_bytes'] if network_if else None,
             'blkio_written_bytes': bytes_written,
-            'blkio_read_bytes': bytes_read,
-            'uptime_seconds': uptime.total_seconds(),
-            'disk_usage': list(df.values())
+            'blkio_read_bytes': bytes_read
         }
 
     def store_status(self):
         if self.mongo_db is None:
             return
 
-        rec = {
-            'timestamp': datetime.datetime.now(datetime.timezone.utc),
-            'status': self.prev_container_status,
-        }
-
-        self.mongo_db['container_status'].insert_one(rec)
+        self.status_storage.store(self.prev_container_status)
 
     def get_status(self):
         return self.prev_container_status
 
     def get_stats_for_container(self, container, stat, time_from=None):
-        if time_from is None:
-            time_from = datetime.datetime.now() - datetime.timedelta(days=1)
-
-        return list(self.mongo_db['container_status'].find({'timestamp': {'$gt': time_from} }, {
-            '_id': 0, 'timestamp': 1, f'status.{container}.stats.{stat}': 1},
-                                            sort=[('timestamp', 1)]))
+        return self.get_entity_timeseries(container, f'stats.{stat}', time_from)
 
     def get_status_timeseries_for_container(self, container, time_from=None):
-        if time_from is None:
-            time_from = datetime.datetime.now() - datetime.timedelta(days=1)
-
-        return list(self.mongo_db['container_status'].find({'timestamp': {'$gt': time_from}}, {
-            '_id': 0, 'timestamp': 1, f'status.{container}.status': 1},
-                                            sort=[('timestamp', 1)]))
-
-    def get_status_timeseries(self, time_from=None):
-        if time_from is None:
-            time_from = datetime.datetime.now() - datetime.timedelta(days=1)
-
-        return list(self.mongo_db['container_status'].find({'timestamp': {'$gt': time_from}}, {
-            '_id': 0, 'timestamp': 1, 'status.$': 1},
-                                            sort=[('timestamp', 1)]))
+        return self.get_entity_timeseries(container, 'status', time_from)
 
     def get_docker_client_for_container(self, cont_config):
         docker_id = cont_config.get('docker', None)
@@ -1,19 +1,25 @@
 import logging
-import tempfile
+import time
 from typing import Callable, Optional, List
 
 import datetime
-import tarfile
 
 import jmxquery
 
 import docker
 import docker.errors
+import requests
 
 from alarms.alarm import AlarmSeverity, AlarmSender
 from checkers.abstract_checker import AbstractChecker
 from checkers.check import AbstractCheck, OverallStatusAccumulator
+from utils.docker_events import DockerEventsMonitor
+from utils.jmx_agent import JmxAgentConnection, LocalJmxAgent, load_metrics
+from utils.jmx_agent_image import JmxAgentImageBuilder
+from utils.jmx_proxy_manager import JmxProxyManager
+from utils.jolokia_connection import JolokiaConnection
 from utils.restart_notification_manager import RestartNotificationManager
+from utils.timeseries_storage import StatusTimeseriesStorage
 
 logging.getLogger("jmxquery").setLevel(logging.INFO)
 
@@ -64,11 +70,86 @@ class MyJMXConnection(jmxquery.JMXConnection):
             logging.error(f"Error calling JMX: {err}")
             raise err
 
-        # noinspection PyUnresolvedReferences
-        metrics = self._JMXConnection__load_from_json(json_output)
+        metrics = load_metrics(json_output)
         return metrics
 
 
+class JmxQueryPlan:
+    # queries and converters of a service prepared once; the returned metrics are matched
+    # to the requested mbeans with hash lookups instead of scanning all of them
+    DEFAULT_INTERVAL = AbstractCheck.DEFAULT_CHECK_REPEAT_INTERVAL
+    MIN_INTERVAL = 10  # seconds, shorter polling intervals are raised to it
+
+    def __init__(self, mbeans_dicts: List[dict]):
+        self.mbeans_dicts = mbeans_dicts
+        self.queries = []
+        self.index = {}  # (mbean name, metric name, attribute, attribute key) -> indices of the mbeans, ascending
+        for idx, mbean_desc in enumerate(mbeans_dicts):
+            self.queries.append(jmxquery.JMXQuery(mbean_desc['mbean_name'],
+                                                  metric_name=mbean_desc.get('metric_name', None),
+                                                  metric_labels=mbean_desc.get('metric_labels', None),
+                                                  attribute=mbean_desc.get('attribute', None),
+                                                  attributeKey=mbean_desc.get('attribute_key', None)))
+            self.index.setdefault((mbean_desc['mbean_name'],
+                                   mbean_desc.get('metric_name', None),
+                                   mbean_desc.get('attribute', None),
+                                   mbean_desc.get('attribute_key', None)), []).append(idx)
+
+    def match(self, metric: jmxquery.JMXQuery, due: Optional[set] = None) -> Optional[int]:
+        # a requested mbean without metric name, attribute or attribute key matches any value of it;
+        # of the mbeans polled (due, all if None) the first requested one wins, as with the sequential matching
+        best = None
+        for metric_name in (metric.metric_name, None):
+            for attribute in (metric.attribute, None):
+                for attribute_key in (metric.attributeKey, None):
+                    for idx in self.index.get((metric.mBeanName, metric_name, attribute, attribute_key), []):
+                        if due is None or idx in due:
+                            if best is None or idx < best:
+                                best = idx
+                            break
+        return best
+
+    def get_min_interval(self):
+        return max(JmxQueryPlan.MIN_INTERVAL, min(x['interval'] for x in self.mbeans_dicts))
+
+    def get_due(self, last_polled: dict, now: float) -> List[int]:
+        # indices of the mbeans which are due; a second of tolerance keeps mbeans with
+        # the same interval as the check from slipping to the next check execution
+        return [idx for idx, mbean_desc in enumerate(self.mbeans_dicts)
+                if idx not in last_polled or now - last_polled[idx] >= mbean_desc['interval'] - 1]
+
+    @staticmethod
+    def compile(service: dict):
+        # polling intervals: of the mbean itself, of its group or the default one;
+        # the built-in metrics form the group "builtin"
+        groups = {x['name']: x['interval'] for x in service.get('mbean-groups', [])}
+        for mbean in service.get('mbeans', []):
+            if mbean.get('group', None) is not None and mbean['group'] not in groups:
+                raise ValueError(f"mbean group {mbean['group']} of JMX service {service['service']} is not defined")
+        mbeans_dicts = CheckJmx.get_default_jmx_metrics()
+        for mbean_desc in mbeans_dicts:
+            mbean_desc['interval'] = groups.get('builtin', JmxQueryPlan.DEFAULT_INTERVAL)
+        for mbean in service.get('mbeans', []):
+            conv = mbean.get('conv', None)
+            conv_func: Optional[Callable[[object], object]]
+            if conv is not None:
+                conv_func = eval(f"lambda x : {conv}")
+            else:
+                conv_func = None
+            mbeans_dicts.append({
+                'mbean_name': mbean['name'],
+                'our_alias': mbean['our-alias'],
+                'metric_name': mbean.get('metric-name', None),
+                'metric_labels': mbean.get('metric-labels', None),
+                'attribute': mbean.get('attribute', None),
+                'attribute_key': mbean.get('attribute-key', None),
+                'conv': conv_func,
+                'type': 'user',
+                'interval': mbean.get('interval', groups.get(mbean.get('group', None), JmxQueryPlan.DEFAULT_INTERVAL))
+            })
+        return JmxQueryPlan(mbeans_dicts)
+
+
 class CheckJmx(AbstractCheck):
 
     def __init__(self,
@@ -82,6 +163,11 @@ class CheckJmx(AbstractCheck):
         super().__init__(obj_name, status_acc, alarm_sender, restart_notification_manager, check_repeat_interval,
                          resend_threshold)
         self.service = service
+        self.plan = JmxQueryPlan.compile(service)
+        # the check runs as often as the most frequently polled mbean, but not more often than every MIN_INTERVAL
+        self.check_repeat_interval = min(check_repeat_interval, self.plan.get_min_interval())
+        self.last_polled = {}  # mbean index -> monotonic time of the last successful poll
+        self.last_values = {}  # mbean index -> {(type, alias): value} from its last poll
 
     def do_check(self, **kwargs):
         if not self.shall_repeat():
@@ -95,98 +181,52 @@ class CheckJmx(AbstractCheck):
 
         jmx_connection = kwargs.get("jmx_connection")
 
-        mbeans = service.get('mbeans', [])
         timeout = int(service.get('timeout', '60'))
-        queries = []
-        mbeans_dicts = CheckJmx._get_default_jmx_metrics()
-        for mbean in mbeans:
-            mbean_name = mbean['name']
-            our_alias = mbean['our-alias']
-            metric_name = mbean.get('metric-name', None)
-            metric_labels = mbean.get('metric-labels', None)
-            attribute = mbean.get('attribute', None)
-            attribute_key = mbean.get('attribute-key', None)
-            conv = mbean.get('conv', None)
-            conv_func: Optional[Callable[[object]: object]]
-            if conv is not None:
-                conv_func = eval(f"lambda x : {conv}")
-            else:
-                conv_func = None
-            mbeans_dicts.append({
-                'mbean_name': mbean_name,
-                'our_alias': our_alias,
-                'metric_name': metric_name,
-                'metric_labels': metric_labels,
-                'attribute': attribute,
-                'attribute_key': attribute_key,
-                'conv': conv_func,
-                'type': 'user'
-            })
-
-        for mbean_desc in mbeans_dicts:
-            query = jmxquery.JMXQuery(mbean_desc['mbean_name'],
-                                      metric_name=mbean_desc.get('metric_name', None),
-                                      metric_labels=mbean_desc.get('metric_labels', None),
-                                      attribute=mbean_desc.get('attribute', None),
-                                      attributeKey=mbean_desc.get('attribute_key', None))
-            queries.append(query)
 
-        try:
-            metrics = jmx_connection.query(queries, timeout=timeout)
-        except (docker.errors.APIError, RuntimeError):
-            self.last_return_value = None
-            self._set_status(AbstractCheck.CheckResult.EXEC_FAILURE)
-            return self.last_return_value
-        metrics_dicts = []
-        for metric in metrics:
-            our_bean_desc = None
-            for requested_mbean in mbeans_dicts:
-                if requested_mbean['mbean_name'] != metric.mBeanName:
-                    continue
-                if requested_mbean.get('metric_name', None) is not None and \
-                        metric.metric_name != requested_mbean['metric_name']:
-                    continue
-                if requested_mbean.get('attribute', None) is not None and \
-                        metric.attribute != requested_mbean['attribute']:
-                    continue
-                if requested_mbean.get('attribute_key', None) is not None and \
-                        metric.attributeKey != requested_mbean['attribute_key']:
+        now = time.monotonic()
+        due = self.plan.get_due(self.last_polled, now)
+        if due:
+            try:
+                metrics = jmx_connection.query([self.plan.queries[idx] for idx in due], timeout=timeout)
+            except (docker.errors.APIError, RuntimeError):
+                self.last_return_value = None
+                self._set_status(AbstractCheck.CheckResult.EXEC_FAILURE)
+                return self.last_return_value
+
+            due_set = set(due)
+            values = {idx: {} for idx in due}
+            for metric in metrics:
+                idx = self.plan.match(metric, due_set)
+                if idx is None:
                     continue
-                our_bean_desc = requested_mbean
-                break
-            if our_bean_desc is None:
-                continue
-
-            value = metric.value
-            conv: Callable[[Optional[object]], object]
-            conv = our_bean_desc.get('conv', None)
-            if conv is not None:
-                value = conv(value)
-
-            metrics_dicts.append({
-                'our_alias': our_bean_desc['our_alias'],
-                'mbean_name': metric.mBeanName,
-                'metric_name': metric.metric_name,
-                'metric_labels': metric.metric_labels,
-                'attribute': metric.attribute,
-                'attribute_key': metric.attributeKey,
-                'value_type': metric.value_type,
-                'value': value,
-                'type': our_bean_desc['type']
-            })
+                our_bean_desc = self.plan.mbeans_dicts[idx]
+
+                value = metric.value
+                conv: Callable[[Optional[object]], object]
+                conv = our_bean_desc.get('conv', None)
+                if conv is not None:
+                    value = conv(value)
+
+                values.setdefault(idx, {})[(our_bean_desc['type'], our_bean_desc['our_alias'])] = value
+            for idx in due:
+                self.last_polled[idx] = now
+            self.last_values.update(values)
+
+        # mbeans which are not due keep their last known values
         stat_dict = {}
         user_dict = {}
-        for metric in metrics_dicts:
-            if metric['type'] == 'stat':
-                stat_dict[metric['our_alias']] = metric['value']
-            elif metric['type'] == 'user':
-                user_dict[metric['our_alias']] = metric['value']
+        for idx in sorted(self.last_values):
+            for (value_type, our_alias), value in self.last_values[idx].items():
+                if value_type == 'stat':
+                    stat_dict[our_alias] = value
+                elif value_type == 'user':
+                    user_dict[our_alias] = value
         self.last_return_value = (stat_dict, user_dict)
         self._set_status(AbstractCheck.CheckResult.NON_BINARY)
         return self.last_return_value
 
     @staticmethod
-    def _get_default_jmx_metrics():
+    def get_default_jmx_metrics():
         return [
             {
                 'our_alias': 'memory_usage_bytes',
@@ -292,10 +332,14 @@ class JmxChecker(AbstractChecker):
     CHECK_JMX = "check_jmx"
     CHECK_SERVICE_RESTARTED = "check_service_restarted"
 
-    def __init__(self, config, mongo_db, dockers_pool, alarm_sender, restart_notification_manager):
+    def __init__(self, config, mongo_db, dockers_pool, alarm_sender, restart_notification_manager, *,
+                 events_monitor: DockerEventsMonitor = None):
         self.prev_jmx_status = {}
         self.prev_inventory = None
-        self.jmx_connections = {}
+        self.jmx_connections = {}  # direct and Jolokia URLs only, the proxied ones are kept by the proxy manager
+        self.proxy_manager = JmxProxyManager(dockers_pool, JMX_AGENT_IMAGE, JMX_AGENT_PORT,
+                                             MyJMXConnection, events_monitor)
+        self.local_jmx_agent: Optional[LocalJmxAgent] = None
         self.stop_flag = False
         self.config = config
         self.mongo_db = mongo_db
@@ -330,26 +374,29 @@ class JmxChecker(AbstractChecker):
                     self.alarm_sender,
                     self.restart_notification_manager)
 
-        mongo_db['jmx_status'].create_index([('timestamp', -1)])
+        self.status_storage = StatusTimeseriesStorage(mongo_db, 'jmx_status')
 
-        self._build_jmx_agent_image()
+        # the image is built in the background, services behind a proxy are polled once it is ready
+        self.image_builder = JmxAgentImageBuilder(dockers_pool, JMX_AGENT_IMAGE)
+        self.image_builder.start({service.get('docker', None) for service in self.config.get('jmx', [])
+                                  if service['url'].get('docker', None)})
 
-        last_status = mongo_db['jmx_status'].find_one(sort=[('timestamp', -1)])
-        if last_status:
-            for obj_name in last_status.get('status', {}):
-                if obj_name in self.prev_jmx_status:
-                    if 'status' in last_status['status'][obj_name]:
-                        self.prev_jmx_status[obj_name]['status'] = last_status['status'][obj_name]['status']
+        for obj_name, prev_status in self.prev_jmx_status.items():
+            last_status = self.status_storage.get_last(obj_name)
+            if last_status and 'status' in last_status:
+                prev_status['status'] = last_status['status']
 
     def request_stop(self):
         self.stop_flag = True
+        for jmx_connection in self.jmx_connections.values():
+            jmx_connection.close()
+        self.proxy_manager.stop()
 
     def check(self):
         jmx_cfg = self.config.get('jmx', None)
         if jmx_cfg is None:
             return
         inventory = {}
-        proxy_cont = None
         for service in jmx_cfg:
             if self.stop_flag:
                 return
@@ -362,50 +409,54 @@ class JmxChecker(AbstractChecker):
 
             url = service['url']
             url_docker = url.get('docker', None)
-            access_url = None
             docker_client = self._get_docker_client_for_service(service)
             if docker_client is None:
                 logging.warning(f"docker client not yet available for {service_name}")
-            if url_docker and docker_client:
-                port = url_docker['port']
-                target_container = url_docker['container']
-                proxy_name = target_container + "-docker-env-checker-jmxproxy"
-                try:
-                    proxy_cont = docker_client.containers.get(proxy_name)
-                except docker.errors.NotFound:
-                    proxy_cont = docker_client.containers.run(
-                        JMX_AGENT_IMAGE,
-                        f"socat tcp-listen:{JMX_AGENT_PORT},fork,reuseaddr tcp-connect:{target_container}:{port}",
-                        name=proxy_name,
-                        detach=True,
-                        remove=True,
-                        network_mode=f"container:{target_container}")
-
-                access_url = f"pass-through-to-{proxy_name}"
-            else:
-                url_direct = url.get('direct', None)
-                if url_direct:
-                    access_url = url_direct
             jmx_connection = None
-            if access_url:
-                if self.jmx_connections and access_url in self.jmx_connections:
+            if url_docker and docker_client and not self.image_builder.is_ready(service.get('docker', None)):
+                logging.info(f"JMX agent image not yet available for {service_name}")
+            elif url_docker and docker_client:
+                try:
+                    jmx_connection = self.proxy_manager.get_connection(
+                        service.get('docker', None), docker_client, url_docker['container'], url_docker['port'])
+                except (docker.errors.DockerException, requests.exceptions.RequestException) as error:
+                    logging.error(f"failed to set up JMX proxy for {service_name}: {error}")
+            elif url.get('jolokia', None):
+                url_jolokia = url['jolokia']
+                access_url = url_jolokia['url']
+                if access_url in self.jmx_connections:
                     jmx_connection = self.jmx_connections[access_url]
                 else:
-                    if url_docker:
-                        jmx_connection = MyJMXConnection(proxy_cont)
-                    else:
-                        jmx_connection = jmxquery.JMXConnection(access_url)
+                    jmx_connection = JolokiaConnection(access_url, url_jolokia.get('username', None),
+                                                       url_jolokia.get('password', None))
                     self.jmx_connections[access_url] = jmx_connection
+            elif not url_docker:
+                access_url = url.get('direct', None)
+                if access_url:
+                    if access_url in self.jmx_connections:
+                        jmx_connection = self.jmx_connections[access_url]
+                    else:
+                        # queries go to a long-running agent instead of starting a JVM per poll
+                        if self.local_jmx_agent is None:
+                            self.local_jmx_agent = LocalJmxAgent()
+                        jmx_connection = JmxAgentConnection(
+                            self.local_jmx_agent,
+                            access_url,
+                            fallback=jmxquery.JMXConnection(access_url))
+                        self.jmx_connections[access_url] = jmx_connection
             stat_dict = None
             user_dict = None
             if jmx_connection:
                 jmx_ret = checks[JmxChecker.CHECK_JMX].do_check(jmx_connection=jmx_connection)
                 if jmx_ret:
                     (stat_dict, user_dict) = jmx_ret
+                elif url_docker:
+                    # the proxy is inspected before the next poll
+                    self.proxy_manager.report_failure(service.get('docker', None), url_docker['container'])
 
             cont = inventory[service_name] = {
                 'stats': stat_dict,
-                'started_at': stat_dict.get('started_at', None),
+                'started_at': stat_dict.get('started_at', None) if stat_dict else None,
                 'user_defined': user_dict,
                 'status': 'OK'  # TODO
             }
@@ -458,80 +509,19 @@ class JmxChecker(AbstractChecker):
         if self.mongo_db is None:
             return
 
-        rec = {
-            'timestamp': datetime.datetime.now(datetime.timezone.utc),
-            'status': self.prev_jmx_status
-        }
-
-        self.mongo_db['jmx_status'].insert_one(rec)
+        self.status_storage.store(self.prev_jmx_status)
 
     def get_status(self):
         return self.prev_jmx_status
 
     def get_stats_for_service(self, service, stat, time_from=None):
-        if time_from is None:
-            time_from = datetime.datetime.now() - datetime.timedelta(days=1)
-
-        return list(self.mongo_db['jmx_status'].find({'timestamp': {'$gt': time_from}}, {
-            '_id': 0, 'timestamp': 1, f'status.{service}.stats.{stat}': 1},
-                                                           sort=[('timestamp', 1)]))
+        return self.get_entity_timeseries(service, f'stats.{stat}', time_from)
 
     def get_user_defined_param_for_service(self, service, user_defined_param_name, time_from=None):
-        if time_from is None:
-            time_from = datetime.datetime.now() - datetime.timedelta(days=1)
-
-        return list(self.mongo_db['jmx_status'].find({'timestamp': {'$gt': time_from}}, {
-            '_id': 0, 'timestamp': 1, f'status.{service}.user_defined.{user_defined_param_name}': 1},
-                                                           sort=[('timestamp', 1)]))
+        return self.get_entity_timeseries(service, f'user_defined.{user_defined_param_name}', time_from)
 
     def get_status_timeseries_for_service(self, service, time_from=None):
-        if time_from is None:
-            time_from = datetime.datetime.now() - datetime.timedelta(days=1)
-
-        return list(self.mongo_db['jmx_status'].find({'timestamp': {'$gt': time_from}}, {
-            '_id': 0, 'timestamp': 1, f'status.{service}.status': 1},
-                                                           sort=[('timestamp', 1)]))
-
-    def get_status_timeseries(self, time_from=None):
-        if time_from is None:
-            time_from = datetime.datetime.now() - datetime.timedelta(days=1)
-
-        return list(self.mongo_db['jmx_status'].find({'timestamp': {'$gt': time_from}}, {
-            '_id': 0, 'timestamp': 1, 'status.$': 1},
-                                            sort=[('timestamp', 1)]))
-
-    def _build_jmx_agent_image(self):
-        jmx_cfg = self.config.get('jmx', None)
-        if jmx_cfg is None:
-            return
-
-        for service in jmx_cfg:
-            if self.stop_flag:
-                return
-
-            docker_client = self._get_docker_client_for_service(service)
-
-            JmxChecker._build_jmx_agent_image_int(docker_client)
-
-    @staticmethod
-    def _build_jmx_agent_image_int(docker_client):
-        logging.debug("building JMX agent image")
-
-        with tempfile.TemporaryFile() as build_context:
-            with tarfile.open(fileobj=build_context, mode="w") as tar:
-                tar.add(name="Dockerfile_jmx_agent", arcname="Dockerfile")
-                tar.add("JMXQuery-0.1.8.jar")
-
-            build_context.seek(0, 0)
-
-            try:
-                if docker_client:
-                    docker_client.images.build(
-                        fileobj=build_context,
-                        custom_context=True,
-                        tag=f"{JMX_AGENT_IMAGE}:latest")
-            except docker.errors.DockerException as e:
-                logging.error(f"failed to build JMX agent image {e}")
+        return self.get_entity_timeseries(service, 'status', time_from)
 
     def _get_docker_client_for_service(self, cont_config):
         docker_id = cont_config.get('docker', None)
@@ -1,17 +1,11 @@
 import datetime
 import logging
 import os
-import re
 import shlex
-import socket
-import struct
 from typing import List, Union, Optional
 import urllib
-import ssl
-import OpenSSL
 
 import docker.errors
-import requests
 from requests.auth import HTTPBasicAuth
 
 from alarms.alarm import AlarmSeverity
@@ -19,8 +13,19 @@ from alarms.alarm import AlarmSender
 from checkers.abstract_checker import AbstractChecker
 from checkers.check import AbstractCheck, OverallStatusAccumulator
 from checkers.docker_checker import CheckIfGitUpdateAvailable
+from checkers.zabbix_checks import CheckDiskSpaceIsOkZabbix, CheckServicePortOpenZabbix, CheckZabbix
+from utils.counter_rates import CounterRateTracker
+from utils.curl_batch import run_curl_batch
 from utils.dockers_pool import DockersPool
+from utils.http_check_engine import HttpCheckEngine
+from utils.http_session_pool import HttpSessionPool
+from utils.probe_manager import ProbeManager
 from utils.restart_notification_manager import RestartNotificationManager
+from utils.ssl_inventory import SslInventory
+from utils.tcp_prober import TcpProber
+from utils.timeseries_storage import StatusTimeseriesStorage
+from utils.zabbix_agent_client import DEFAULT_ZABBIX_AGENT_PORT, ZabbixAgentClient
+from utils.zabbix_receiver import ZabbixReceiver
 
 
 class CurlAuth:
@@ -34,265 +39,7 @@ class CurlBasicAuth(CurlAuth):
         self.password = password
 
     def get_curl_params(self):
-        return f"-u {self.username}:{self.password}"
-
-
-class CheckZabbix(AbstractCheck):
-    def do_check(self, **kwargs):
-        if not self.shall_repeat():
-            return self.last_return_value
-
-        self._report_check()
-
-        self._update_exec_time()
-
-        checks: dict[str: Union[dict[str: AbstractCheck] | AbstractCheck]] = kwargs.get("checks")
-        hostname: str = kwargs.get("hostname")
-        zab_desc: dict = kwargs.get("zab_desc")
-
-        mount_points_thresholds = {}
-        for df in zab_desc.get('disk-free', []):
-            mount_points_thresholds[df['mount']] = float(df['threshold'])
-        for df in zab_desc.get('mount-points', []):
-            if df not in mount_points_thresholds:
-                mount_points_thresholds[df] = None
-        nic_list: List[str] = zab_desc.get('nic', [])
-        ports: List[str] = zab_desc.get('ports', [])
-        mount_points = list(mount_points_thresholds.keys())
-
-        ports = [str(x) for x in ports]
-        ports = [x.replace(':', ',') for x in ports]
-        ports = [',' + x if ',' not in x else x for x in ports]
-
-        zab_stats = CheckZabbix._get_zabbix_stats_internal(hostname,
-                                                           mount_points=mount_points,
-                                                           nic_list=nic_list,
-                                                           port_list=ports)
-
-        for port in ports:
-            checks[WebServiceChecker.CHECK_PORT_OPEN_ZABBIX][port].do_check(zab_stats=zab_stats)
-
-        disk_stat = []
-        for mount_point in mount_points:
-            disk_total = zab_stats['vfs.fs.size[' + mount_point + ',total]']
-            disk_free = zab_stats['vfs.fs.size[' + mount_point + ',free]']
-            if disk_total is not None and disk_free is not None:
-                disk_used = disk_total - disk_free
-                disk_usage_perc = 100.0 * disk_used / disk_total
-                disk_stat.append({
-                    'mount_point': mount_point,
-                    'total_bytes': disk_total,
-                    'used_bytes': disk_used,
-                    'usage_percentage': disk_usage_perc
-                })
-                checks[WebServiceChecker.CHECK_DISK_SPACE_IS_OK_ZABBIX][mount_point].\
-                    do_check(disk_usage_perc=disk_usage_perc)
-
-        network_sent_bytes = 0
-        network_rcvd_bytes = 0
-        for nic in nic_list:
-            bytes_in = zab_stats[f'net.if.in[{nic},bytes]']
-            bytes_out = zab_stats[f'net.if.out[{nic},bytes]']
-            network_rcvd_bytes += bytes_in if bytes_in else 0
-            network_sent_bytes += bytes_out if bytes_out else 0
-
-        mem_usage_percent = 100.0 * zab_stats['vm.memory.size[free]'] / zab_stats['vm.memory.size'] \
-            if zab_stats['vm.memory.size[free]'] is not None and zab_stats['vm.memory.size'] \
-            else 0
-
-        self.last_return_value = {
-            'cpu_usage_percent': zab_stats['system.cpu.load'],
-            'memory_usage_bytes': zab_stats['vm.memory.size'],
-            'memory_available_bytes': zab_stats['vm.memory.size[free]'],
-            'memory_usage_percent': mem_usage_percent,
-            'pids': zab_stats['proc.num'],
-            'network_received_bytes': network_rcvd_bytes,
-            'network_sent_bytes': network_sent_bytes,
-            'blkio_written_bytes': zab_stats['vfs.dev.write[all,sectors]'],
-            'blkio_read_bytes': zab_stats['vfs.dev.read[all,sectors]'],
-            'uptime_seconds': zab_stats['system.uptime'],
-            'disk_usage': disk_stat
-        }
-
-        return self.last_return_value
-
-    @staticmethod
-    def _get_zabbix_stats_internal(zabbix_host, zabbix_port=10050, mount_points=None, nic_list=None, port_list=None):
-        params = ["vm.memory.size", "vm.memory.size[free]", "proc.num",
-                  "system.cpu.load", "system.cpu.util",
-                  "system.uptime",
-                  "net.if.in[enp3s0,bytes]", "net.if.out[enp3s0,bytes]",
-                  "vfs.dev.read[all,sectors]", "vfs.dev.write[all,sectors]"]
-
-        if mount_points:
-            for mp in mount_points:
-                params.append(f"vfs.fs.size[{mp},total]")
-                params.append(f"vfs.fs.size[{mp},free]")
-
-        if port_list:
-            for port in port_list:
-                params.append(f"net.tcp.port[{port}]")
-
-        if nic_list:
-            for nic in nic_list:
-                params.append(f"net.if.in[{nic},bytes]")
-                params.append(f"net.if.out[{nic},bytes]")
-
-        ret = {}
-
-        for p in params:
-            str_val = CheckZabbix._get_zabbix_param(p, zabbix_host, zabbix_port)
-            if str_val is None:
-                ret[p] = None
-            else:
-                try:
-                    ret[p] = int(str_val)
-                except ValueError:
-                    try:
-                        ret[p] = float(str_val)
-                    except ValueError:
-                        if str_val.startswith('ZBX_NOTSUPPORTED'):
-                            err_text = str_val.split('\x00')[1]
-                            logging.error(f"zabbix error: {err_text}")
-                        ret[p] = None
-
-        return ret
-
-    @staticmethod
-    def _get_zabbix_param(param, zabbix_host, zabbix_port=10050):
-        try:
-            client_socket = socket.socket()
-            client_socket.connect((zabbix_host, zabbix_port))
-
-            request = (param + "\n").encode()
-            packet = b"ZBXD\1" + struct.pack("<Q", len(request)) + request
-
-            client_socket.send(packet)
-            data = client_socket.recv(1024)
-            hdr = data[0:5]
-            if hdr != b"ZBXD\1":
-                logging.warning(f"incorrect header {hdr}")
-                return None
-            # rlenp = data[5:5+8]
-            # rlen = struct.unpack("<Q", rlenp)[0]
-            # print(f"hdr={hdr} len={rlen}")
-            content = data[5+8:].decode()
-
-            logging.debug(f'{param}={content}')
-            client_socket.close()
-
-            return content
-        except OSError as error:
-            logging.error(f"failed to connect to zabbix at {zabbix_host}: {str(error)}")
-
-            return None
-
-
-class CheckServicePortOpenZabbix(AbstractCheck):
-
-    def __init__(self, obj_name: str, status_acc: OverallStatusAccumulator,
-                 hostname: str, port: Union[str, int], alarm_sender: AlarmSender = None,
-                 restart_notification_manager: RestartNotificationManager = None,
-                 check_repeat_interval: int = AbstractCheck.DEFAULT_CHECK_REPEAT_INTERVAL,
-                 resend_threshold: int = AbstractCheck.DEFAULT_RESEND_THRESHOLD):
-        super().__init__(obj_name, status_acc, alarm_sender, restart_notification_manager, check_repeat_interval,
-                         resend_threshold)
-        self.hostname = hostname
-        self.port = port
-
-    def do_check(self, **kwargs):
-        if not self.shall_repeat():
-            if self.get_last_status() != AbstractCheck.CheckResult.POSITIVE:
-                self.status_acc.fail()
-            return self.last_return_value
-
-        self._report_check()
-
-        self._update_exec_time()
-
-        zab_stats = kwargs.get('zab_stats')
-        port_status = zab_stats.get(f"net.tcp.port[{self.port}]", None)
-        if port_status != 1:
-            planned = self.restart_notification_manager.check_notification_present(
-                self.obj_name, 'service', datetime.datetime.now())
-            severity = AlarmSeverity.INFO if planned else AlarmSeverity.ALARM
-            planned = 'as planned' if planned else 'UNPLANNED'
-
-            logging.warning(f"service {self.obj_name} port {self.port} (zabbix check) is DOWN ({planned})")
-            self._send_smart_alarm(f"service {self.obj_name} "
-                                   f"zabbix check: port {self.port} is not open ({planned})",
-                                   severity)
-            self._set_status(AbstractCheck.CheckResult.NEGATIVE)
-            self.last_return_value = None
-            self.status_acc.fail()
-            return self.last_return_value
-        if port_status is None:
-            logging.warning(f"service {self.obj_name}:{self.port} is not monitored by zabbix")
-            self.status_acc.fail()
-            self.last_return_value = False
-            self._set_status(AbstractCheck.CheckResult.EXEC_FAILURE)
-            return self.last_return_value
-
-        self._set_status(AbstractCheck.CheckResult.POSITIVE)
-        self.last_return_value = True
-        return self.last_return_value
-
-
-class CheckDiskSpaceIsOkZabbix(AbstractCheck):
-
-    def __init__(self,
-                 obj_name: str,
-                 status_acc: OverallStatusAccumulator,
-                 mount_point: str,
-                 threshold: float = None,
-                 alarm_sender: AlarmSender = None,
-                 restart_notification_manager: RestartNotificationManager = None,
-                 check_repeat_interval: int = AbstractCheck.DEFAULT_CHECK_REPEAT_INTERVAL,
-                 resend_threshold: int = AbstractCheck.DEFAULT_RESEND_THRESHOLD):
-        super().__init__(obj_name, status_acc, alarm_sender, restart_notification_manager, check_repeat_interval,
-                         resend_threshold)
-        self.mount_point = mount_point
-        default_disk_usage_threshold = float(os.getenv("DEFAULT_DISK_USAGE_THRESHOLD", "80"))
-        self.threshold = threshold if threshold is not None else default_disk_usage_threshold
-
-    def do_check(self, **kwargs):
-        if not self.shall_repeat():
-            if self.get_last_status() != AbstractCheck.CheckResult.POSITIVE:
-                self.status_acc.fail()
-            return self.last_return_value
-
-        self._report_check()
-
-        self._update_exec_time()
-
-        disk_usage_perc = kwargs.get('disk_usage_perc')
-
-        if disk_usage_perc is not None and self.is_disk_usage_too_high(disk_usage_perc):
-            logging.warning(f"service {self.obj_name} disk {self.mount_point} "
-                            f"usage is too high ({disk_usage_perc:.2f}%)")
-
-            self._set_status(AbstractCheck.CheckResult.NEGATIVE)
-
-            self._send_smart_alarm(
-                f"container {self.obj_name} disk {self.mount_point} "
-                f"usage is too high ({disk_usage_perc:.2f}%)",
-                AlarmSeverity.ALARM)
-
-            self.status_acc.fail()
-            self.last_return_value = False
-        else:
-            self._set_status(AbstractCheck.CheckResult.POSITIVE)
-
-            self.last_return_value = True
-            self.status_acc.fail()
-
-        return self.last_return_value
-
-    def is_disk_usage_too_high(self, usage_percentage):
-        if usage_percentage > self.threshold:
-            return True
-
-        return False
+        return ["-u", f"{self.username}:{self.password}"]
 
 
 class CheckServicePortOpenWithNmap(AbstractCheck):
@@ -384,6 +131,7 @@ class CheckServicePortOpen(AbstractCheck):
         self._update_exec_time()
 
         docker_client = kwargs.get('docker_client')
+        probe_manager: ProbeManager = kwargs.get('probe_manager')
         if docker_client is None:
             self._set_status(AbstractCheck.CheckResult.EXEC_FAILURE)
             self.last_return_value = None
@@ -394,9 +142,7 @@ class CheckServicePortOpen(AbstractCheck):
         hostname = self.hostname
 
         try:
-            docker_client.containers.run("busybox:latest",
-                                         f"nc -zw10 {hostname} {port}",
-                                         remove=True)
+            probe_manager.run(docker_client, ProbeManager.BUSYBOX_IMAGE, f"nc -zw10 {hostname} {port}")
             logging.debug(f"port {port} is open on {hostname}")
             self._set_status(AbstractCheck.CheckResult.POSITIVE)
             self.last_return_value = True
@@ -426,6 +172,70 @@ class CheckServicePortOpen(AbstractCheck):
             return self.last_return_value
 
 
+class CheckServicePortOpenDirect(CheckServicePortOpen):
+
+    def do_check(self, **kwargs):
+        if not self.shall_repeat():
+            if self.get_last_status() != AbstractCheck.CheckResult.POSITIVE:
+                self.status_acc.fail()
+            return self.last_return_value
+
+        self._report_check()
+
+        self._update_exec_time()
+
+        # result of the TCP prober shared by all services; None if it was not probed
+        port_result: Optional[dict] = kwargs.get('port_result', None)
+
+        port = self.port
+        hostname = self.hostname
+
+        if port_result is None:
+            self._set_status(AbstractCheck.CheckResult.EXEC_FAILURE)
+            self.last_return_value = None
+            self.status_acc.fail()
+            return self.last_return_value
+
+        if port_result['state'] == TcpProber.STATE_OPEN:
+            logging.debug(f"port {port} is open on {hostname} ({port_result['latency_ms']} ms)")
+            self._set_status(AbstractCheck.CheckResult.POSITIVE)
+            self.last_return_value = True
+            return self.last_return_value
+
+        logging.debug(f"port {port} is NOT open on {hostname}: {port_result['state']}")
+        self._set_status(AbstractCheck.CheckResult.NEGATIVE)
+        planned = self.restart_notification_manager.check_notification_present(
+            self.obj_name, 'service', datetime.datetime.now())
+        severity = AlarmSeverity.INFO if planned else AlarmSeverity.ALARM
+        planned = 'as planned' if planned else 'UNPLANNED'
+
+        logging.warning(f"service {self.obj_name}:{port} is DOWN ({port_result['state']}, {planned})")
+        self._send_smart_alarm(f"server {self.obj_name} is "
+                               f"not responding on port {port} ({port_result['state']}, {planned})",
+                               severity)
+        self.status_acc.fail()
+        self.last_return_value = False
+        return self.last_return_value
+
+
+def get_http_timings_ms(timings: dict):
+    # curl -w style timings in seconds, each from the start of the request
+    if timings.get('time_total', None) is None:
+        return None
+    return {
+        'namelookup_ms': round(timings['time_namelookup'] * 1000.0, 2),
+        'connect_ms': round(timings['time_connect'] * 1000.0, 2),
+        'tls_ms': round(timings['time_appconnect'] * 1000.0, 2),
+        'ttfb_ms': round(timings['time_starttransfer'] * 1000.0, 2),
+        'total_ms': round(timings['time_total'] * 1000.0, 2)
+    }
+
+
+def get_http_timing_stats(endpoint_timings: list):
+    # one scalar per metric, of the slowest endpoint, so that each one has a plottable history
+    return {f'http_{metric}': max(x[metric] for x in endpoint_timings) for metric in endpoint_timings[0]}
+
+
 class CheckServiceEndpointAvailable(AbstractCheck):
 
     def __init__(self,
@@ -447,6 +257,7 @@ class CheckServiceEndpointAvailable(AbstractCheck):
         self.method = method
         self.push_data = push_data
         self.auth = auth
+        self.last_timings = None  # timings of the last request in ms
 
     def do_check(self, **kwargs):
         if not self.shall_repeat():
@@ -459,6 +270,7 @@ class CheckServiceEndpointAvailable(AbstractCheck):
         self._update_exec_time()
 
         docker_client = kwargs.get('docker_client')
+        probe_manager: ProbeManager = kwargs.get('probe_manager')
         if docker_client is None:
             self._set_status(AbstractCheck.CheckResult.EXEC_FAILURE)
             self.last_return_value = None
@@ -466,55 +278,50 @@ class CheckServiceEndpointAvailable(AbstractCheck):
             return self.last_return_value
 
         url = self.endpoint['url']
-        auth_curl_param = self.auth.get_curl_params() if self.auth else ''
-        push_data = ''
-        extra_curl_params = self.endpoint.get('extra_curl_params', '')
-        extra_headers = self.endpoint.get('extra_headers', {})
-        extra_headers_str = ''
-        for eh_name, eh_value in extra_headers.items():
-            if extra_headers_str != '':
-                extra_headers_str += ' '
-            extra_headers_str += f'-H "{eh_name}: {eh_value}"'
-        if self.push_data:
-            push_data = f'-d {shlex.quote(self.push_data)}'
-        try:
-            logs = docker_client.containers.run("curlimages/curl",
-                                                f"-v -s -L -X {self.method} {extra_headers_str} {push_data} {auth_curl_param} {extra_curl_params} {url}",
-                                                remove=True, stdout=True, stderr=True)
-            logs = logs.decode('utf-8').split("\n")
-            pattern = re.compile(r'^< HTTP/[0-9.]+\s+(\d+)\s+.*$')
-            http_code = None
-            # in case of 30x redirect, first the 30x code will be printed
-            # to get the actual HTTP response code we need to parse the whole output and get the last one
-            for line in logs:
-                m = pattern.match(line)
-                if m:
-                    http_code = int(m.group(1))
-                    break
-
-            if http_code and http_code in self.exp_code:
-                logging.debug(f"endpoint {url} is ok")
-                self._set_status(AbstractCheck.CheckResult.POSITIVE)
-                self.last_return_value = True
-                return self.last_return_value
-            logging.debug(f"endpoint {url} responded with unexpected HTTP code {http_code}")
-            self._set_status(AbstractCheck.CheckResult.NEGATIVE)
-            self.last_return_value = False
-            self.status_acc.fail()
-            return self.last_return_value
-        except docker.errors.ContainerError as err:  # non-zero exist status = failure
-            logging.error(f"error - non-zero curl exit status: {err}")
-            self._set_status(AbstractCheck.CheckResult.NEGATIVE)
-            self.last_return_value = False
-            self.status_acc.fail()
-            return self.last_return_value
-        except docker.errors.DockerException as err:
-            logging.error(f"error when running curl in container: {err}")
+
+        # result of the batched curl run on the docker host; requested here if it was not run
+        curl_result = kwargs.get('curl_result', None)
+        if curl_result is None:
+            try:
+                curl_result = run_curl_batch(probe_manager, docker_client, [self.get_curl_args()])[0]
+            except docker.errors.DockerException as err:
+                curl_result = {'http_code': None, 'error': str(err), 'exec_failure': True}
+
+        self.last_timings = get_http_timings_ms(curl_result)
+
+        if curl_result.get('exec_failure', False):
+            logging.error(f"error when running curl in container: {curl_result['error']}")
             self._set_status(AbstractCheck.CheckResult.EXEC_FAILURE)
             self.last_return_value = None
             self.status_acc.fail()
             return self.last_return_value
 
+        http_code = curl_result['http_code']
+        if http_code and http_code in self.exp_code:
+            logging.debug(f"endpoint {url} is ok")
+            self._set_status(AbstractCheck.CheckResult.POSITIVE)
+            self.last_return_value = True
+            return self.last_return_value
+        if curl_result['error']:
+            logging.error(f"error requesting {url}: {curl_result['error']}")
+        else:
+            logging.debug(f"endpoint {url} responded with unexpected HTTP code {http_code}")
+        self._set_status(AbstractCheck.CheckResult.NEGATIVE)
+        self.last_return_value = False
+        self.status_acc.fail()
+        return self.last_return_value
+
+    def get_curl_args(self):
+        args = ["-L", "-X", self.method]
+        for eh_name, eh_value in self.endpoint.get('extra_headers', {}).items():
+            args += ["-H", f"{eh_name}: {eh_value}"]
+        if self.push_data:
+            args += ["-d", self.push_data]
+        if self.auth:
+            args += self.auth.get_curl_params()
+        args += shlex.split(self.endpoint.get('extra_curl_params', ''))
+        return args + [self.endpoint['url']]
+
 
 class CheckServiceEndpointAvailableDirect(AbstractCheck):
 
@@ -537,6 +344,7 @@ class CheckServiceEndpointAvailableDirect(AbstractCheck):
         self.method = method
         self.push_data = push_data
         self.auth = auth
+        self.last_timings = None  # timings of the last request in ms
 
     def do_check(self, **kwargs):
         if not self.shall_repeat():
@@ -550,29 +358,44 @@ class CheckServiceEndpointAvailableDirect(AbstractCheck):
 
         url = self.endpoint['url']
 
-        extra_headers = self.endpoint.get('extra_headers', {})
+        # result of the request run by the HTTP check engine; requested here if it was not run
+        http_result = kwargs.get('http_result', None)
+        if http_result is None:
+            http_result = HttpCheckEngine.execute(kwargs.get('http_pool'), self.get_request())
 
-        auth = None
-        if self.auth and isinstance(self.auth, CurlBasicAuth):
-            auth = HTTPBasicAuth(self.auth.username, self.auth.password)
-        try:
-            resp = requests.request(url=url, method=self.method, auth=auth, headers=extra_headers, timeout=120, data=self.push_data)
-            if resp.status_code in self.exp_code:
-                logging.debug(f"endpoint {url} is ok")
-                self._set_status(AbstractCheck.CheckResult.POSITIVE)
-                self.last_return_value = True
-                return self.last_return_value
-            logging.debug(f"endpoint {url} responded with unexpected HTTP code {resp.status_code} {resp}")
+        resp = http_result['response']
+        self.last_timings = get_http_timings_ms(resp.timings) if resp is not None else None
+        if resp is None:
+            logging.error(f"error requesting {url}: {http_result['error']}")
             self._set_status(AbstractCheck.CheckResult.NEGATIVE)
             self.last_return_value = False
             self.status_acc.fail()
             return self.last_return_value
-        except (ConnectionError, requests.exceptions.RequestException) as err:
-            logging.error(f"error requesting {url}: {err}")
-            self._set_status(AbstractCheck.CheckResult.NEGATIVE)
-            self.last_return_value = False
-            self.status_acc.fail()
+        if resp.status_code in self.exp_code:
+            logging.debug(f"endpoint {url} is ok")
+            self._set_status(AbstractCheck.CheckResult.POSITIVE)
+            self.last_return_value = True
             return self.last_return_value
+        logging.debug(f"endpoint {url} responded with unexpected HTTP code {resp.status_code} {resp}")
+        self._set_status(AbstractCheck.CheckResult.NEGATIVE)
+        self.last_return_value = False
+        self.status_acc.fail()
+        return self.last_return_value
+
+    def get_request(self):
+        auth = None
+        if self.auth and isinstance(self.auth, CurlBasicAuth):
+            auth = HTTPBasicAuth(self.auth.username, self.auth.password)
+        return {
+            'method': self.method,
+            'url': self.endpoint['url'],
+            'connect_timeout': self.endpoint.get('connect-timeout', None),
+            'read_timeout': self.endpoint.get('read-timeout', None),
+            'retries': self.endpoint.get('retries', None),
+            'auth': auth,
+            'headers': self.endpoint.get('extra_headers', {}),
+            'data': self.push_data
+        }
 
 
 class CheckSslCertNotExpired(AbstractCheck):
@@ -599,54 +422,53 @@ class CheckSslCertNotExpired(AbstractCheck):
 
         self._update_exec_time()
 
-        try:
-            src = urllib.parse.urlparse(self.url)
-            if src.scheme != "https":
-                self._set_status(AbstractCheck.CheckResult.POSITIVE)
-                self.last_return_value = True
-                return self.last_return_value
-            port = src.port if src.port is not None else 443
-            certificate = ssl.get_server_certificate((src.hostname, port))
-            x509_cert = OpenSSL.crypto.load_certificate(OpenSSL.crypto.FILETYPE_PEM, certificate)
-            not_after_str = x509_cert.get_notAfter().decode("utf-8")
-            not_after = datetime.datetime.strptime(not_after_str, '%Y%m%d%H%M%S%z').date()
-            expires_in = not_after - datetime.datetime.now().date()
-            if expires_in < datetime.timedelta(days=self.old_certif_days_to_warn):
-                logging.warning(f"certificate on {self.url} is expiring in {expires_in}")
-                self._set_status(AbstractCheck.CheckResult.NEGATIVE)
-                self.last_return_value = False
-                self.status_acc.fail()
-                planned = self.restart_notification_manager.check_notification_present(
-                    self.obj_name, 'service', datetime.datetime.now())
-                severity = AlarmSeverity.INFO if planned else AlarmSeverity.ALARM
-                planned = 'as planned' if planned else 'UNPLANNED'
-
-                logging.warning(f"service {self.obj_name} endpoint {self.url} is DOWN ({planned})")
-                self._send_smart_alarm(f"service {self.obj_name} "
-                                       f"endpoint {self.url} is not functioning ({planned})",
-                                       severity)
-                return self.last_return_value
+        src = urllib.parse.urlparse(self.url)
+        if src.scheme != "https":
             self._set_status(AbstractCheck.CheckResult.POSITIVE)
             self.last_return_value = True
             return self.last_return_value
-        except ConnectionError as err:
-            logging.error(f"failed to retrieve certificate from {self.url}: {str(err)}")
-            self._set_status(AbstractCheck.CheckResult.EXEC_FAILURE)
-            self.status_acc.fail()
-            self.last_return_value = None
-            return self.last_return_value
-        except socket.gaierror as err:
-            logging.error(f"failed to retrieve certificate from {self.url}: {str(err)}")
+
+        # certificates of all endpoints are fetched by the inventory before the checks run
+        ssl_inventory: SslInventory = kwargs.get('ssl_inventory')
+        target = CheckSslCertNotExpired.get_target(self.url)
+        entry = ssl_inventory.get(*target)
+        if entry is None:
+            ssl_inventory.refresh([target])
+            entry = ssl_inventory.get(*target)
+        if entry['error'] is not None:
+            logging.error(f"failed to retrieve certificate from {self.url}: {entry['error']}")
             self._set_status(AbstractCheck.CheckResult.EXEC_FAILURE)
             self.status_acc.fail()
             self.last_return_value = None
             return self.last_return_value
-        except ssl.SSLError as err:
-            logging.error(f"failed to retrieve certificate from {self.url}: {str(err)}")
-            self._set_status(AbstractCheck.CheckResult.EXEC_FAILURE)
+
+        expires_in = entry['not_after'].date() - datetime.datetime.now().date()
+        if expires_in < datetime.timedelta(days=self.old_certif_days_to_warn):
+            logging.warning(f"certificate on {self.url} is expiring in {expires_in}")
+            self._set_status(AbstractCheck.CheckResult.NEGATIVE)
+            self.last_return_value = False
             self.status_acc.fail()
-            self.last_return_value = None
+            planned = self.restart_notification_manager.check_notification_present(
+                self.obj_name, 'service', datetime.datetime.now())
+            severity = AlarmSeverity.INFO if planned else AlarmSeverity.ALARM
+            planned = 'as planned' if planned else 'UNPLANNED'
+
+            logging.warning(f"service {self.obj_name} endpoint {self.url} is DOWN ({planned})")
+            self._send_smart_alarm(f"service {self.obj_name} "
+                                   f"endpoint {self.url} is not functioning ({planned})",
+                                   severity)
             return self.last_return_value
+        self._set_status(AbstractCheck.CheckResult.POSITIVE)
+        self.last_return_value = True
+        return self.last_return_value
+
+    @staticmethod
+    def get_target(url):
+        # (host, port) of an https URL, None for other schemes
+        src = urllib.parse.urlparse(url)
+        if src.scheme != "https":
+            return None
+        return src.hostname, src.port if src.port is not None else 443
 
 
 class WebServiceChecker(AbstractChecker):
@@ -659,10 +481,18 @@ class WebServiceChecker(AbstractChecker):
     CHECK_ZABBIX = "check_zabbix"
 
     def __init__(self, config, mongo_db, dockers_pool: DockersPool,
-                 alarm_sender: AlarmSender, restart_notification_manager):
+                 alarm_sender: AlarmSender, restart_notification_manager, *, probe_manager: ProbeManager,
+                 zabbix_receiver: ZabbixReceiver = None):
         self.config = config
         self.mongo_db = mongo_db
         self.dockers_pool = dockers_pool
+        self.probe_manager = probe_manager
+        self.tcp_prober = TcpProber()
+        self.zabbix_client = ZabbixAgentClient()
+        self.zabbix_receiver = zabbix_receiver
+        self.rate_tracker = CounterRateTracker()
+        self.http_engine = HttpCheckEngine()
+        self.http_pool = HttpSessionPool(pool_size=self.http_engine.per_host_concurrency)
 
         self.alarm_sender = alarm_sender
         self.restart_notification_manager = restart_notification_manager
@@ -671,6 +501,7 @@ class WebServiceChecker(AbstractChecker):
         self.stop_flag = False
 
         self.old_certif_days_to_warn = int(os.getenv('EXPIRING_CERTIFICATE_WARN_DAYS', '30'))
+        self.ssl_inventory = SslInventory(self.old_certif_days_to_warn)
 
         self.checks = {}
         self.status_acc = {}
@@ -699,28 +530,37 @@ class WebServiceChecker(AbstractChecker):
                     600)  # run every 10 minutes
 
             serv_checks[WebServiceChecker.CHECK_PORT_OPEN] = {}
+            # probing from a container is only needed for hosts EaDoMo cannot reach itself
+            direct = service.get('port-check', 'direct') == 'direct'
             for port in service.get('ports', []):
                 serv_checks[WebServiceChecker.CHECK_PORT_OPEN][port] = \
-                    CheckServicePortOpen(
+                    CheckServicePortOpenDirect(
                         service_name,
                         status_acc,
                         service['hostname'],
                         port,
                         self.alarm_sender,
-                        self.restart_notification_manager)
+                        self.restart_notification_manager
+                    ) if direct else \
+                        CheckServicePortOpen(
+                            service_name,
+                            status_acc,
+                            service['hostname'],
+                            port,
+                            self.alarm_sender,
+                            self.restart_notification_manager)
 
             zabbix_cfg = service.get('zabbix', {})
+            if zabbix_cfg.get('mode', 'passive') == 'active':
+                if self.zabbix_receiver is None:
+                    logging.error(f"service {service_name} uses active zabbix agent, "
+                                  f"but the zabbix receiver is not enabled (ZABBIX_RECEIVER_PORT)")
+                else:
+                    # told to the active agent when it asks for its checks
+                    self.zabbix_receiver.set_items(zabbix_cfg.get('host', service['hostname']),
+                                                   CheckZabbix.get_item_keys(zabbix_cfg))
             serv_checks[WebServiceChecker.CHECK_PORT_OPEN_ZABBIX] = {}
-            # old notation, without free disk threshold
-            mount_points: List[str] = zabbix_cfg.get('mount-points', [])
-            # new notation, with free disk threshold
-            disk_free: List[str] = zabbix_cfg.get('disk-free', [])
-            mount_points_thresholds = {}
-            for df in disk_free:
-                mount_points_thresholds[df['mount']] = float(df['threshold'])
-            for df in mount_points:
-                if df not in mount_points_thresholds:
-                    mount_points_thresholds[df] = None
+            mount_points_thresholds = CheckZabbix.get_mount_points(zabbix_cfg)
             serv_checks[WebServiceChecker.CHECK_DISK_SPACE_IS_OK_ZABBIX] = {}
             for (df, thrsld) in mount_points_thresholds.items():
                 serv_checks[WebServiceChecker.CHECK_DISK_SPACE_IS_OK_ZABBIX][df] = \
@@ -732,9 +572,7 @@ class WebServiceChecker(AbstractChecker):
                         self.alarm_sender,
                         self.restart_notification_manager)
 
-            for zab_port in zabbix_cfg.get('ports', []):
-                zab_port = str(zab_port).replace(':', ',')
-                zab_port = ',' + zab_port if ',' not in zab_port else zab_port
+            for zab_port in CheckZabbix.get_ports(zabbix_cfg):
                 serv_checks[WebServiceChecker.CHECK_PORT_OPEN_ZABBIX][zab_port] = \
                     CheckServicePortOpenZabbix(
                         service_name,
@@ -804,19 +642,103 @@ class WebServiceChecker(AbstractChecker):
                 self.prev_service_status[service_name]['src'] \
                     = service['src']
 
-        mongo_db['service_status'].create_index([('timestamp', -1)])
+        self.status_storage = StatusTimeseriesStorage(mongo_db, 'service_status')
 
-        last_status = mongo_db['service_status'].find_one(sort=[('timestamp', -1)])
-        if last_status:
-            for obj_name in last_status.get('status', {}):
-                if obj_name in self.prev_service_status:
-                    if 'status' in last_status['status'][obj_name]:
-                        self.prev_service_status[obj_name]['status'] = last_status['status'][obj_name]['status']
+        for obj_name, prev_status in self.prev_service_status.items():
+            last_status = self.status_storage.get_last(obj_name)
+            if last_status and 'status' in last_status:
+                prev_status['status'] = last_status['status']
 
     def request_stop(self):
         self.stop_flag = True
+        self.http_pool.close()
+
+    def get_http_pool_stats(self):
+        return self.http_pool.get_stats()
+
+    def _probe_ports_directly(self):
+        # the due ports of all services are probed at once
+        targets = []
+        for service in self.config['services']:
+            for port in service.get('ports', []):
+                check = self.checks[service['name']][WebServiceChecker.CHECK_PORT_OPEN][port]
+                if isinstance(check, CheckServicePortOpenDirect) and check.shall_repeat():
+                    targets.append((service['hostname'], port))
+        return self.tcp_prober.probe(targets)
+
+    def _request_endpoints_directly(self):
+        # the requests of the due direct endpoint checks of all services run concurrently
+        requests_by_key = {}
+        for service in self.config['services']:
+            for endpoint in service.get('endpoints', []):
+                check = self.checks[service['name']][WebServiceChecker.CHECK_ENDPOINT_AVAIL][endpoint['url']]
+                if isinstance(check, CheckServiceEndpointAvailableDirect) and check.shall_repeat():
+                    requests_by_key[(service['name'], endpoint['url'])] = check.get_request()
+        return self.http_engine.run(self.http_pool, requests_by_key)
+
+    def _request_endpoints_in_docker(self):
+        # the due docker endpoint checks of all services on one docker host share one curl run
+        batches = {}
+        for service in self.config['services']:
+            for endpoint in service.get('endpoints', []):
+                check = self.checks[service['name']][WebServiceChecker.CHECK_ENDPOINT_AVAIL][endpoint['url']]
+                if isinstance(check, CheckServiceEndpointAvailable) and check.shall_repeat():
+                    host_id = self.dockers_pool.resolve_id(service.get('docker', None))
+                    batches.setdefault(host_id, (service, []))[1].append(
+                        ((service['name'], endpoint['url']), check.get_curl_args()))
+
+        results = {}
+        for service, transfers in batches.values():
+            docker_client = self._get_docker_client_for_service(service)
+            if docker_client is None:
+                continue
+            try:
+                batch_results = run_curl_batch(self.probe_manager, docker_client, [x[1] for x in transfers])
+            except docker.errors.DockerException as err:
+                batch_results = [{'http_code': None, 'error': str(err), 'exec_failure': True}] * len(transfers)
+            results.update(zip([x[0] for x in transfers], batch_results))
+        return results
+
+    def _refresh_ssl_inventory(self):
+        # the certificates of the due checks are fetched at once, each host and port only once
+        targets = []
+        for service in self.config['services']:
+            for endpoint in service.get('endpoints', []):
+                check = self.checks[service['name']][WebServiceChecker.CHECK_SSL_CERT_EXPIRATION][endpoint['url']]
+                target = CheckSslCertNotExpired.get_target(endpoint['url'])
+                if target is not None and check.shall_repeat():
+                    targets.append(target)
+        self.ssl_inventory.refresh(targets)
+
+    def get_ssl_inventory(self):
+        return self.ssl_inventory.get_inventory()
+
+    def _poll_zabbix_agents(self):
+        # the items of all due services are read from their passive agents at once; active
+        # agents push them to the receiver
+        requests_by_key = {}
+        ret = {}
+        for service in self.config['services']:
+            zabbix_cfg = service.get('zabbix', None)
+            if zabbix_cfg is None or not self.checks[service['name']][WebServiceChecker.CHECK_ZABBIX].shall_repeat():
+                continue
+            item_keys = CheckZabbix.get_item_keys(zabbix_cfg)
+            if zabbix_cfg.get('mode', 'passive') == 'active':
+                if self.zabbix_receiver is not None:
+                    ret[service['name']] = self.zabbix_receiver.get_values(
+                        zabbix_cfg.get('host', service['hostname']), item_keys)
+            else:
+                requests_by_key[service['name']] = (service['hostname'], DEFAULT_ZABBIX_AGENT_PORT, item_keys)
+        ret.update(self.zabbix_client.get_values(requests_by_key))
+        return ret
 
     def check(self):
+        self._refresh_ssl_inventory()
+        zab_values = self._poll_zabbix_agents()
+        port_results = self._probe_ports_directly()
+        http_results = self._request_endpoints_directly()
+        curl_results = self._request_endpoints_in_docker()
+
         for service in self.config['services']:
             if self.stop_flag:
                 return
@@ -839,17 +761,39 @@ class WebServiceChecker(AbstractChecker):
 
             if 'zabbix' in service:
                 stats = checks[WebServiceChecker.CHECK_ZABBIX].do_check(
-                    checks=checks,
-                    hostname=service['hostname'],
-                    zab_desc=service['zabbix'])
+                    port_checks=checks[WebServiceChecker.CHECK_PORT_OPEN_ZABBIX],
+                    disk_checks=checks[WebServiceChecker.CHECK_DISK_SPACE_IS_OK_ZABBIX],
+                    zab_desc=service['zabbix'],
+                    zab_values=zab_values.get(serv_name, {}),
+                    rate_tracker=self.rate_tracker)
 
             for port in service.get('ports', []):
-                checks[WebServiceChecker.CHECK_PORT_OPEN][port].do_check(docker_client=docker_client)
+                checks[WebServiceChecker.CHECK_PORT_OPEN][port].do_check(
+                    docker_client=docker_client, probe_manager=self.probe_manager,
+                    port_result=port_results.get((service.get('hostname', None), port), None))
+            port_stats = [{'port': port, **port_results[(service['hostname'], port)]}
+                          for port in service.get('ports', []) if (service.get('hostname', None), port) in port_results]
+            if port_stats:
+                stats = dict(stats) if stats else {}
+                stats['ports'] = port_stats
 
             for endpoint in service.get('endpoints', []):
-                checks[WebServiceChecker.CHECK_ENDPOINT_AVAIL][endpoint['url']].do_check(docker_client=docker_client)
-
-                checks[WebServiceChecker.CHECK_SSL_CERT_EXPIRATION][endpoint['url']].do_check()
+                checks[WebServiceChecker.CHECK_ENDPOINT_AVAIL][endpoint['url']].do_check(
+                    docker_client=docker_client, probe_manager=self.probe_manager, http_pool=self.http_pool,
+                    http_result=http_results.get((serv_name, endpoint['url']), None),
+                    curl_result=curl_results.get((serv_name, endpoint['url']), None))
+
+                checks[WebServiceChecker.CHECK_SSL_CERT_EXPIRATION][endpoint['url']].do_check(
+                    ssl_inventory=self.ssl_inventory)
+
+            http_timings = [checks[WebServiceChecker.CHECK_ENDPOINT_AVAIL][endpoint['url']].last_timings
+                            for endpoint in service.get('endpoints', [])
+                            if ((serv_name, endpoint['url']) in http_results
+                                or (serv_name, endpoint['url']) in curl_results)
+                            and checks[WebServiceChecker.CHECK_ENDPOINT_AVAIL][endpoint['url']].last_timings]
+            if http_timings:
+                stats = dict(stats) if stats else {}
+                stats.update(get_http_timing_stats(http_timings))
 
             if status_acc.is_ok():
                 logging.debug('all OK')
@@ -884,39 +828,16 @@ class WebServiceChecker(AbstractChecker):
         if self.mongo_db is None:
             return
 
-        rec = {
-            'timestamp': datetime.datetime.now(datetime.timezone.utc),
-            'status': self.prev_service_status
-        }
-
-        self.mongo_db['service_status'].insert_one(rec)
+        self.status_storage.store(self.prev_service_status)
 
     def get_status(self):
         return self.prev_service_status
 
     def get_status_timeseries_for_service(self, service, time_from=None):
-        if time_from is None:
-            time_from = datetime.datetime.now() - datetime.timedelta(days=1)
-
-        return list(self.mongo_db['service_status'].find({'timestamp': {'$gt': time_from}}, {
-            '_id': 0, 'timestamp': 1, f'status.{service}.status': 1},
-                                            sort=[('timestamp', 1)]))
+        return self.get_entity_timeseries(service, 'status', time_from)
 
     def get_stats_for_service(self, service, stat, time_from=None):
-        if time_from is None:
-            time_from = datetime.datetime.now() - datetime.timedelta(days=1)
-
-        return list(self.mongo_db['service_status'].find({'timestamp': {'$gt': time_from}}, {
-            '_id': 0, 'timestamp': 1, f'status.{service}.stats.{stat}': 1},
-                                            sort=[('timestamp', 1)]))
-
-    def get_status_timeseries(self, time_from=None):
-        if time_from is None:
-            time_from = datetime.datetime.now() - datetime.timedelta(days=1)
-
-        return list(self.mongo_db['service_status'].find({'timestamp': {'$gt': time_from}}, {
-            '_id': 0, 'timestamp': 1, 'status.$': 1},
-                                            sort=[('timestamp', 1)]))
+        return self.get_entity_timeseries(service, f'stats.{stat}', time_from)
 
     def _get_docker_client_for_service(self, cont_config):
         docker_id = cont_config.get('docker', None)
@@ -0,0 +1,231 @@
+import datetime
+import logging
+import os
+import time
+from typing import List, Union
+
+from alarms.alarm import AlarmSeverity
+from alarms.alarm import AlarmSender
+from checkers.check import AbstractCheck, OverallStatusAccumulator
+from utils.counter_rates import CounterRateTracker
+from utils.restart_notification_manager import RestartNotificationManager
+from utils.zabbix_protocol import parse_value
+
+
+class CheckZabbix(AbstractCheck):
+    def do_check(self, **kwargs):
+        if not self.shall_repeat():
+            return self.last_return_value
+
+        self._report_check()
+
+        self._update_exec_time()
+
+        port_checks: dict[str: AbstractCheck] = kwargs.get("port_checks")
+        disk_checks: dict[str: AbstractCheck] = kwargs.get("disk_checks")
+        zab_desc: dict = kwargs.get("zab_desc")
+        # item values read from the agent by the caller, as returned by the agent
+        zab_values: dict = kwargs.get("zab_values")
+        rate_tracker: CounterRateTracker = kwargs.get("rate_tracker", None)
+
+        mount_points = CheckZabbix.get_mount_points(zab_desc)
+        nic_list: List[str] = zab_desc.get('nic', [])
+        ports = CheckZabbix.get_ports(zab_desc)
+
+        zab_stats = {item_key: parse_value(zab_values.get(item_key, None))
+                     for item_key in CheckZabbix.get_item_keys(zab_desc)}
+
+        for port in ports:
+            port_checks[port].do_check(zab_stats=zab_stats)
+
+        disk_stat = []
+        for mount_point in mount_points:
+            disk_total = zab_stats['vfs.fs.size[' + mount_point + ',total]']
+            disk_free = zab_stats['vfs.fs.size[' + mount_point + ',free]']
+            if disk_total is not None and disk_free is not None:
+                disk_used = disk_total - disk_free
+                disk_usage_perc = 100.0 * disk_used / disk_total
+                disk_stat.append({
+                    'mount_point': mount_point,
+                    'total_bytes': disk_total,
+                    'used_bytes': disk_used,
+                    'usage_percentage': disk_usage_perc
+                })
+                disk_checks[mount_point].do_check(disk_usage_perc=disk_usage_perc)
+
+        network_sent_bytes = 0
+        network_rcvd_bytes = 0
+        for nic in nic_list:
+            bytes_in = zab_stats[f'net.if.in[{nic},bytes]']
+            bytes_out = zab_stats[f'net.if.out[{nic},bytes]']
+            network_rcvd_bytes += bytes_in if bytes_in else 0
+            network_sent_bytes += bytes_out if bytes_out else 0
+
+        # the series keep the meaning they always had for Zabbix hosts, unlike the container
+        # statistics of the same names: the load average as CPU usage, the total and free memory,
+        # the share of free memory and the block I/O in sectors
+        mem_usage_percent = 100.0 * zab_stats['vm.memory.size[free]'] / zab_stats['vm.memory.size'] \
+            if zab_stats['vm.memory.size[free]'] is not None and zab_stats['vm.memory.size'] \
+            else None
+
+        self.last_return_value = {
+            'cpu_usage_percent': zab_stats['system.cpu.load'],
+            'memory_usage_bytes': zab_stats['vm.memory.size'],
+            'memory_available_bytes': zab_stats['vm.memory.size[free]'],
+            'memory_usage_percent': mem_usage_percent,
+            'pids': zab_stats['proc.num'],
+            'network_received_bytes': network_rcvd_bytes,
+            'network_sent_bytes': network_sent_bytes,
+            'blkio_written_bytes': zab_stats['vfs.dev.write[all,sectors]'],
+            'blkio_read_bytes': zab_stats['vfs.dev.read[all,sectors]'],
+            'uptime_seconds': zab_stats['system.uptime'],
+            'disk_usage': disk_stat
+        }
+        if rate_tracker is not None:
+            # a reboot of the host is noticed as counters going down
+            rate_tracker.add_rates(self.obj_name, self.last_return_value, time.time())
+
+        return self.last_return_value
+
+    @staticmethod
+    def get_mount_points(zab_desc):
+        # mount point -> free disk threshold; the old notation (mount-points) has no threshold
+        mount_points_thresholds = {}
+        for df in zab_desc.get('disk-free', []):
+            mount_points_thresholds[df['mount']] = float(df['threshold'])
+        for df in zab_desc.get('mount-points', []):
+            if df not in mount_points_thresholds:
+                mount_points_thresholds[df] = None
+        return mount_points_thresholds
+
+    @staticmethod
+    def get_ports(zab_desc):
+        # ports in the notation of net.tcp.port: [ip],port
+        ports = [str(x).replace(':', ',') for x in zab_desc.get('ports', [])]
+        return [',' + x if ',' not in x else x for x in ports]
+
+    @staticmethod
+    def get_item_keys(zab_desc):
+        item_keys = ["vm.memory.size", "vm.memory.size[free]", "proc.num",
+                     "system.cpu.load",
+                     "system.uptime",
+                     "vfs.dev.read[all,sectors]", "vfs.dev.write[all,sectors]"]
+
+        for mp in CheckZabbix.get_mount_points(zab_desc):
+            item_keys.append(f"vfs.fs.size[{mp},total]")
+            item_keys.append(f"vfs.fs.size[{mp},free]")
+
+        for port in CheckZabbix.get_ports(zab_desc):
+            item_keys.append(f"net.tcp.port[{port}]")
+
+        for nic in zab_desc.get('nic', []):
+            item_keys.append(f"net.if.in[{nic},bytes]")
+            item_keys.append(f"net.if.out[{nic},bytes]")
+
+        return list(dict.fromkeys(item_keys))
+
+
+class CheckServicePortOpenZabbix(AbstractCheck):
+
+    def __init__(self, obj_name: str, status_acc: OverallStatusAccumulator,
+                 hostname: str, port: Union[str, int], alarm_sender: AlarmSender = None,
+                 restart_notification_manager: RestartNotificationManager = None,
+                 check_repeat_interval: int = AbstractCheck.DEFAULT_CHECK_REPEAT_INTERVAL,
+                 resend_threshold: int = AbstractCheck.DEFAULT_RESEND_THRESHOLD):
+        super().__init__(obj_name, status_acc, alarm_sender, restart_notification_manager, check_repeat_interval,
+                         resend_threshold)
+        self.hostname = hostname
+        self.port = port
+
+    def do_check(self, **kwargs):
+        if not self.shall_repeat():
+            if self.get_last_status() != AbstractCheck.CheckResult.POSITIVE:
+                self.status_acc.fail()
+            return self.last_return_value
+
+        self._report_check()
+
+        self._update_exec_time()
+
+        zab_stats = kwargs.get('zab_stats')
+        port_status = zab_stats.get(f"net.tcp.port[{self.port}]", None)
+        if port_status is None:
+            logging.warning(f"service {self.obj_name}:{self.port} is not monitored by zabbix")
+            self.status_acc.fail()
+            self.last_return_value = False
+            self._set_status(AbstractCheck.CheckResult.EXEC_FAILURE)
+            return self.last_return_value
+        if port_status != 1:
+            planned = self.restart_notification_manager.check_notification_present(
+                self.obj_name, 'service', datetime.datetime.now())
+            severity = AlarmSeverity.INFO if planned else AlarmSeverity.ALARM
+            planned = 'as planned' if planned else 'UNPLANNED'
+
+            logging.warning(f"service {self.obj_name} port {self.port} (zabbix check) is DOWN ({planned})")
+            self._send_smart_alarm(f"service {self.obj_name} "
+                                   f"zabbix check: port {self.port} is not open ({planned})",
+                                   severity)
+            self._set_status(AbstractCheck.CheckResult.NEGATIVE)
+            self.last_return_value = None
+            self.status_acc.fail()
+            return self.last_return_value
+
+        self._set_status(AbstractCheck.CheckResult.POSITIVE)
+        self.last_return_value = True
+        return self.last_return_value
+
+
+class CheckDiskSpaceIsOkZabbix(AbstractCheck):
+
+    def __init__(self,
+                 obj_name: str,
+                 status_acc: OverallStatusAccumulator,
+                 mount_point: str,
+                 threshold: float = None,
+                 alarm_sender: AlarmSender = None,
+                 restart_notification_manager: RestartNotificationManager = None,
+                 check_repeat_interval: int = AbstractCheck.DEFAULT_CHECK_REPEAT_INTERVAL,
+                 resend_threshold: int = AbstractCheck.DEFAULT_RESEND_THRESHOLD):
+        super().__init__(obj_name, status_acc, alarm_sender, restart_notification_manager, check_repeat_interval,
+                         resend_threshold)
+        self.mount_point = mount_point
+        default_disk_usage_threshold = float(os.getenv("DEFAULT_DISK_USAGE_THRESHOLD", "80"))
+        self.threshold = threshold if threshold is not None else default_disk_usage_threshold
+
+    def do_check(self, **kwargs):
+        if not self.shall_repeat():
+            if self.get_last_status() != AbstractCheck.CheckResult.POSITIVE:
+                self.status_acc.fail()
+            return self.last_return_value
+
+        self._report_check()
+
+        self._update_exec_time()
+
+        disk_usage_perc = kwargs.get('disk_usage_perc')
+
+        if disk_usage_perc is not None and self.is_disk_usage_too_high(disk_usage_perc):
+            logging.warning(f"service {self.obj_name} disk {self.mount_point} "
+                            f"usage is too high ({disk_usage_perc:.2f}%)")
+
+            self._set_status(AbstractCheck.CheckResult.NEGATIVE)
+
+            self._send_smart_alarm(
+                f"container {self.obj_name} disk {self.mount_point} "
+                f"usage is too high ({disk_usage_perc:.2f}%)",
+                AlarmSeverity.ALARM)
+
+            self.status_acc.fail()
+            self.last_return_value = False
+        else:
+            self._set_status(AbstractCheck.CheckResult.POSITIVE)
+
+            self.last_return_value = True
+
+        return self.last_return_value
+
+    def is_disk_usage_too_high(self, usage_percentage):
+        if usage_percentage > self.threshold:
+            return True
+
+        return False
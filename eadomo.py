@@ -5,12 +5,8 @@ import json
 import logging
 import os
 import sys
-import threading
 
-import time
-import traceback
 from functools import wraps
-from typing import List
 from json import JSONEncoder
 
 import docker
@@ -30,14 +26,18 @@ from alarms.alarm_history import AlarmHistory
 from alarms.composite_alarm import CompositeAlarmSender
 from alarms.slack_alarm import SlackAlarmSender
 from alarms.telegram_alarm import TelegramAlarmSender
+from checkers.check_scheduler import CheckScheduler
 from checkers.docker_checker import DockerChecker
 from checkers.jmx_checker import JmxChecker
 from checkers.web_service_checker import WebServiceChecker
 from utils.action_runner import ActionRunner
 from utils.config import Config
+from utils.docker_events import DockerEventsMonitor
 from utils.dockers_pool import DockersPool
+from utils.probe_manager import ProbeManager
 from utils.restart_notification_manager import RestartNotificationManager
 from utils.version import __version__, __api_version__
+from utils.zabbix_receiver import ZabbixReceiver
 
 logging.basicConfig(
     format='%(asctime)s - %(module)s:%(name)s - %(filename)s:%(lineno)s - %(levelname)s - %(message)s',
@@ -107,6 +107,11 @@ class Main:
             self.mongo_db = self.mongodb_client[db_name]
 
         self.dockers_pool: DockersPool = DockersPool(self.config)
+        self.docker_events_monitor = DockerEventsMonitor(self.dockers_pool)
+        self.probe_manager = ProbeManager()
+
+        zabbix_receiver_port = os.getenv("ZABBIX_RECEIVER_PORT", None)
+        self.zabbix_receiver = ZabbixReceiver(int(zabbix_receiver_port)) if zabbix_receiver_port else None
 
         self.log_alarm = AlarmHistory(self.mongo_db)
         self.telegram_alarm = TelegramAlarmSender()
@@ -121,53 +126,34 @@ class Main:
 
         self.jmx_checker = JmxChecker(self.config, self.mongo_db, self.dockers_pool,
                                       self.composite_alarm,
-                                      self.restart_notification_manager)
+                                      self.restart_notification_manager,
+                                      events_monitor=self.docker_events_monitor)
         self.docker_checker = DockerChecker(self.config, self.mongo_db, self.dockers_pool,
                                             self.composite_alarm,
-                                            self.restart_notification_manager)
+                                            self.restart_notification_manager,
+                                            probe_manager=self.probe_manager,
+                                            events_monitor=self.docker_events_monitor)
         self.web_service_checker = WebServiceChecker(self.config, self.mongo_db,
                                                      self.dockers_pool,
                                                      self.composite_alarm,
-                                                     self.restart_notification_manager)
+                                                     self.restart_notification_manager,
+                                                     probe_manager=self.probe_manager,
+                                                     zabbix_receiver=self.zabbix_receiver)
 
         self.checkers = []
         self.checkers.append(self.jmx_checker)
         self.checkers.append(self.docker_checker)
         self.checkers.append(self.web_service_checker)
 
-        self.num_threads = len(self.checkers)
-        self.threads: List[threading.Thread]
-        self.threads = self.num_threads * [None]
-        for i in range(0, self.num_threads):
-            thread: threading.Thread
-            thread = threading.Thread(
-                target=Main.one_checker_thread,
-                args=(self.checkers[i],))
-            self.threads[i] = thread
+        self.scheduler = CheckScheduler(self.checkers)
 
         self.log_alarm.push_alarm('service started', AlarmSeverity.INFO)
 
-    @staticmethod
-    def one_checker_thread(checker):
-        while not main_instance.stop_flag:
-            try:
-                checker.check()
-                checker.store_status()
-            except docker.errors.APIError as error:
-                logging.error(error)
-                traceback.print_exc()
-            except OSError as error:
-                logging.error(error)
-                traceback.print_exc()
-            except Exception as error:
-                logging.error(error)
-                traceback.print_exc()
-            time.sleep(10)
-
     def start(self):
-        thread: threading.Thread
-        for thread in self.threads:
-            thread.start()
+        self.docker_events_monitor.start()
+        if self.zabbix_receiver:
+            self.zabbix_receiver.start()
+        self.scheduler.start()
 
     def stop(self):
         self.stop_flag = True
@@ -175,21 +161,14 @@ class Main:
         for checker in self.checkers:
             checker.request_stop()
 
+        self.scheduler.stop()
+        self.docker_events_monitor.stop()
+        if self.zabbix_receiver:
+            self.zabbix_receiver.stop()
+
     def join(self, wait_time=5.0):
-        thread: threading.Thread
-        for thread in self.threads:
-            thread.join(0.001)
-
-        t_start = time.time()
-        while time.time() - t_start < wait_time:
-            has_alive = False
-            for thread in self.threads:
-                if thread.is_alive():
-                    has_alive = True
-                    break
-            if not has_alive:
-                break
-            time.sleep(0.01)
+        self.scheduler.join(wait_time)
+        self.probe_manager.stop()
 
     def get_docker_client_by_container_id(self, cont_id):
         for cont_config in self.config['blueprint']:
@@ -278,6 +257,16 @@ def print_status():
     }
 
 
+@bp.route("/ssl-certificates")
+def print_ssl_certificates():
+    return main_instance.web_service_checker.get_ssl_inventory()
+
+
+@bp.route("/http-pool-stats")
+def print_http_pool_stats():
+    return main_instance.web_service_checker.get_http_pool_stats()
+
+
 def rebin(data, num_bins, start_time=None, end_time=None, container=None):
     if len(data) == 0:
         return []
@@ -0,0 +1,264 @@
+import java.io.BufferedReader;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.InputStreamReader;
+import java.io.PrintStream;
+import java.io.UnsupportedEncodingException;
+import java.net.URLDecoder;
+import java.util.ArrayList;
+import java.util.Collections;
+import java.util.HashMap;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.Set;
+
+import javax.management.MBeanAttributeInfo;
+import javax.management.MBeanServerConnection;
+import javax.management.ObjectName;
+import javax.management.openmbean.CompositeData;
+import javax.management.remote.JMXConnector;
+import javax.management.remote.JMXConnectorFactory;
+import javax.management.remote.JMXServiceURL;
+
+/**
+ * Long-running JMX query agent: keeps the JMX connections open and answers one request per line.
+ *
+ * Request (one line, fields separated by tabs, every field URL-encoded):
+ *   url, username, password, query, query, ...
+ * where a query consists of space separated URL-encoded fields:
+ *   mbean-name attribute attribute-key metric-name metric-labels
+ * (empty fields for missing values; metric-labels as URL-encoded key=value pairs joined by &).
+ *
+ * Response (one line): the JSON array produced by JMXQuery -json, or {"error": "..."}.
+ * The agent exits when its standard input is closed.
+ */
+public class JmxQueryDaemon {
+    private final Map<String, JMXConnector> connectors = new HashMap<String, JMXConnector>();
+
+    public static void main(String[] args) throws IOException {
+        // a hanging JVM must not block the agent forever
+        System.setProperty("sun.rmi.transport.tcp.responseTimeout", "60000");
+        System.setProperty("sun.rmi.transport.connectionTimeout", "10000");
+
+        BufferedReader in = new BufferedReader(new InputStreamReader(System.in, "UTF-8"));
+        PrintStream out = new PrintStream(new FileOutputStream(FileDescriptor.out), false, "UTF-8");
+        new JmxQueryDaemon().run(in, out);
+    }
+
+    private void run(BufferedReader in, PrintStream out) throws IOException {
+        String line;
+        while ((line = in.readLine()) != null) {
+            if (line.isEmpty()) {
+                continue;
+            }
+            String response;
+            try {
+                response = handle(line);
+            } catch (Exception e) {
+                response = "{\"error\": " + quote(e.toString()) + "}";
+            }
+            out.print(response);
+            out.print('\n');
+            out.flush();
+        }
+        for (JMXConnector connector : connectors.values()) {
+            closeQuietly(connector);
+        }
+    }
+
+    private String handle(String line) throws Exception {
+        String[] fields = line.split("\t", -1);
+        if (fields.length < 3) {
+            throw new IllegalArgumentException("malformed request");
+        }
+        String url = decode(fields[0]);
+        String username = decode(fields[1]);
+        String password = decode(fields[2]);
+        List<Query> queries = new ArrayList<Query>();
+        for (int i = 3; i < fields.length; i++) {
+            if (!fields[i].isEmpty()) {
+                queries.add(Query.parse(fields[i]));
+            }
+        }
+
+        String key = url + "\t" + username;
+        try {
+            return query(connect(key, url, username, password), queries);
+        } catch (IOException e) {
+            // stale connection, e.g. the JVM was restarted: reconnect once
+            closeQuietly(connectors.remove(key));
+            return query(connect(key, url, username, password), queries);
+        }
+    }
+
+    private MBeanServerConnection connect(String key, String url, String username, String password)
+            throws IOException {
+        JMXConnector connector = connectors.get(key);
+        if (connector == null) {
+            Map<String, Object> env = new HashMap<String, Object>();
+            if (!username.isEmpty()) {
+                env.put(JMXConnector.CREDENTIALS, new String[]{username, password});
+            }
+            connector = JMXConnectorFactory.connect(new JMXServiceURL(url), env);
+            connectors.put(key, connector);
+        }
+        return connector.getMBeanServerConnection();
+    }
+
+    private String query(MBeanServerConnection connection, List<Query> queries) throws Exception {
+        StringBuilder sb = new StringBuilder("[");
+        for (Query query : queries) {
+            Set<ObjectName> names = connection.queryNames(new ObjectName(query.mbeanName), null);
+            for (ObjectName name : names) {
+                List<String> attributes;
+                if (query.attribute != null) {
+                    attributes = Collections.singletonList(query.attribute);
+                } else {
+                    attributes = new ArrayList<String>();
+                    for (MBeanAttributeInfo info : connection.getMBeanInfo(name).getAttributes()) {
+                        if (info.isReadable()) {
+                            attributes.add(info.getName());
+                        }
+                    }
+                }
+                for (String attribute : attributes) {
+                    Object value;
+                    try {
+                        value = connection.getAttribute(name, attribute);
+                    } catch (IOException e) {
+                        throw e;
+                    } catch (Exception e) {
+                        continue; // attribute not available in this mbean
+                    }
+                    if (value instanceof CompositeData) {
+                        CompositeData data = (CompositeData) value;
+                        Set<String> keys = query.attributeKey != null
+                                ? Collections.singleton(query.attributeKey) : data.getCompositeType().keySet();
+                        for (String attributeKey : keys) {
+                            if (data.containsKey(attributeKey)) {
+                                append(sb, query, name, attribute, attributeKey, data.get(attributeKey));
+                            }
+                        }
+                    } else if (query.attributeKey == null) {
+                        append(sb, query, name, attribute, null, value);
+                    }
+                }
+            }
+        }
+        return sb.append("]").toString();
+    }
+
+    private static void append(StringBuilder sb, Query query, ObjectName name, String attribute,
+                               String attributeKey, Object value) {
+        if (sb.length() > 1) {
+            sb.append(", ");
+        }
+        sb.append("{\"mBeanName\": ").append(quote(name.toString()));
+        sb.append(", \"attribute\": ").append(quote(attribute));
+        sb.append(", \"attributeType\": ").append(quote(value != null ? value.getClass().getSimpleName() : "Null"));
+        if (attributeKey != null) {
+            sb.append(", \"attributeKey\": ").append(quote(attributeKey));
+        }
+        if (query.metricName != null) {
+            sb.append(", \"metricName\": ").append(quote(query.metricName));
+        }
+        if (!query.metricLabels.isEmpty()) {
+            sb.append(", \"metricLabels\": {");
+            boolean first = true;
+            for (Map.Entry<String, String> label : query.metricLabels.entrySet()) {
+                if (!first) {
+                    sb.append(", ");
+                }
+                sb.append(quote(label.getKey())).append(": ").append(quote(label.getValue()));
+                first = false;
+            }
+            sb.append("}");
+        }
+        sb.append(", \"value\": ");
+        if (value instanceof Number || value instanceof Boolean) {
+            sb.append(value.toString());
+        } else if (value == null) {
+            sb.append("null");
+        } else {
+            sb.append(quote(value.toString()));
+        }
+        sb.append("}");
+    }
+
+    private static String quote(String s) {
+        StringBuilder sb = new StringBuilder("\"");
+        for (int i = 0; i < s.length(); i++) {
+            char c = s.charAt(i);
+            switch (c) {
+                case '"':
+                    sb.append("\\\"");
+                    break;
+                case '\\':
+                    sb.append("\\\\");
+                    break;
+                case '\n':
+                    sb.append("\\n");
+                    break;
+                case '\r':
+                    sb.append("\\r");
+                    break;
+                case '\t':
+                    sb.append("\\t");
+                    break;
+                default:
+                    if (c < 0x20) {
+                        sb.append(String.format("\\u%04x", (int) c));
+                    } else {
+                        sb.append(c);
+                    }
+            }
+        }
+        return sb.append("\"").toString();
+    }
+
+    private static String decode(String s) throws UnsupportedEncodingException {
+        return URLDecoder.decode(s, "UTF-8");
+    }
+
+    private static void closeQuietly(JMXConnector connector) {
+        if (connector == null) {
+            return;
+        }
+        try {
+            connector.close();
+        } catch (IOException e) {
+            // nothing to do, the connection is dropped anyway
+        }
+    }
+
+    private static final class Query {
+        String mbeanName;
+        String attribute;
+        String attributeKey;
+        String metricName;
+        final Map<String, String> metricLabels = new LinkedHashMap<String, String>();
+
+        static Query parse(String s) throws UnsupportedEncodingException {
+            String[] fields = s.split(" ", -1);
+            if (fields.length != 5) {
+                throw new IllegalArgumentException("malformed query " + s);
+            }
+            Query query = new Query();
+            query.mbeanName = decode(fields[0]);
+            query.attribute = fields[1].isEmpty() ? null : decode(fields[1]);
+            query.attributeKey = fields[2].isEmpty() ? null : decode(fields[2]);
+            query.metricName = fields[3].isEmpty() ? null : decode(fields[3]);
+            if (!fields[4].isEmpty()) {
+                for (String label : fields[4].split("&")) {
+                    int idx = label.indexOf('=');
+                    if (idx > 0) {
+                        query.metricLabels.put(decode(label.substring(0, idx)), decode(label.substring(idx + 1)));
+                    }
+                }
+            }
+            return query;
+        }
+    }
+}
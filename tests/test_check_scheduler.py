@@ -0,0 +1,89 @@
+import datetime
+import time
+import unittest
+
+from checkers.abstract_checker import AbstractChecker
+from checkers.check import AbstractCheck, OverallStatusAccumulator
+from checkers.check_scheduler import CheckScheduler
+
+
+class DummyCheck(AbstractCheck):
+    def do_check(self, **kwargs):
+        self._update_exec_time()
+
+
+class DummyChecker(AbstractChecker):
+    def __init__(self, checks):
+        self.checks = checks
+        self.runs = 0
+
+    def check(self):
+        # like a checker whose container has gone: none of the checks is executed
+        self.runs += 1
+
+    def store_status(self):
+        pass
+
+    def get_status(self):
+        return {}
+
+    def request_stop(self):
+        pass
+
+    def get_status_timeseries(self, time_from=None):
+        return []
+
+
+class CheckSchedulerTest(unittest.TestCase):
+    def test_stale_check_does_not_reschedule_at_min_delay(self):
+        stale = DummyCheck('removed-container', OverallStatusAccumulator())
+        stale.last_execution_time = datetime.datetime.now() - datetime.timedelta(minutes=10)
+        checker = DummyChecker({'stale': stale})
+        self.assertIsNone(checker.get_next_check_time())
+
+        scheduler = CheckScheduler([checker])
+        try:
+            scheduler._run_checker(checker)
+            due, _, _ = scheduler.queue[0]
+            self.assertGreater(due - time.monotonic(),
+                               AbstractCheck.DEFAULT_CHECK_REPEAT_INTERVAL - CheckScheduler.MIN_DELAY)
+        finally:
+            scheduler.stop()
+
+    def test_stale_check_is_ignored_next_to_executed_one(self):
+        stale = DummyCheck('removed-container', OverallStatusAccumulator())
+        stale.last_execution_time = datetime.datetime.now() - datetime.timedelta(minutes=10)
+        executed = DummyCheck('running-container', OverallStatusAccumulator(), check_repeat_interval=30)
+        executed.do_check()
+        checker = DummyChecker({'stale': stale, 'executed': {'port': executed}})
+
+        self.assertEqual(checker.get_next_check_time(), executed.get_next_execution_time())
+
+    def test_overdue_check_executed_in_run_is_due_now(self):
+        # the run took longer than the interval of a check it executed
+        run_started = datetime.datetime.now() - datetime.timedelta(seconds=20)
+        overdue = DummyCheck('slow-container', OverallStatusAccumulator(), check_repeat_interval=10)
+        overdue.last_execution_time = run_started + datetime.timedelta(seconds=5)
+        stale = DummyCheck('removed-container', OverallStatusAccumulator(), check_repeat_interval=10)
+        stale.last_execution_time = run_started - datetime.timedelta(minutes=10)
+        checker = DummyChecker({'overdue': overdue, 'stale': stale})
+
+        self.assertEqual(checker.get_next_check_time(run_started), overdue.get_next_execution_time())
+        self.assertIsNone(checker.get_next_check_time())
+
+        scheduler = CheckScheduler([checker])
+        try:
+            # the check is due again as soon as it has been executed
+            overdue.check_repeat_interval = 0
+            checker.check = overdue.do_check
+            started = time.monotonic()
+            scheduler._run_checker(checker)
+            due, _, _ = scheduler.queue[0]
+            self.assertLessEqual(due - started, CheckScheduler.MIN_DELAY + 0.5)
+            self.assertGreaterEqual(due - started, CheckScheduler.MIN_DELAY)
+        finally:
+            scheduler.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
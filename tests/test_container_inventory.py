@@ -0,0 +1,100 @@
+import datetime
+import unittest
+
+from utils.container_inventory import ContainerInventory
+from utils.docker_events import DockerEventsMonitor
+
+HOST_ID = 'host'
+
+
+class DummyDockersPool:
+    def resolve_id(self, client_id):
+        return HOST_ID if client_id is None else client_id
+
+
+class DummyObject:
+    def __init__(self, attrs):
+        self.attrs = attrs
+
+
+# the subset of the docker client used by the inventory, counting the detailed lookups
+class DummyDockerClient:
+    def __init__(self):
+        self.summaries = []
+        self.inspected = 0
+        self.image_loads = 0
+        self.api = DummyApi(self)
+        self.containers = DummyContainers(self)
+        self.images = DummyImages(self)
+
+    def set_status(self, status):
+        self.summaries = [{'Id': 'abc', 'Names': ['/app'], 'State': 'running', 'Created': 1, 'Status': status,
+                           'ImageID': 'sha256:img'}]
+
+
+class DummyApi:
+    def __init__(self, client):
+        self.client = client
+
+    def containers(self, **_):
+        return self.client.summaries
+
+
+class DummyContainers:
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, container_id):
+        self.client.inspected += 1
+        return DummyObject({'Id': container_id})
+
+
+class DummyImages:
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, image_id):
+        self.client.image_loads += 1
+        return DummyObject({'Id': image_id, 'RepoTags': [], 'RepoDigests': []})
+
+
+class ContainerInventoryTest(unittest.TestCase):
+    def setUp(self):
+        self.client = DummyDockerClient()
+
+    def get(self, inventory):
+        inventory.refresh(None, self.client)
+        return inventory.get(None, self.client, 'app')
+
+    def test_uptime_change_does_not_reload_but_health_change_does(self):
+        inventory = ContainerInventory(DummyDockersPool())
+        self.client.set_status('Up 5 seconds (health: starting)')
+        self.get(inventory)
+        self.client.set_status('Up 2 minutes (health: starting)')
+        self.get(inventory)
+        self.assertEqual(self.client.inspected, 1)
+
+        self.client.set_status('Up 3 minutes (healthy)')
+        self.get(inventory)
+        self.assertEqual(self.client.inspected, 2)
+
+    def test_image_attrs_reloaded_on_image_event(self):
+        monitor = DockerEventsMonitor(DummyDockersPool())
+        monitor.synced.add(HOST_ID)
+        inventory = ContainerInventory(DummyDockersPool(), monitor)
+        self.client.set_status('Up 5 seconds')
+        self.get(inventory)
+
+        inventory.get_image_attrs(None, self.client, 'sha256:img')
+        inventory.get_image_attrs(None, self.client, 'sha256:img')
+        self.assertEqual(self.client.image_loads, 1)
+
+        now = datetime.datetime.now().timestamp()
+        monitor._handle_event(HOST_ID, {'Type': 'image', 'Action': 'tag', 'Actor': {'ID': 'sha256:img'},
+                                        'timeNano': int(now * 1e9)}, now - 100)
+        inventory.get_image_attrs(None, self.client, 'sha256:img')
+        self.assertEqual(self.client.image_loads, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
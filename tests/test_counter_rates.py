@@ -0,0 +1,37 @@
+import unittest
+
+from utils.counter_rates import CounterRateTracker
+
+
+class CounterRateTrackerTest(unittest.TestCase):
+    def setUp(self):
+        self.tracker = CounterRateTracker(counters=['network_received_bytes'])
+
+    def rate(self, value, timestamp, instance='a'):
+        stats = self.tracker.add_rates('web', {'network_received_bytes': value}, timestamp, instance)
+        return stats['network_received_bytes_per_second']
+
+    def test_rate(self):
+        self.assertIsNone(self.rate(1000, 10.0))
+        self.assertEqual(self.rate(3000, 20.0), 200.0)
+
+    def test_same_sample_reuses_the_rates(self):
+        self.rate(1000, 10.0)
+        self.assertEqual(self.rate(3000, 20.0), 200.0)
+        self.assertEqual(self.rate(3000, 20.0), 200.0)
+        self.assertEqual(self.rate(4000, 30.0), 100.0)
+
+    def test_counter_reset(self):
+        self.rate(5000, 10.0)
+        self.assertIsNone(self.rate(100, 20.0))
+        self.assertEqual(self.rate(1100, 30.0), 100.0)
+
+    def test_instance_change(self):
+        self.rate(1000, 10.0)
+        self.assertIsNone(self.rate(2000, 20.0, instance='b'))
+        self.assertEqual(self.rate(2500, 25.0, instance='b'), 100.0)
+
+    def test_missing_counter(self):
+        self.rate(1000, 10.0)
+        stats = self.tracker.add_rates('web', {}, 20.0, 'a')
+        self.assertIsNone(stats['network_received_bytes_per_second'])
@@ -0,0 +1,59 @@
+import unittest
+
+import docker.errors
+
+from utils.curl_batch import run_curl_batch
+
+
+class DummyProbeManager:
+    def __init__(self, output, exit_code=0):
+        self.output = output
+        self.exit_code = exit_code
+        self.calls = []
+
+    def run(self, docker_client, image, command, **kwargs):
+        self.calls.append((command, kwargs))
+        if self.exit_code:
+            raise docker.errors.ContainerError(None, self.exit_code, command, image, self.output)
+        return self.output
+
+
+class CurlBatchTest(unittest.TestCase):
+    def test_results_are_split_by_url_number(self):
+        probe_manager = DummyProbeManager(
+            b'{"urlnum": 1, "http_code": 503, "exitcode": 0, "time_total": 0.2}\n'
+            b'curl: (6) could not resolve host\n'
+            b'{"urlnum": 0, "http_code": 200, "exitcode": 0, "time_namelookup": 0.01, "time_total": 0.1}\n')
+        results = run_curl_batch(probe_manager, None, [["http://a/"], ["http://b/"], ["http://c/"]])
+
+        self.assertEqual(results[0]['http_code'], 200)
+        self.assertEqual(results[0]['time_namelookup'], 0.01)
+        self.assertIsNone(results[0]['error'])
+        self.assertEqual(results[1]['http_code'], 503)
+        self.assertEqual(results[2], {'http_code': None, 'error': "no result from curl"})
+
+        command = probe_manager.calls[0][0]
+        self.assertEqual(command.count("--next"), 2)
+        self.assertEqual(command[-1], "http://c/")
+
+    def test_failed_transfer_reports_the_others(self):
+        probe_manager = DummyProbeManager(
+            b'{"urlnum": 0, "http_code": 0, "exitcode": 28, "errormsg": "Operation timed out"}\n'
+            b'{"urlnum": 1, "http_code": 200, "exitcode": 0}\n'
+            b'{"urlnum": 7, "http_code": 200, "exitcode": 0}\n'
+            b'{"urlnum": 1, broken\n', exit_code=28)
+        results = run_curl_batch(probe_manager, None, [["http://a/"], ["http://b/"]], max_time=5)
+
+        self.assertEqual(results[0]['error'], "Operation timed out")
+        self.assertIsNone(results[0]['http_code'])
+        self.assertEqual(results[1]['http_code'], 200)
+        self.assertEqual(probe_manager.calls[0][1]['timeout'], 15)
+
+    def test_no_transfers(self):
+        probe_manager = DummyProbeManager(b'')
+        self.assertEqual(run_curl_batch(probe_manager, None, []), [])
+        self.assertEqual(probe_manager.calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import datetime
+import unittest
+
+from checkers.check import OverallStatusAccumulator
+from checkers.docker_checker import CheckIfRestarted
+from utils.docker_events import DockerEventsMonitor
+
+HOST_ID = 'host'
+
+
+class DummyDockersPool:
+    def resolve_id(self, client_id):
+        return HOST_ID if client_id is None else client_id
+
+
+class DummyAlarmSender:
+    def __init__(self):
+        self.alarms = []
+
+    def push_alarm(self, message, severity):
+        self.alarms.append((message, severity))
+
+
+class DummyRestartNotificationManager:
+    def check_notification_present(self, name, obj_type, time):
+        return False
+
+
+class DummyContainer:
+    def __init__(self, started_at):
+        self.attrs = {'State': {'StartedAt': started_at}}
+
+
+def start_event(name, event_time):
+    return container_event('start', name, event_time)
+
+
+def container_event(action, name, event_time):
+    return {'Action': action, 'Actor': {'ID': 'abc', 'Attributes': {'name': name}},
+            'timeNano': int(event_time * 1e9)}
+
+
+class DockerEventsMonitorTest(unittest.TestCase):
+    def setUp(self):
+        self.monitor = DockerEventsMonitor(DummyDockersPool())
+        self.monitor.synced.add(HOST_ID)
+        now = datetime.datetime.now().timestamp()
+        self.monitor._handle_event(HOST_ID, start_event('app', now - 100), now - 200)
+
+    def test_restart_is_kept_until_consumed(self):
+        now = datetime.datetime.now().timestamp()
+        self.monitor._handle_event(HOST_ID, start_event('app', now), now - 200)
+
+        events = self.monitor.consume(None, 'app', restarts=False, transitions=False)
+        self.assertEqual(events['restarts'], 0)
+        events = self.monitor.consume(None, 'app')
+        self.assertEqual(events['restarts'], 1)
+        events = self.monitor.consume(None, 'app')
+        self.assertEqual(events['restarts'], 0)
+
+    def test_restart_between_two_due_times_is_alarmed(self):
+        alarm_sender = DummyAlarmSender()
+        check = CheckIfRestarted('app', OverallStatusAccumulator(), alarm_sender,
+                                 DummyRestartNotificationManager())
+        container = DummyContainer('2024-01-01T00:00:00Z')
+
+        def run_cycle():
+            events = self.monitor.consume(None, 'app', restarts=check.shall_repeat())
+            return check.do_check(container=container, prev_inventory=None,
+                                  restarts=events['restarts'], ooms=events['ooms'])
+
+        self.assertFalse(run_cycle())
+
+        # the container restarts while the check is not due
+        now = datetime.datetime.now().timestamp()
+        self.monitor._handle_event(HOST_ID, start_event('app', now), now - 200)
+        run_cycle()
+        self.assertEqual(alarm_sender.alarms, [])
+
+        check.last_execution_time -= datetime.timedelta(seconds=check.check_repeat_interval + 1)
+        self.assertTrue(run_cycle())
+        self.assertEqual(len(alarm_sender.alarms), 1)
+
+    def test_state_of_removed_container_is_dropped(self):
+        now = datetime.datetime.now().timestamp()
+        # not monitored by any check: dropped on removal
+        self.monitor._handle_event(HOST_ID, start_event('temporary', now - 50), now - 200)
+        self.monitor._handle_event(HOST_ID, container_event('die', 'temporary', now - 40), now - 200)
+        self.monitor._handle_event(HOST_ID, container_event('destroy', 'temporary', now - 30), now - 200)
+        self.assertIsNone(self.monitor.get_state(None, 'temporary'))
+
+        # monitored: dropped once its pending events have been consumed
+        self.monitor.consume(None, 'app')
+        self.monitor._handle_event(HOST_ID, container_event('die', 'app', now - 20), now - 200)
+        self.monitor._handle_event(HOST_ID, container_event('destroy', 'app', now - 10), now - 200)
+        self.assertEqual(self.monitor.get_state(None, 'app')['status'], 'removed')
+        events = self.monitor.consume(None, 'app', transitions=False)
+        self.assertEqual(events['transitions'], [])
+        self.assertIsNotNone(self.monitor.get_state(None, 'app'))
+        events = self.monitor.consume(None, 'app')
+        self.assertEqual([x[1] for x in events['transitions']], ['exited', 'removed'])
+        self.assertIsNone(self.monitor.get_state(None, 'app'))
+        self.assertEqual(self.monitor.states[HOST_ID], {})
+
+    def test_recreated_container_gets_new_generation(self):
+        now = datetime.datetime.now().timestamp()
+        generation = self.monitor.get_state(None, 'app')['generation']
+        self.monitor._handle_event(HOST_ID, container_event('destroy', 'app', now - 10), now - 200)
+        self.monitor._handle_event(HOST_ID, container_event('create', 'app', now - 5), now - 200)
+        self.assertNotEqual(self.monitor.get_state(None, 'app')['generation'], generation)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import threading
+import time
+import unittest
+
+import requests
+
+from utils.http_check_engine import HttpCheckEngine
+
+
+# records the highest number of concurrent requests, in total and per host
+class DummyHttpPool:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = {}
+        self.max_running = {}
+        self.max_total = 0
+
+    def request(self, method, url, **_):
+        host = url.split('/')[2]
+        with self.lock:
+            self.running[host] = self.running.get(host, 0) + 1
+            self.max_running[host] = max(self.max_running.get(host, 0), self.running[host])
+            self.max_total = max(self.max_total, sum(self.running.values()))
+        time.sleep(0.05)
+        with self.lock:
+            self.running[host] -= 1
+        if url.endswith('/broken'):
+            raise requests.exceptions.ConnectionError("refused")
+        return f"{method} {url}"
+
+
+class HttpCheckEngineTest(unittest.TestCase):
+    def test_limits_and_results(self):
+        http_pool = DummyHttpPool()
+        requests_by_key = {(host, idx): {'method': 'GET', 'url': f"http://{host}/{idx}"}
+                           for host in ('a', 'b', 'c') for idx in range(6)}
+        requests_by_key[('c', 'broken')] = {'method': 'GET', 'url': "http://c/broken"}
+
+        results = HttpCheckEngine(concurrency=5, per_host_concurrency=2).run(http_pool, requests_by_key)
+
+        self.assertEqual(list(results), list(requests_by_key))
+        self.assertEqual(results[('a', 3)], {'response': "GET http://a/3", 'error': None})
+        self.assertIsNone(results[('c', 'broken')]['response'])
+        self.assertIsInstance(results[('c', 'broken')]['error'], requests.exceptions.ConnectionError)
+        self.assertLessEqual(http_pool.max_total, 5)
+        self.assertEqual(max(http_pool.max_running.values()), 2)
+
+    def test_no_requests(self):
+        self.assertEqual(HttpCheckEngine().run(DummyHttpPool(), {}), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
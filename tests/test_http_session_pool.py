@@ -0,0 +1,93 @@
+import http.server
+import socket
+import threading
+import time
+import unittest
+
+import requests
+
+from utils.http_session_pool import HttpSessionPool
+
+
+# answers after the delay of the requested path, e.g. /slow
+class DelayedHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    delays = {'/slow': 1.0}
+    requests = []
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self._answer()
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        self._answer()
+
+    def _answer(self):
+        DelayedHandler.requests.append((self.command, self.path))
+        time.sleep(DelayedHandler.delays.get(self.path, 0))
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+class HttpSessionPoolTest(unittest.TestCase):
+    def setUp(self):
+        DelayedHandler.requests = []
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), DelayedHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://localhost:{self.server.server_address[1]}"
+        self.pool = HttpSessionPool(connect_timeout=2, read_timeout=0.3, retries=1)
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_timings_of_new_and_reused_connection(self):
+        response = self.pool.request('GET', self.url + '/')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(response.timings['time_connect'], 0.0)
+        self.assertGreaterEqual(response.timings['time_connect'], response.timings['time_namelookup'])
+        self.assertGreaterEqual(response.timings['time_total'], response.timings['time_connect'])
+
+        response = self.pool.request('GET', self.url + '/')
+        self.assertEqual(response.timings['time_namelookup'], 0.0)
+        self.assertEqual(response.timings['time_connect'], 0.0)
+        stats = self.pool.get_stats()[f"http://localhost:{self.server.server_address[1]}"]
+        self.assertEqual(stats['requests'], 2)
+        self.assertEqual(stats['connections_created'], 1)
+
+    def test_read_timeout_retried_for_idempotent_method_only(self):
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            self.pool.request('GET', self.url + '/slow')
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            self.pool.request('POST', self.url + '/slow', data=b'x')
+        self.assertEqual(DelayedHandler.requests, [('GET', '/slow'), ('GET', '/slow'), ('POST', '/slow')])
+
+    def test_refused_connection_is_retried(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as unused:
+            unused.bind(('127.0.0.1', 0))
+            port = unused.getsockname()[1]
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.pool.request('POST', f"http://127.0.0.1:{port}/")
+        stats = self.pool.get_stats()[f"http://127.0.0.1:{port}"]
+        self.assertEqual(stats['retried'], 1)
+        self.assertEqual(stats['failed'], 1)
+
+    def test_retries_end_at_deadline(self):
+        pool = HttpSessionPool(connect_timeout=0.1, read_timeout=0.3, retries=5)
+        start = time.monotonic()
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            pool.request('GET', self.url + '/slow')
+        pool.close()
+        # one attempt, no retry fits before the deadline of 0.4 s
+        self.assertLess(time.monotonic() - start, 0.8)
+        self.assertEqual(len(DelayedHandler.requests), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
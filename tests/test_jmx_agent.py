@@ -0,0 +1,93 @@
+import unittest
+
+import jmxquery
+
+from utils.jmx_agent import JmxAgent, JmxAgentUnavailable, load_metrics
+
+METRIC = '[{"mBeanName": "java.lang:type=Memory", "attribute": "HeapMemoryUsage", "attributeKey": "used", ' \
+         '"value": 42, "attributeType": "Long"}]'
+
+
+# agent process simulated in memory: each written request is answered by the next response;
+# None means no answer, an exception is raised when the request is written
+class FakeProcessAgent(JmxAgent):
+    def __init__(self, responses, unavailable_reason=None):
+        super().__init__()
+        self.responses = responses
+        self.unavailable_reason = unavailable_reason
+        self.pending = b''
+        self.starts = 0
+        self.requests = []
+
+    def _start(self):
+        self.starts += 1
+
+    def _get_unavailable_reason(self):
+        return self.unavailable_reason
+
+    def _write(self, data: bytes):
+        self.requests.append(data)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        if response is not None:
+            self.pending += response.encode('utf-8') + b'\n'
+
+    def _read(self, timeout):
+        data, self.pending = self.pending, b''
+        return data if data else None
+
+    def _close(self):
+        self.pending = b''
+
+
+def query():
+    return [jmxquery.JMXQuery("java.lang:type=Memory", "HeapMemoryUsage", "used")]
+
+
+class JmxAgentTest(unittest.TestCase):
+    def test_metrics_response(self):
+        agent = FakeProcessAgent([METRIC])
+        response = agent.request("service:jmx:rmi:///jndi/rmi://app:9010/jmxrmi", None, None, query(), 1)
+
+        metrics = load_metrics(response)
+        self.assertEqual(metrics[0].value, 42)
+        self.assertEqual(agent.requests[0].count(b'\t'), 3)
+
+    def test_error_response(self):
+        agent = FakeProcessAgent(['{"error": "connection refused"}', METRIC])
+        with self.assertRaisesRegex(RuntimeError, "connection refused"):
+            agent.request("uri", None, None, query(), 1)
+        # the agent itself is fine and kept running
+        agent.request("uri", None, None, query(), 1)
+        self.assertEqual(agent.starts, 1)
+
+    def test_timeout_restarts_agent(self):
+        agent = FakeProcessAgent([None, METRIC])
+        with self.assertRaisesRegex(RuntimeError, "no response"):
+            agent.request("uri", None, None, query(), 0.05)
+        self.assertTrue(agent.available)
+        agent.request("uri", None, None, query(), 1)
+        self.assertEqual(agent.starts, 2)
+
+    def test_failure_is_retried_after_backoff(self):
+        agent = FakeProcessAgent([BrokenPipeError("agent exited"), METRIC])
+        with self.assertRaises(JmxAgentUnavailable):
+            agent.request("uri", None, None, query(), 1)
+        self.assertTrue(agent.available)
+        with self.assertRaisesRegex(JmxAgentUnavailable, "restarting it in"):
+            agent.request("uri", None, None, query(), 1)
+
+        agent.retry_at = 0.0
+        agent.request("uri", None, None, query(), 1)
+        self.assertEqual(agent.failures, 0)
+
+    def test_definite_failure_disables_agent(self):
+        agent = FakeProcessAgent([BrokenPipeError("agent exited")], unavailable_reason="java not found")
+        with self.assertRaisesRegex(JmxAgentUnavailable, "java not found"):
+            agent.request("uri", None, None, query(), 1)
+        self.assertFalse(agent.available)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import threading
+import unittest
+
+import docker.errors
+
+from utils.jmx_agent_image import JmxAgentImageBuilder, get_context_hash
+
+HOST_ID = 'host'
+
+
+class DummyImage:
+    def __init__(self, labels):
+        self.labels = labels
+
+
+# the subset of the docker client used by the builder
+class DummyDockerClient:
+    def __init__(self, image=None, fail=False):
+        self.images = self
+        self.image = image
+        self.fail = fail
+        self.builds = []
+
+    def get(self, name):
+        if self.image is None:
+            raise docker.errors.ImageNotFound(name)
+        return self.image
+
+    def build(self, **kwargs):
+        if self.fail:
+            raise docker.errors.BuildError("failed", [])
+        self.builds.append(kwargs)
+        self.image = DummyImage(kwargs['labels'])
+
+
+class DummyDockersPool:
+    def __init__(self, client):
+        self.client = client
+
+    def resolve_id(self, client_id):
+        return HOST_ID if client_id is None else client_id
+
+    def get_default_client(self):
+        return self.client
+
+
+class JmxAgentImageBuilderTest(unittest.TestCase):
+    def setUp(self):
+        # the build runs in the calling thread
+        self.thread_class = threading.Thread
+        threading.Thread = ImmediateThread
+
+    def tearDown(self):
+        threading.Thread = self.thread_class
+
+    def test_image_of_same_context_is_not_rebuilt(self):
+        client = DummyDockerClient(DummyImage({JmxAgentImageBuilder.LABEL_HASH: get_context_hash()}))
+        builder = JmxAgentImageBuilder(DummyDockersPool(client), 'jmx-agent')
+
+        self.assertFalse(builder.is_ready(None))
+        self.assertTrue(builder.is_ready(None))
+        self.assertEqual(client.builds, [])
+
+    def test_image_of_other_context_is_rebuilt_once(self):
+        client = DummyDockerClient(DummyImage({JmxAgentImageBuilder.LABEL_HASH: 'other'}))
+        builder = JmxAgentImageBuilder(DummyDockersPool(client), 'jmx-agent')
+
+        builder.is_ready(None)
+        self.assertTrue(builder.is_ready(None))
+        builder.is_ready(None)
+        self.assertEqual(len(client.builds), 1)
+        self.assertEqual(client.builds[0]['labels'], {JmxAgentImageBuilder.LABEL_HASH: get_context_hash()})
+
+    def test_failed_build_is_retried_after_delay(self):
+        client = DummyDockerClient(fail=True)
+        builder = JmxAgentImageBuilder(DummyDockersPool(client), 'jmx-agent')
+
+        self.assertFalse(builder.is_ready(None))
+        client.fail = False
+        self.assertFalse(builder.is_ready(None))
+        self.assertEqual(client.builds, [])
+
+        builder.failed_at[HOST_ID] -= JmxAgentImageBuilder.RETRY_DELAY
+        builder.is_ready(None)
+        self.assertTrue(builder.is_ready(None))
+
+
+class ImmediateThread:
+    def __init__(self, target=None, args=(), **_):
+        self.target = target
+        self.args = args
+
+    def start(self):
+        self.target(*self.args)
+
+
+if __name__ == '__main__':
+    unittest.main()
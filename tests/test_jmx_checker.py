@@ -0,0 +1,96 @@
+import unittest
+
+import jmxquery
+
+from checkers.check import OverallStatusAccumulator
+from checkers.jmx_checker import CheckJmx, JmxQueryPlan
+
+SERVICE = {
+    'service': 'app',
+    'mbeans': [
+        {'name': 'app:type=Cache', 'our-alias': 'cache_size', 'attribute': 'Size'},
+        {'name': 'app:type=Cache', 'our-alias': 'cache_any'},
+        {'name': 'app:type=Cache', 'our-alias': 'cache_size_again', 'attribute': 'Size'},
+        {'name': 'app:type=Pool', 'our-alias': 'pool_used', 'attribute': 'Usage', 'attribute-key': 'used',
+         'conv': 'x * 2'}
+    ]
+}
+
+
+def metric(mbean_name, attribute, attribute_key=None, value=None):
+    return jmxquery.JMXQuery(mbean_name, attribute, attribute_key, value)
+
+
+# answers every query with the same metrics and records the polled mbeans
+class DummyJmxConnection:
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.polled = []
+
+    def query(self, queries, timeout=None):
+        self.polled.append([(x.mBeanName, x.attribute) for x in queries])
+        return self.metrics
+
+
+class JmxQueryPlanTest(unittest.TestCase):
+    def setUp(self):
+        self.plan = JmxQueryPlan.compile(SERVICE)
+        self.builtin = len(self.plan.mbeans_dicts) - len(SERVICE['mbeans'])
+
+    def test_queries_and_converters_are_compiled_once(self):
+        self.assertEqual(len(self.plan.queries), len(self.plan.mbeans_dicts))
+        pool = self.plan.mbeans_dicts[self.builtin + 3]
+        self.assertEqual(pool['conv'](21), 42)
+        self.assertEqual(self.plan.queries[self.builtin + 3].attributeKey, 'used')
+
+    def test_first_requested_mbean_wins(self):
+        self.assertEqual(self.plan.match(metric('app:type=Cache', 'Size')), self.builtin)
+        self.assertEqual(self.plan.match(metric('app:type=Cache', 'Hits')), self.builtin + 1)
+        self.assertEqual(self.plan.match(metric('app:type=Pool', 'Usage', 'used')), self.builtin + 3)
+        self.assertIsNone(self.plan.match(metric('app:type=Pool', 'Usage', 'max')))
+        self.assertIsNone(self.plan.match(metric('app:type=Other', 'Size')))
+
+    def test_builtin_metrics_are_matched(self):
+        idx = self.plan.match(jmxquery.JMXQuery('java.lang:type=Memory', 'HeapMemoryUsage', 'used',
+                                                metric_name='HeapMemoryUsage'))
+        self.assertEqual(self.plan.mbeans_dicts[idx]['our_alias'], 'memory_usage_bytes')
+
+    def test_only_due_mbeans_are_matched(self):
+        self.assertEqual(self.plan.match(metric('app:type=Cache', 'Size'), {self.builtin + 2}), self.builtin + 2)
+        self.assertEqual(self.plan.match(metric('app:type=Cache', 'Size'), {self.builtin + 1, self.builtin + 2}),
+                         self.builtin + 1)
+        self.assertIsNone(self.plan.match(metric('app:type=Cache', 'Size'), {self.builtin + 3}))
+
+
+class CheckJmxTest(unittest.TestCase):
+    SERVICE = {
+        'service': 'app',
+        'mbean-groups': [{'name': 'builtin', 'interval': 300}, {'name': 'fast', 'interval': 2}],
+        'mbeans': [
+            {'name': 'app:type=Cache', 'our-alias': 'cache_size_slow', 'attribute': 'Size', 'interval': 600},
+            {'name': 'app:type=Cache', 'our-alias': 'cache_size', 'attribute': 'Size', 'group': 'fast'}
+        ]
+    }
+
+    def test_interval_has_a_floor(self):
+        check = CheckJmx('app', OverallStatusAccumulator(), CheckJmxTest.SERVICE)
+        self.assertEqual(check.check_repeat_interval, JmxQueryPlan.MIN_INTERVAL)
+
+    def test_mbeans_not_due_keep_their_values(self):
+        check = CheckJmx('app', OverallStatusAccumulator(), CheckJmxTest.SERVICE)
+        connection = DummyJmxConnection([metric('app:type=Cache', 'Size', value=5)])
+        _, user_dict = check.do_check(jmx_connection=connection)
+        # both are due, the first requested one wins
+        self.assertEqual(user_dict, {'cache_size_slow': 5})
+
+        check.last_execution_time = None
+        check.last_polled = {idx: polled - 5 for idx, polled in check.last_polled.items()}
+        connection.metrics = [metric('app:type=Cache', 'Size', value=7)]
+        _, user_dict = check.do_check(jmx_connection=connection)
+        # only the fast mbean was polled, the value is not taken for the slow one
+        self.assertEqual(connection.polled[1], [('app:type=Cache', 'Size')])
+        self.assertEqual(user_dict, {'cache_size_slow': 5, 'cache_size': 7})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+
+import docker.errors
+
+from utils.jmx_proxy_manager import JmxProxyManager
+
+HOST_ID = 'host'
+
+
+class DummyDockersPool:
+    def __init__(self):
+        self.config = {'jmx': [{'service': 'app', 'url': {'docker': {'container': 'app', 'port': 9010}}}]}
+
+    def resolve_id(self, client_id):
+        return HOST_ID if client_id is None else client_id
+
+
+class DummyContainer:
+    def __init__(self, name, attrs=None, labels=None):
+        self.name = name
+        self.id = name + '-id'
+        self.attrs = attrs or {}
+        self.labels = labels or {}
+        self.status = 'running'
+        self.removed = False
+
+    def reload(self):
+        pass
+
+    def remove(self, force=False):
+        self.removed = force
+
+
+# the subset of the docker client used by the proxy manager: one target container and its proxies
+class DummyDockerClient:
+    def __init__(self):
+        self.containers = self
+        self.target = DummyContainer('app', {'State': {'StartedAt': '2024-01-01T00:00:00Z'}})
+        self.proxies = []
+
+    def get(self, name):
+        if name == self.target.name:
+            return self.target
+        for proxy in self.proxies:
+            if proxy.name == name and not proxy.removed:
+                return proxy
+        raise docker.errors.NotFound(name)
+
+    def run(self, image, command, name=None, labels=None, **_):
+        proxy = DummyContainer(name, labels=labels)
+        self.proxies.append(proxy)
+        return proxy
+
+    def list(self, **_):
+        return [x for x in self.proxies if not x.removed]
+
+
+class JmxProxyManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.client = DummyDockerClient()
+        self.manager = JmxProxyManager(DummyDockersPool(), 'jmx-agent', 61234)
+
+    def test_proxy_is_kept_while_target_runs(self):
+        connection = self.manager.get_connection(None, self.client, 'app', 9010)
+        self.assertIs(self.manager.get_connection(None, self.client, 'app', 9010), connection)
+        self.assertEqual(len(self.client.proxies), 1)
+        self.assertEqual(self.client.proxies[0].name, JmxProxyManager.get_proxy_name('app'))
+
+    def test_proxy_follows_restart_of_target(self):
+        connection = self.manager.get_connection(None, self.client, 'app', 9010)
+        self.client.target.attrs['State']['StartedAt'] = '2024-01-02T00:00:00Z'
+
+        self.assertIsNot(self.manager.get_connection(None, self.client, 'app', 9010), connection)
+        self.assertEqual(len(self.client.proxies), 2)
+        self.assertTrue(self.client.proxies[0].removed)
+
+    def test_leftover_proxy_of_current_start_is_reused(self):
+        self.manager.get_connection(None, self.client, 'app', 9010)
+        # e.g. after a restart of EaDoMo
+        other = JmxProxyManager(DummyDockersPool(), 'jmx-agent', 61234)
+        other.get_connection(None, self.client, 'app', 9010)
+        self.assertEqual(len(self.client.proxies), 1)
+
+    def test_orphaned_proxy_is_removed(self):
+        orphan = DummyContainer('old-docker-env-checker-jmxproxy',
+                                labels={JmxProxyManager.LABEL: "true", JmxProxyManager.LABEL_TARGET: 'old'})
+        self.client.proxies.append(orphan)
+        self.manager.get_connection(None, self.client, 'app', 9010)
+        self.assertTrue(orphan.removed)
+
+
+if __name__ == '__main__':
+    unittest.main()
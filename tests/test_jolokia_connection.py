@@ -0,0 +1,75 @@
+import http.server
+import json
+import threading
+import unittest
+
+import jmxquery
+
+from utils.jolokia_connection import JolokiaConnection
+
+
+# answers every bulk read with the prepared results and keeps the requests
+class JolokiaHandler(http.server.BaseHTTPRequestHandler):
+    results = []
+    requests = []
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        JolokiaHandler.requests.append(json.loads(body))
+        response = json.dumps(JolokiaHandler.results).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+class JolokiaConnectionTest(unittest.TestCase):
+    def setUp(self):
+        JolokiaHandler.requests = []
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), JolokiaHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.connection = JolokiaConnection(f"http://127.0.0.1:{self.server.server_address[1]}/jolokia")
+
+    def tearDown(self):
+        self.connection.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_bulk_read(self):
+        JolokiaHandler.results = [
+            {'status': 200, 'value': 42},
+            {'status': 200, 'value': {'used': 10, 'max': 20}},
+            {'status': 404, 'error': 'not found'},
+            {'status': 200, 'value': {'app:type=Pool,name=a': {'Size': 1}, 'app:type=Pool,name=b': {'Size': 2}}}
+        ]
+        metrics = self.connection.query([
+            jmxquery.JMXQuery('java.lang:type=Memory', 'HeapMemoryUsage', 'used'),
+            jmxquery.JMXQuery('java.lang:type=Memory', 'NonHeapMemoryUsage'),
+            jmxquery.JMXQuery('app:type=Missing', 'Size'),
+            jmxquery.JMXQuery('app:type=Pool,*', 'Size')
+        ])
+
+        self.assertEqual(len(JolokiaHandler.requests), 1)
+        self.assertEqual(JolokiaHandler.requests[0][0],
+                         {'type': 'read', 'mbean': 'java.lang:type=Memory', 'attribute': 'HeapMemoryUsage',
+                          'path': 'used'})
+        self.assertEqual([(x.mBeanName, x.attribute, x.attributeKey, x.value) for x in metrics], [
+            ('java.lang:type=Memory', 'HeapMemoryUsage', 'used', 42),
+            ('java.lang:type=Memory', 'NonHeapMemoryUsage', 'used', 10),
+            ('java.lang:type=Memory', 'NonHeapMemoryUsage', 'max', 20),
+            ('app:type=Pool,name=a', 'Size', None, 1),
+            ('app:type=Pool,name=b', 'Size', None, 2)
+        ])
+
+    def test_unexpected_response(self):
+        JolokiaHandler.results = {'status': 200}
+        with self.assertRaises(RuntimeError):
+            self.connection.query([jmxquery.JMXQuery('java.lang:type=Memory', 'HeapMemoryUsage')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+
+from utils.port_prober import probe_ports
+
+
+class DummyProbeManager:
+    def __init__(self, output):
+        self.output = output
+        self.calls = []
+
+    def run(self, docker_client, image, command, **kwargs):
+        self.calls.append((command, kwargs))
+        return self.output
+
+
+class PortProberTest(unittest.TestCase):
+    def test_output_is_parsed_per_port(self):
+        probe_manager = DummyProbeManager(b"443 closed 100.00 110.02\n"
+                                          b"80 open 100.00 100.01\n"
+                                          b"nc: bad address\n"
+                                          b"8080 open 100.00 100.02\n")
+        results = probe_ports(probe_manager, None, 'app', ['80', 443, 80], network_target='app', target_key='id')
+
+        self.assertEqual(results, {80: {'open': True, 'latency_ms': 10},
+                                   443: {'open': False, 'latency_ms': 10020}})
+        self.assertEqual(len(probe_manager.calls), 1)
+        self.assertIn("for p in 80 443;", probe_manager.calls[0][0][2])
+        self.assertEqual(probe_manager.calls[0][1]['network_target'], 'app')
+
+    def test_no_ports_no_probe(self):
+        probe_manager = DummyProbeManager(b"")
+        self.assertEqual(probe_ports(probe_manager, None, 'app', []), {})
+        self.assertEqual(probe_manager.calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
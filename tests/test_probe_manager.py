@@ -0,0 +1,74 @@
+import unittest
+from collections import namedtuple
+
+import docker.errors
+
+from utils.probe_manager import ProbeManager
+
+ExecResult = namedtuple('ExecResult', ['exit_code', 'output'])
+
+
+class DummyProbeContainer:
+    def __init__(self, name, labels, results):
+        self.name = name
+        self.labels = labels
+        self.status = 'running'
+        self.results = results
+        self.commands = []
+        self.removed = False
+
+    def exec_run(self, command, **_):
+        self.commands.append(command)
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def remove(self, force=False):
+        self.removed = force
+
+
+# the subset of the docker client used by the probe manager
+class DummyDockerClient:
+    def __init__(self, results):
+        self.results = results
+        self.created = []
+        self.api = self
+        self.base_url = 'unix://var/run/docker.sock'
+        self.containers = self
+
+    def run(self, image, name=None, labels=None, **_):
+        container = DummyProbeContainer(name, labels, self.results)
+        self.created.append(container)
+        return container
+
+    def get(self, name):
+        raise docker.errors.NotFound(name)
+
+    def list(self, **_):
+        return self.created
+
+
+class ProbeManagerTest(unittest.TestCase):
+    def test_command_runs_with_timeout(self):
+        client = DummyDockerClient([ExecResult(0, b'ok'), ExecResult(143, b'')])
+        manager = ProbeManager()
+
+        self.assertEqual(manager.run(client, ProbeManager.BUSYBOX_IMAGE, "nc -zw10 host 80", timeout=20), b'ok')
+        self.assertEqual(client.created[0].commands[0], ["timeout", "20", "nc", "-zw10", "host", "80"])
+
+        with self.assertRaises(docker.errors.ContainerError) as context:
+            manager.run(client, ProbeManager.BUSYBOX_IMAGE, ["sleep", "100"])
+        self.assertEqual(context.exception.exit_status, 143)
+        self.assertEqual(len(client.created), 1)
+
+    def test_failed_probe_is_recreated_once(self):
+        client = DummyDockerClient([docker.errors.APIError("gone"), ExecResult(0, b'ok')])
+        manager = ProbeManager()
+
+        self.assertEqual(manager.run(client, ProbeManager.BUSYBOX_IMAGE, ["true"]), b'ok')
+        self.assertEqual(len(client.created), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+
+from utils.ssl_inventory import SslInventory
+
+
+class SslInventoryTest(unittest.TestCase):
+    def test_failing_target_does_not_abort_refresh(self):
+        inventory = SslInventory(30, concurrency=2, timeout=1)
+        fetch_one = inventory._fetch_one
+
+        async def fetch(semaphore, host, port):
+            if host == 'broken':
+                raise RuntimeError("unexpected")
+            entry = SslInventory._new_entry(host, port)
+            entry['error'] = "not fetched"
+            return entry
+
+        inventory._fetch_one = fetch
+        try:
+            inventory.refresh([('broken', 443), ('fine', 443)])
+        finally:
+            inventory._fetch_one = fetch_one
+
+        self.assertEqual(inventory.get('broken', 443)['error'], "unexpected")
+        self.assertEqual(inventory.get('fine', 443)['error'], "not fetched")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import threading
+import unittest
+
+from utils.stats_collector import ContainerStatsCollector
+
+
+class DummyApi:
+    def __init__(self, samples):
+        self.samples = samples
+
+    def stats(self, cont_id, stream=False, **_):
+        if stream:
+            return iter(self.samples)
+        return self.samples.pop(0)
+
+
+class DummyClient:
+    def __init__(self, samples):
+        self.api = DummyApi(samples)
+
+
+class DummyContainer:
+    def __init__(self, samples):
+        self.id = 'abc'
+        self.name = 'app'
+        self.status = 'running'
+        self.client = DummyClient(samples)
+
+
+class ContainerStatsCollectorTest(unittest.TestCase):
+    def test_one_shot_uses_previous_sample(self):
+        collector = ContainerStatsCollector(ContainerStatsCollector.MODE_ONE_SHOT)
+        cont = DummyContainer([{'cpu_stats': {'n': 1}}, {'cpu_stats': {'n': 2}}])
+
+        self.assertEqual(collector.get_stats(cont)['precpu_stats'], {})
+        self.assertEqual(collector.get_stats(cont)['precpu_stats'], {'n': 1})
+
+    def test_replaced_reader_keeps_sample_of_successor(self):
+        collector = ContainerStatsCollector(ContainerStatsCollector.MODE_STREAM)
+        cont = DummyContainer([])
+        # a newer reader has been registered and delivered a sample meanwhile
+        collector.readers[cont.id] = threading.Thread(target=print)
+        collector.latest_samples[cont.id] = {'cpu_stats': {'n': 3}}
+
+        collector._read_stream(cont)
+        self.assertEqual(collector.latest_samples[cont.id], {'cpu_stats': {'n': 3}})
+
+        collector.readers[cont.id] = threading.current_thread()
+        collector._read_stream(cont)
+        self.assertNotIn(cont.id, collector.latest_samples)
+        self.assertNotIn(cont.id, collector.readers)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import socket
+import unittest
+
+from utils.tcp_prober import TcpProber
+
+
+class TcpProberTest(unittest.TestCase):
+    def test_open_and_refused_ports(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as listening:
+            listening.bind(('127.0.0.1', 0))
+            listening.listen()
+            open_port = listening.getsockname()[1]
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as unused:
+                unused.bind(('127.0.0.1', 0))
+                closed_port = unused.getsockname()[1]
+
+            results = TcpProber(concurrency=2, timeout=2).probe([('127.0.0.1', open_port),
+                                                                 ('127.0.0.1', str(closed_port)),
+                                                                 ('127.0.0.1', open_port)])
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[('127.0.0.1', open_port)]['state'], TcpProber.STATE_OPEN)
+        self.assertIsNotNone(results[('127.0.0.1', open_port)]['latency_ms'])
+        self.assertEqual(results[('127.0.0.1', closed_port)]['state'], TcpProber.STATE_REFUSED)
+        self.assertIsNotNone(results[('127.0.0.1', closed_port)]['error'])
+
+    def test_no_targets(self):
+        self.assertEqual(TcpProber(timeout=1).probe([]), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
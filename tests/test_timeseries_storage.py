@@ -0,0 +1,110 @@
+import datetime
+import unittest
+
+import pymongo.errors
+
+from utils.timeseries_storage import StatusTimeseriesStorage
+
+
+def matches(doc, query):
+    for key, condition in query.items():
+        value = doc
+        for part in key.split('.'):
+            value = value.get(part, None) if isinstance(value, dict) else None
+        if isinstance(condition, dict):
+            if '$exists' in condition and (value is not None) != condition['$exists']:
+                return False
+            if '$gt' in condition and not (value is not None and value > condition['$gt']):
+                return False
+            if '$lt' in condition and not (value is not None and value < condition['$lt']):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+# the subset of a pymongo collection used by the storage; projections are ignored
+class DummyCollection:
+    def __init__(self):
+        self.docs = []
+        self.indexes = []
+
+    def create_index(self, keys):
+        self.indexes.append(keys)
+
+    def insert_many(self, docs):
+        self.docs.extend(dict(x) for x in docs)
+
+    def insert_one(self, doc):
+        self.docs.append(dict(doc))
+
+    def find(self, query, projection=None, sort=None):
+        ret = [x for x in self.docs if matches(x, query)]
+        for key, direction in reversed(sort or []):
+            ret.sort(key=lambda x, k=key: x[k], reverse=direction < 0)
+        return ret
+
+    def find_one(self, query, sort=None):
+        ret = self.find(query, sort=sort)
+        return ret[0] if ret else None
+
+
+class DummyDatabase(dict):
+    def __init__(self, timeseries_supported):
+        super().__init__()
+        self.timeseries_supported = timeseries_supported
+        self.timeseries = []
+
+    def __missing__(self, name):
+        self[name] = DummyCollection()
+        return self[name]
+
+    def list_collection_names(self, filter=None):  # pylint: disable=redefined-builtin
+        return [x for x in self if filter is None or x == filter['name']]
+
+    def create_collection(self, name, timeseries=None):
+        if not self.timeseries_supported:
+            raise pymongo.errors.OperationFailure("unknown option to create collection: timeseries")
+        self.timeseries.append(name)
+        return self[name]
+
+
+class StatusTimeseriesStorageTest(unittest.TestCase):
+    def test_regular_collection_without_timeseries_support(self):
+        db = DummyDatabase(timeseries_supported=False)
+        storage = StatusTimeseriesStorage(db, 'container_status')
+
+        self.assertEqual(db.timeseries, [])
+        self.assertEqual(db['container_status_ts'].indexes, [[('entity', 1), ('timestamp', 1)]])
+
+        storage.store({'app': {'status': 'OK', 'stats': {'pids': 3}}, 'db': {'status': 'NOK'}})
+        time_from = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=1)
+        series = storage.get_timeseries('app', 'stats.pids', time_from)
+        self.assertEqual(len(series), 1)
+        self.assertEqual(series[0]['status']['app']['stats']['pids'], 3)
+        self.assertEqual(storage.get_last('db'), {'status': 'NOK'})
+
+    def test_timeseries_collection(self):
+        db = DummyDatabase(timeseries_supported=True)
+        StatusTimeseriesStorage(db, 'service_status')
+        self.assertEqual(db.timeseries, ['service_status_ts'])
+
+    def test_history_before_first_measurement_is_read_from_snapshots(self):
+        db = DummyDatabase(timeseries_supported=True)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        for hours_back in (3, 2):
+            db['jmx_status'].insert_one({'timestamp': now - datetime.timedelta(hours=hours_back),
+                                         'status': {'app': {'status': 'NOK'}}})
+        storage = StatusTimeseriesStorage(db, 'jmx_status')
+        self.assertEqual(storage.get_last('app'), {'status': 'NOK'})
+
+        storage.store({'app': {'status': 'OK'}})
+        series = storage.get_timeseries('app', 'status', now - datetime.timedelta(days=1))
+        self.assertEqual([x['status']['app']['status'] for x in series], ['NOK', 'NOK', 'OK'])
+        self.assertEqual(len(storage.get_status_timeseries(now - datetime.timedelta(days=1))), 3)
+        self.assertEqual(len(storage.get_timeseries('app', 'status', now - datetime.timedelta(minutes=1))), 1)
+        self.assertEqual(storage.get_last('app'), {'status': 'OK'})
+
+
+if __name__ == '__main__':
+    unittest.main()
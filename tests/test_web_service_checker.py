@@ -0,0 +1,25 @@
+import unittest
+
+from checkers.web_service_checker import get_http_timing_stats, get_http_timings_ms
+
+
+class HttpTimingsTest(unittest.TestCase):
+    def test_curl_timings_in_ms(self):
+        self.assertEqual(get_http_timings_ms({'time_namelookup': 0.001, 'time_connect': 0.002,
+                                              'time_appconnect': 0.0, 'time_starttransfer': 0.0104,
+                                              'time_total': 0.012}),
+                         {'namelookup_ms': 1.0, 'connect_ms': 2.0, 'tls_ms': 0.0, 'ttfb_ms': 10.4,
+                          'total_ms': 12.0})
+        self.assertIsNone(get_http_timings_ms({'time_total': None}))
+
+    def test_stats_are_flat_scalars_of_slowest_endpoint(self):
+        stats = get_http_timing_stats([
+            {'namelookup_ms': 1.0, 'connect_ms': 2.0, 'tls_ms': 0.0, 'ttfb_ms': 10.0, 'total_ms': 12.0},
+            {'namelookup_ms': 0.0, 'connect_ms': 0.0, 'tls_ms': 0.0, 'ttfb_ms': 30.0, 'total_ms': 31.0}
+        ])
+        self.assertEqual(stats, {'http_namelookup_ms': 1.0, 'http_connect_ms': 2.0, 'http_tls_ms': 0.0,
+                                 'http_ttfb_ms': 30.0, 'http_total_ms': 31.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+from checkers.check import OverallStatusAccumulator
+from checkers.zabbix_checks import CheckDiskSpaceIsOkZabbix, CheckServicePortOpenZabbix, CheckZabbix
+
+
+class ZabbixChecksTest(unittest.TestCase):
+    def test_item_keys_contain_only_configured_nics(self):
+        item_keys = CheckZabbix.get_item_keys({'nic': ['eth0']})
+        self.assertIn('net.if.in[eth0,bytes]', item_keys)
+        self.assertFalse([x for x in item_keys if 'enp3s0' in x])
+
+    def test_stats_keep_their_meaning(self):
+        status_acc = OverallStatusAccumulator()
+        check = CheckZabbix('host', status_acc)
+        values = {'vm.memory.size': '1000', 'vm.memory.size[free]': '250', 'system.cpu.load': '1.5',
+                  'vfs.dev.write[all,sectors]': '2', 'vfs.dev.read[all,sectors]': '4'}
+        stats = check.do_check(port_checks={}, disk_checks={}, zab_desc={}, zab_values=values)
+        self.assertEqual(stats['memory_usage_bytes'], 1000)
+        self.assertEqual(stats['memory_available_bytes'], 250)
+        self.assertEqual(stats['memory_usage_percent'], 25.0)
+        self.assertEqual(stats['cpu_usage_percent'], 1.5)
+        self.assertEqual(stats['blkio_written_bytes'], 2)
+        self.assertEqual(stats['blkio_read_bytes'], 4)
+        self.assertNotIn('system.cpu.util', CheckZabbix.get_item_keys({}))
+
+    def test_port_not_monitored(self):
+        status_acc = OverallStatusAccumulator()
+        check = CheckServicePortOpenZabbix('host', status_acc, 'host', ',80')
+        self.assertFalse(check.do_check(zab_stats={}))
+        self.assertEqual(check.get_last_status(), CheckServicePortOpenZabbix.CheckResult.EXEC_FAILURE)
+        self.assertFalse(status_acc.is_ok())
+
+    def test_disk_space_ok_does_not_fail(self):
+        status_acc = OverallStatusAccumulator()
+        check = CheckDiskSpaceIsOkZabbix('host', status_acc, '/', 80.0)
+        self.assertTrue(check.do_check(disk_usage_perc=50.0))
+        self.assertTrue(status_acc.is_ok())
+
+
+if __name__ == '__main__':
+    unittest.main()
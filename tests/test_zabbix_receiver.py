@@ -0,0 +1,42 @@
+import unittest
+
+from utils.zabbix_receiver import ZabbixReceiver
+
+
+class ZabbixReceiverTest(unittest.TestCase):
+    def setUp(self):
+        self.receiver = ZabbixReceiver(port=0)
+        self.receiver.set_items('web1', ['system.uptime', 'vm.memory.size[total]'])
+
+    def test_default_bind_is_localhost(self):
+        self.assertEqual(self.receiver.bind, ZabbixReceiver.DEFAULT_BIND)
+
+    def test_active_checks(self):
+        response = self.receiver._process({'request': 'active checks', 'host': 'web1'})
+        self.assertEqual([x['key'] for x in response['data']], ['system.uptime', 'vm.memory.size[total]'])
+        response = self.receiver._process({'request': 'active checks', 'host': 'unknown'})
+        self.assertEqual(response['data'], [])
+
+    def test_only_requested_items_are_kept(self):
+        response = self.receiver._process({'request': 'sender data', 'data': [
+            {'host': 'web1', 'key': 'system.uptime', 'value': 1234},
+            {'host': 'web1', 'key': 'system.run[rm -rf /]', 'value': 'x'},
+            {'host': 'other', 'key': 'system.uptime', 'value': 1},
+            {'host': 'web1', 'key': 'vm.memory.size[total]'}
+        ]})
+        self.assertIn('processed: 1; failed: 3', response['info'])
+        self.assertEqual(self.receiver.get_values('web1', ['system.uptime', 'vm.memory.size[total]']),
+                         {'system.uptime': '1234', 'vm.memory.size[total]': None})
+        self.assertNotIn('other', self.receiver.values)
+        self.assertNotIn('system.run[rm -rf /]', self.receiver.values['web1'])
+
+    def test_allowed_peers(self):
+        self.assertTrue(self.receiver.is_allowed('203.0.113.7'))
+
+        receiver = ZabbixReceiver(port=0, allowed_peers='10.0.0.0/24, 192.168.1.5')
+        self.assertTrue(receiver.is_allowed('10.0.0.42'))
+        self.assertTrue(receiver.is_allowed('192.168.1.5'))
+        self.assertTrue(receiver.is_allowed('::ffff:10.0.0.1'))
+        self.assertFalse(receiver.is_allowed('10.0.1.1'))
+        self.assertFalse(receiver.is_allowed('192.168.1.6'))
+        self.assertFalse(receiver.is_allowed('not an address'))
@@ -0,0 +1,10 @@
+import asyncio
+
+
+async def close_writer(writer: asyncio.StreamWriter):
+    # the peer may have reset the connection already, there is nothing left to close then
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
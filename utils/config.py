@@ -56,7 +56,8 @@ schema = {
                 "docker": {"type": "string"},
                 "url": {"$ref": "#/$defs/jmxurl"},
                 "src": {"type": "string"},
-                "mbeans": {"type": "array", "items": {"$ref": "#/$defs/mbean"}}
+                "mbeans": {"type": "array", "items": {"$ref": "#/$defs/mbean"}},
+                "mbean-groups": {"type": "array", "items": {"$ref": "#/$defs/mbean-group"}}
             },
             "additionalProperties": False
         },
@@ -70,6 +71,7 @@ schema = {
                 "src": {"type": "string"},
                 "hostname": {"type": "string"},
                 "ports": {"type": "array", "items": {"type": "integer", "minimum": 1, "maximum": 65535}},
+                "port-check": {"type": "string", "enum": ["direct", "docker"]},
                 "endpoints": {"type": "array", "items": {"$ref": "#/$defs/endpoint"}},
                 "zabbix": {"$ref": "#/$defs/zabbix"}
             },
@@ -142,8 +144,24 @@ schema = {
                     "properties": {"direct": {"type": "string"}},
                     "additionalProperties": False
                 },
+                {
+                    "type": "object",
+                    "required": ["jolokia"],
+                    "properties": {"jolokia": {"$ref": "#/$defs/jolokiaurl"}},
+                    "additionalProperties": False
+                },
             ]
         },
+        "jolokiaurl": {
+            "type": "object",
+            "required": ["url"],
+            "properties": {
+                "url": {"type": "string"},
+                "username": {"type": "string"},
+                "password": {"type": "string"}
+            },
+            "additionalProperties": False
+        },
         "jmxdockerurl": {
             "type": "object",
             "required": ["container", "port"],
@@ -160,7 +178,18 @@ schema = {
                 "name": {"type": "string"},
                 "our-alias": {"type": "string"},
                 "metric-name": {"type": "string"},
-                "conv": {"type": "string"}
+                "conv": {"type": "string"},
+                "interval": {"type": "integer", "minimum": 1},
+                "group": {"type": "string"}
+            },
+            "additionalProperties": False
+        },
+        "mbean-group": {
+            "type": "object",
+            "required": ["name", "interval"],
+            "properties": {
+                "name": {"type": "string"},
+                "interval": {"type": "integer", "minimum": 1}
             },
             "additionalProperties": False
         },
@@ -175,6 +204,9 @@ schema = {
                 "extra_headers": {"type": "object", "additionalProperties": True},
                 "auth": {"$ref": "#/$defs/httpauth"},
                 "type": {"type": "string", "enum": ["direct", "docker"]},
+                "connect-timeout": {"type": "number", "exclusiveMinimum": 0},
+                "read-timeout": {"type": "number", "exclusiveMinimum": 0},
+                "retries": {"type": "integer", "minimum": 0},
                 "exp_code": {"type": "array", "items": {"type": "number", "minimum": 0, "maximum": 999}}
             },
             "additionalProperties": False
@@ -200,6 +232,8 @@ schema = {
             "type": "object",
             "required": [],
             "properties": {
+                "mode": {"type": "string", "enum": ["passive", "active"]},
+                "host": {"type": "string"},
                 "ports": {"type": "array", "items": {"type": ["integer", "string"]}},
                 "disk-free": {"type": "array", "items": {"$ref": "#/$defs/df"}},
                 "mount-points": {"type": "array", "items": {"type": "string"}},
@@ -0,0 +1,117 @@
+import logging
+import re
+import threading
+import time
+
+import docker
+import docker.errors
+import requests
+
+from utils.docker_events import DockerEventsMonitor
+from utils.dockers_pool import DockersPool
+
+
+# one container list call per host and cycle replaces the per-container lookups;
+# the detailed (inspect) data of a container is reloaded only if its id, state or health changes,
+# or on a lifecycle event (e.g. a restart); without events it is also reloaded once it is MAX_AGE old.
+# Image attributes include the mutable tags and digests, they are reloaded on image events
+# (tag, untag, pull, ...) or, without events, once they are MAX_AGE old
+class ContainerInventory:
+    MAX_AGE = 60  # seconds
+    HEALTH_PATTERN = re.compile(r'\((healthy|unhealthy|health: starting)\)')
+
+    def __init__(self, dockers_pool: DockersPool, events_monitor: DockerEventsMonitor = None):
+        self.dockers_pool = dockers_pool
+        self.events_monitor = events_monitor
+        self.lock = threading.Lock()
+        self.summaries = {}  # docker host id -> container name -> container list entry
+        self.details = {}  # docker host id -> container name -> (cache key, load time, container)
+        self.images = {}  # (docker host id, image id) -> (image events generation, load time, image attributes)
+
+    def refresh(self, docker_id, docker_client):
+        host_id = self.dockers_pool.resolve_id(docker_id)
+        try:
+            containers = docker_client.api.containers(all=True)
+        except (docker.errors.DockerException, requests.exceptions.RequestException, OSError) as error:
+            logging.error(f"failed to list containers of {host_id}: {error}")
+            with self.lock:
+                self.summaries.pop(host_id, None)
+            return False
+
+        index = {}
+        for summary in containers:
+            for name in summary.get('Names', None) or []:
+                name = name.lstrip('/')
+                if '/' not in name:  # skip legacy link aliases
+                    index[name] = summary
+
+        with self.lock:
+            self.summaries[host_id] = index
+            host_details = self.details.setdefault(host_id, {})
+            for name in list(host_details):
+                if name not in index:
+                    del host_details[name]
+            used_images = {(summaries_host_id, x.get('ImageID', None))
+                           for summaries_host_id, summaries in self.summaries.items() for x in summaries.values()}
+            for image_key in list(self.images):
+                if image_key not in used_images:
+                    del self.images[image_key]
+        return True
+
+    def get(self, docker_id, docker_client, name):
+        host_id = self.dockers_pool.resolve_id(docker_id)
+        with self.lock:
+            host_summaries = self.summaries.get(host_id, None)
+            summary = host_summaries.get(name, None) if host_summaries is not None else None
+            cached = self.details.get(host_id, {}).get(name, None)
+
+        if host_summaries is None:
+            # the host could not be listed in this cycle
+            return docker_client.containers.get(name)
+
+        if summary is None:
+            raise docker.errors.NotFound(f"container {name} not found")
+
+        tracking = self.events_monitor is not None and self.events_monitor.is_tracking(docker_id)
+        key = self._get_cache_key(docker_id, name, summary, tracking)
+        if cached is not None and cached[0] == key and (tracking or not self._is_expired(cached[1])):
+            return cached[2]
+
+        cont = docker_client.containers.get(summary['Id'])
+        with self.lock:
+            self.details.setdefault(host_id, {})[name] = (key, time.monotonic(), cont)
+        return cont
+
+    def get_image_attrs(self, docker_id, docker_client, image_id):
+        host_id = self.dockers_pool.resolve_id(docker_id)
+        generation = self.events_monitor.get_image_generation(docker_id) if self.events_monitor else None
+        with self.lock:
+            cached = self.images.get((host_id, image_id), None)
+        if cached is not None:
+            if generation is not None and cached[0] == generation:
+                return cached[2]
+            if generation is None and cached[0] is None and not self._is_expired(cached[1]):
+                return cached[2]
+        try:
+            attrs = docker_client.images.get(image_id).attrs
+        except (docker.errors.DockerException, requests.exceptions.RequestException) as error:
+            logging.warning(f"failed to load image {image_id}: {error}")
+            return None
+        with self.lock:
+            self.images[(host_id, image_id)] = (generation, time.monotonic(), attrs)
+        return attrs
+
+    def _get_cache_key(self, docker_id, name, summary, tracking):
+        key = (summary['Id'], summary.get('State', None), summary.get('Created', None))
+        if tracking:
+            state = self.events_monitor.get_state(docker_id, name)
+            if state is None:
+                return key + (None, None)
+            return key + (state['generation'], state['health'])
+        # the human-readable status ("Up 5 minutes (healthy)") changes with the uptime, only the health is used
+        health = ContainerInventory.HEALTH_PATTERN.search(summary.get('Status', None) or '')
+        return key + (None, health.group(1) if health else None)
+
+    @staticmethod
+    def _is_expired(load_time):
+        return time.monotonic() - load_time >= ContainerInventory.MAX_AGE
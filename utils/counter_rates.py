@@ -0,0 +1,44 @@
+import threading
+
+COUNTERS = ['network_received_bytes', 'network_sent_bytes', 'blkio_written_bytes', 'blkio_read_bytes']
+
+
+# per-second rates of the cumulative counters of the stats, computed from the previous sample of
+# the same entity; a counter which went down (restart, reset of the interface) has no rate for
+# one sample and is tracked again from the new value
+class CounterRateTracker:
+    RATE_SUFFIX = '_per_second'
+
+    def __init__(self, counters=None):
+        self.counters = counters if counters else COUNTERS
+        self.lock = threading.Lock()
+        self.prev_samples = {}  # entity -> {'timestamp', 'instance', 'values', 'rates'}
+
+    def add_rates(self, entity, stats: dict, timestamp: float, instance=None):
+        # timestamp: time of the sample in seconds; instance: identifies the producer of the counters
+        # (e.g. container id and start time), all counters restart when it changes
+        values = {counter: stats.get(counter, None) for counter in self.counters}
+        with self.lock:
+            prev = self.prev_samples.get(entity, None)
+            if prev is not None and prev['instance'] == instance and timestamp == prev['timestamp']:
+                # the same sample again (e.g. a streamed sample not yet replaced)
+                rates = prev['rates']
+            else:
+                rates = {}
+                for counter, value in values.items():
+                    rates[counter] = None
+                    if prev is None or prev['instance'] != instance or timestamp < prev['timestamp']:
+                        continue
+                    prev_value = prev['values'].get(counter, None)
+                    if value is None or prev_value is None or value < prev_value:
+                        continue
+                    rates[counter] = (value - prev_value) / (timestamp - prev['timestamp'])
+                self.prev_samples[entity] = {
+                    'timestamp': timestamp,
+                    'instance': instance,
+                    'values': values,
+                    'rates': rates
+                }
+        for counter, rate in rates.items():
+            stats[counter + CounterRateTracker.RATE_SUFFIX] = rate
+        return stats
@@ -0,0 +1,52 @@
+import json
+import math
+from typing import List
+
+import docker.errors
+
+from utils.probe_manager import ProbeManager
+
+DEFAULT_PARALLEL_MAX = 16
+DEFAULT_MAX_TIME = 120  # seconds per URL
+EXEC_TIMEOUT_MARGIN = 10  # seconds
+TIMINGS = ('time_namelookup', 'time_connect', 'time_appconnect', 'time_starttransfer', 'time_total')
+
+
+def run_curl_batch(probe_manager: ProbeManager, docker_client, transfers: List[List[str]],
+                   parallel_max=DEFAULT_PARALLEL_MAX, max_time=DEFAULT_MAX_TIME):
+    # all transfers (curl arguments of one URL each, the URL last) run in one curl
+    # invocation in parallel mode; curl writes one JSON object per URL
+    if not transfers:
+        return []
+    command = ["curl", "--parallel", "--parallel-max", str(parallel_max)]
+    for idx, transfer in enumerate(transfers):
+        if idx > 0:
+            command.append("--next")
+        command += ["-s", "-o", "/dev/null", "-m", str(max_time), "-w", "%{json}\\n"] + transfer
+
+    try:
+        # at most parallel_max transfers run at a time, each of them limited to max_time
+        output = probe_manager.run(docker_client, ProbeManager.CURL_IMAGE, command,
+                                   timeout=max_time * math.ceil(len(transfers) / parallel_max) + EXEC_TIMEOUT_MARGIN)
+    except docker.errors.ContainerError as error:
+        # the exit status is the one of a failed transfer, the others are reported anyway
+        output = error.stderr or b''
+
+    ret: List[dict] = [{'http_code': None, 'error': "no result from curl"} for _ in transfers]
+    for line in output.decode('utf-8', 'replace').split("\n"):
+        if not line.startswith('{'):
+            continue
+        try:
+            result = json.loads(line)
+        except ValueError:
+            continue
+        idx = result.get('urlnum', None)
+        if not isinstance(idx, int) or not 0 <= idx < len(transfers):
+            continue
+        exit_code = result.get('exitcode', 0)
+        ret[idx] = {
+            'http_code': result.get('http_code', None) or None,
+            'error': (result.get('errormsg', None) or f"curl exit code {exit_code}") if exit_code else None,
+            **{timing: result.get(timing, None) for timing in TIMINGS}
+        }
+    return ret
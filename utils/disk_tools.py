@@ -0,0 +1,39 @@
+import shlex
+
+from utils.probe_manager import ProbeManager
+
+
+def parse_df_line(line):
+    # Filesystem 1024-blocks Used Available Capacity Mounted-on; parsed from the right,
+    # as the filesystem name may contain spaces
+    fields = line.split()
+    if len(fields) < 6:
+        return None
+    total_bytes = int(fields[-5]) * 1024
+    used_bytes = int(fields[-4]) * 1024
+    return {
+        'mount_point': " ".join(fields[:-5]),
+        'total_bytes': total_bytes,
+        'used_bytes': used_bytes,
+        'usage_percentage': 100.0 * used_bytes / total_bytes if total_bytes > 0 else None
+    }
+
+
+def measure_disk_usage(probe_manager: ProbeManager, docker_client, local_sources):
+    # one container for all sources, mounting only them; each result is preceded by the index
+    # of its source, so that a source which cannot be measured does not shift the others
+    sources = list(dict.fromkeys(local_sources))
+    script = "; ".join(f"echo '#{idx}'; df -P {shlex.quote(ProbeManager.HOST_ROOT + source)} | tail -n +2"
+                       for idx, source in enumerate(sources))
+    output = probe_manager.run_once(docker_client, ProbeManager.BUSYBOX_IMAGE, ["sh", "-c", script], sources)
+
+    ret = {}
+    source = None
+    for line in output.decode('utf-8').split("\n"):
+        if line.startswith('#'):
+            source = sources[int(line[1:])]
+        elif source is not None and source not in ret:
+            record = parse_df_line(line)
+            if record is not None:
+                ret[source] = record
+    return ret
@@ -0,0 +1,63 @@
+import os
+import threading
+import time
+
+from utils.disk_tools import measure_disk_usage
+from utils.dockers_pool import DockersPool
+from utils.probe_manager import ProbeManager
+
+
+# containers on the same docker host often mount the same host paths; the usage of a path
+# is measured once per host and interval and shared by all containers referencing it
+class DiskUsageCache:
+    DEFAULT_TTL = 60  # seconds
+    WAIT_TIMEOUT = 120  # seconds to wait for a measurement started by another container
+
+    def __init__(self, dockers_pool: DockersPool, probe_manager: ProbeManager, ttl: int = None):
+        self.dockers_pool = dockers_pool
+        self.probe_manager = probe_manager
+        self.ttl = ttl if ttl is not None else int(os.getenv("DISK_USAGE_CACHE_TTL", str(DiskUsageCache.DEFAULT_TTL)))
+        self.lock = threading.Lock()
+        self.entries = {}  # (docker host id, source) -> (measurement time, usage record)
+        self.pending = {}  # (docker host id, source) -> event set when the measurement is done
+
+    def get(self, docker_id, docker_client, local_sources):
+        # returns the usage records by source; sources which could not be measured are missing
+        host_id = self.dockers_pool.resolve_id(docker_id)
+        now = time.monotonic()
+        ret = {}
+        to_measure = []
+        to_wait = []
+        with self.lock:
+            for source in dict.fromkeys(local_sources):
+                key = (host_id, source)
+                entry = self.entries.get(key, None)
+                if entry is not None and now - entry[0] < self.ttl:
+                    ret[source] = entry[1]
+                elif key in self.pending:
+                    to_wait.append((source, self.pending[key]))
+                else:
+                    self.pending[key] = threading.Event()
+                    to_measure.append(source)
+
+        if to_measure:
+            measured = {}
+            try:
+                measured = measure_disk_usage(self.probe_manager, docker_client, to_measure)
+            finally:
+                with self.lock:
+                    for source in to_measure:
+                        key = (host_id, source)
+                        if source in measured:
+                            self.entries[key] = (time.monotonic(), measured[source])
+                        self.pending.pop(key).set()
+            ret.update(measured)
+
+        for source, event in to_wait:
+            event.wait(DiskUsageCache.WAIT_TIMEOUT)
+            with self.lock:
+                entry = self.entries.get((host_id, source), None)
+            if entry is not None:
+                ret[source] = entry[1]
+
+        return ret
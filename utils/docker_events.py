@@ -0,0 +1,256 @@
+import collections
+import itertools
+import logging
+import threading
+import time
+from typing import Optional
+
+import docker
+import docker.errors
+import requests
+
+from utils.dockers_pool import DockersPool
+
+
+class ContainerState:
+    MAX_PENDING_TRANSITIONS = 100
+
+    def __init__(self, name):
+        self.name = name
+        self.container_id = None
+        self.status = None  # running, exited, paused, ...
+        self.health = None  # healthy, unhealthy, starting or None if no health check defined
+        self.exit_code = None
+        self.started_at = None  # unix time of the last start event
+        self.restart_count = 0  # restarts observed since EaDoMo was started
+        self.oom_count = 0
+        # changed on every lifecycle event, i.e. when the inspect data changes; unique on the host,
+        # so that a container re-created under the same name never gets a generation seen before
+        self.generation = 0
+        # events not yet consumed by the checks
+        self.pending_restarts = 0
+        self.pending_ooms = 0
+        self.pending_transitions = collections.deque(maxlen=ContainerState.MAX_PENDING_TRANSITIONS)
+
+    def set_status(self, status, event_time):
+        if self.status is not None and status != self.status:
+            self.pending_transitions.append((self.status, status, event_time))
+        self.status = status
+
+    def has_pending_events(self):
+        return self.pending_restarts > 0 or self.pending_ooms > 0 or len(self.pending_transitions) > 0
+
+    def snapshot(self):
+        return {
+            'id': self.container_id,
+            'status': self.status,
+            'health': self.health,
+            'exit_code': self.exit_code,
+            'started_at': self.started_at,
+            'restart_count': self.restart_count,
+            'oom_count': self.oom_count,
+            'generation': self.generation
+        }
+
+
+class DockerEventsMonitor:
+    RECONNECT_DELAY = 5  # seconds
+    LIFECYCLE_ACTIONS = ('create', 'start', 'die', 'pause', 'unpause', 'destroy', 'rename')
+
+    def __init__(self, dockers_pool: DockersPool):
+        self.dockers_pool = dockers_pool
+        self.stop_flag = False
+        self.lock = threading.Lock()
+        self.states: dict[str, dict[str, ContainerState]] = {}  # docker host id -> container name -> state
+        self.synced = set()  # docker hosts with a live event stream
+        # (docker host id, container name) of the containers whose events are consumed by checks;
+        # the state of any other container is dropped as soon as the container is removed
+        self.consumers = set()
+        self.generations = itertools.count(1)
+        self.image_generations = {}  # docker host id -> number of image events (tag, untag, pull, ...)
+        self.streams = {}
+        self.primed_at = {}
+        self.last_event_time = {}
+        self.last_event_time_nano = {}
+        self.threads = []
+
+    def start(self):
+        for host_id in self.dockers_pool.get_host_ids():
+            thread = threading.Thread(target=self._run, args=(host_id,),
+                                      name=f"docker-events-{host_id}", daemon=True)
+            self.threads.append(thread)
+            thread.start()
+
+    def stop(self):
+        self.stop_flag = True
+        with self.lock:
+            streams = list(self.streams.values())
+        for stream in streams:
+            try:
+                stream.close()
+            except (OSError, AttributeError):
+                pass
+
+    def is_tracking(self, docker_id):
+        return self.dockers_pool.resolve_id(docker_id) in self.synced
+
+    def get_state(self, docker_id, name) -> Optional[dict]:
+        host_id = self.dockers_pool.resolve_id(docker_id)
+        with self.lock:
+            state = self.states.get(host_id, {}).get(name, None)
+            return state.snapshot() if state else None
+
+    def get_image_generation(self, docker_id) -> Optional[int]:
+        # changes whenever an image of the host is tagged, untagged, pulled, ...; None if the host is not tracked
+        host_id = self.dockers_pool.resolve_id(docker_id)
+        if host_id not in self.synced:
+            return None
+        with self.lock:
+            return self.image_generations.get(host_id, 0)
+
+    def consume(self, docker_id, name, restarts=True, transitions=True) -> Optional[dict]:
+        # returns the current state of the container together with the events collected since
+        # they were consumed the last time; None if the host is not tracked. Restarts (with OOM kills)
+        # and transitions are consumed only if requested, i.e. when the check using them is due -
+        # otherwise they are kept for the next call and reported as none
+        host_id = self.dockers_pool.resolve_id(docker_id)
+        if host_id not in self.synced:
+            return None
+        with self.lock:
+            self.consumers.add((host_id, name))
+            state = self.states.get(host_id, {}).get(name, None)
+            if state is None:
+                return None
+            ret = {
+                'state': state.snapshot(),
+                'restarts': state.pending_restarts if restarts else 0,
+                'ooms': state.pending_ooms if restarts else 0,
+                'transitions': list(state.pending_transitions) if transitions else []
+            }
+            if restarts:
+                state.pending_restarts = 0
+                state.pending_ooms = 0
+            if transitions:
+                state.pending_transitions.clear()
+            if state.status == 'removed' and not state.has_pending_events():
+                del self.states[host_id][name]
+            return ret
+
+    def _run(self, host_id):
+        while not self.stop_flag:
+            client = self.dockers_pool.get_client_for_id(host_id)
+            if client is None:
+                time.sleep(DockerEventsMonitor.RECONNECT_DELAY)
+                continue
+            try:
+                # subscribe first, then take the snapshot: events happening in between
+                # are buffered in the stream and applied on top of the snapshot
+                stream = client.events(decode=True, filters={'type': ['container', 'image']},
+                                       since=self.last_event_time.get(host_id, None))
+                with self.lock:
+                    self.streams[host_id] = stream
+                # on reconnection the missed events are replayed from the last one seen,
+                # so only the very first snapshot hides older events
+                primed_at = self.primed_at.setdefault(host_id, time.time())
+                self._prime(host_id, client)
+                self.synced.add(host_id)
+                logging.info(f"subscribed to docker events of {host_id}")
+                for event in stream:
+                    if self.stop_flag:
+                        break
+                    self._handle_event(host_id, event, primed_at)
+            except (docker.errors.DockerException, requests.exceptions.RequestException, OSError) as error:
+                if not self.stop_flag:
+                    logging.error(f"docker events stream of {host_id} failed: {error}")
+            finally:
+                self.synced.discard(host_id)
+                with self.lock:
+                    self.streams.pop(host_id, None)
+            if not self.stop_flag:
+                time.sleep(DockerEventsMonitor.RECONNECT_DELAY)
+
+    def _prime(self, host_id, client):
+        containers = client.containers.list(all=True, sparse=True)
+        with self.lock:
+            host_states = self.states.setdefault(host_id, {})
+            for cont in containers:
+                names = cont.attrs.get('Names', [])
+                if not names:
+                    continue
+                name = names[0].lstrip('/')
+                state = host_states.get(name, None)
+                if state is None:
+                    state = host_states[name] = ContainerState(name)
+                    state.status = cont.attrs.get('State', None)
+                state.container_id = cont.id
+
+    def _handle_event(self, host_id, event, primed_at):
+        action: str = event.get('Action', event.get('status', ''))
+        actor = event.get('Actor', {})
+        attributes = actor.get('Attributes', {})
+        event_time_nano = event.get('timeNano', event.get('time', 0) * 1000000000)
+        if event_time_nano <= self.last_event_time_nano.get(host_id, 0):
+            return  # already seen before reconnection
+        self.last_event_time_nano[host_id] = event_time_nano
+        self.last_event_time[host_id] = event_time_nano // 1000000000
+        event_time = event_time_nano / 1e9
+
+        if event.get('Type', 'container') == 'image':
+            with self.lock:
+                self.image_generations[host_id] = self.image_generations.get(host_id, 0) + 1
+            return
+
+        name = attributes.get('name', None)
+        if name is None:
+            return
+
+        with self.lock:
+            host_states = self.states.setdefault(host_id, {})
+
+            if action == 'rename':
+                old_name = attributes.get('oldName', '').lstrip('/')
+                state = host_states.pop(old_name, None)
+                if state is not None:
+                    state.name = name
+                    host_states[name] = state
+
+            state = host_states.get(name, None)
+            if state is None:
+                state = host_states[name] = ContainerState(name)
+            if action in DockerEventsMonitor.LIFECYCLE_ACTIONS:
+                state.generation = next(self.generations)
+
+            if action == 'create':
+                state.container_id = actor.get('ID', event.get('id', None))
+                state.health = None
+                state.set_status('created', event_time)
+            elif action == 'start':
+                # a start of an already started container is a restart; events older than
+                # the initial snapshot are already reflected in it
+                if state.status not in (None, 'created') and event_time >= primed_at:
+                    state.restart_count += 1
+                    state.pending_restarts += 1
+                state.container_id = actor.get('ID', event.get('id', None))
+                state.started_at = event_time
+                state.exit_code = None
+                state.set_status('running', event_time)
+            elif action == 'die':
+                exit_code = attributes.get('exitCode', None)
+                state.exit_code = int(exit_code) if exit_code is not None else None
+                state.set_status('exited', event_time)
+            elif action == 'oom':
+                state.oom_count += 1
+                if event_time >= primed_at:
+                    state.pending_ooms += 1
+            elif action == 'pause':
+                state.set_status('paused', event_time)
+            elif action == 'unpause':
+                state.set_status('running', event_time)
+            elif action == 'destroy':
+                state.container_id = None
+                state.health = None
+                state.set_status('removed', event_time)
+                if (host_id, name) not in self.consumers:
+                    del host_states[name]
+            elif action.startswith('health_status'):
+                state.health = action.split(':', 1)[1].strip() if ':' in action else None
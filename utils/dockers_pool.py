@@ -36,6 +36,7 @@ class DockersPool:
     def __init__(self, config):
         self.config = config
         self.default_docker_client = None
+        self.default_docker_id = None
         self._init_dockers()
 
     def has_client_with_id(self, client_id):
@@ -68,11 +69,27 @@ class DockersPool:
     def get_all_ids(self):
         return list(self.docker_clients) + [DockersPool.DEFAULT_ID]
 
+    def get_host_ids(self):
+        # one id per docker host: the default client is one of the configured
+        # dockers unless no dockers are configured at all
+        if self.docker_clients:
+            return list(self.docker_clients)
+        return [DockersPool.DEFAULT_ID]
+
+    def resolve_id(self, client_id):
+        # maps a docker id as used in the configuration (None for the default one)
+        # to the id of the host as returned by get_host_ids
+        if client_id is None or client_id == DockersPool.DEFAULT_ID:
+            return self.default_docker_id if self.default_docker_id else DockersPool.DEFAULT_ID
+        return client_id
+
     def _init_dockers(self):
         self.docker_clients = {}
         self.default_docker_client = None
+        self.default_docker_id = None
 
         first_client = None
+        first_client_id = None
 
         for docker_conn in self.config.get('dockers', []):
             docker_id = docker_conn['id']
@@ -104,15 +121,18 @@ class DockersPool:
 
             if first_client is None:
                 first_client = client
+                first_client_id = docker_id
 
             if is_default:
                 if self.default_docker_client:
                     raise ValueError("cannot have more than one default docker clients")
                 self.default_docker_client = client
+                self.default_docker_id = docker_id
 
         if self.default_docker_client is None:
             if first_client:
                 self.default_docker_client = first_client
+                self.default_docker_id = first_client_id
                 logging.warning(f"no default docker client defined: "
                                 f"using {self.default_docker_client.info().get('Name', '-')}")
             else:
@@ -0,0 +1,57 @@
+import concurrent.futures
+import itertools
+import os
+import threading
+
+import requests
+
+from utils.http_session_pool import HttpSessionPool
+
+
+# runs the HTTP requests of the due endpoint checks concurrently; the checks consume the
+# results afterwards, so statuses and alarms are still handled one service after another
+class HttpCheckEngine:
+    DEFAULT_CONCURRENCY = 32
+    DEFAULT_PER_HOST_CONCURRENCY = 4
+
+    def __init__(self, concurrency: int = None, per_host_concurrency: int = None):
+        self.concurrency = concurrency if concurrency else \
+            int(os.getenv("HTTP_CHECK_CONCURRENCY", str(HttpCheckEngine.DEFAULT_CONCURRENCY)))
+        self.per_host_concurrency = per_host_concurrency if per_host_concurrency else \
+            int(os.getenv("HTTP_CHECK_PER_HOST_CONCURRENCY", str(HttpCheckEngine.DEFAULT_PER_HOST_CONCURRENCY)))
+
+    @staticmethod
+    def execute(http_pool: HttpSessionPool, request: dict):
+        # request: keyword arguments of HttpSessionPool.request; returns response and error
+        try:
+            return {'response': http_pool.request(**request), 'error': None}
+        except (ConnectionError, requests.exceptions.RequestException) as error:
+            return {'response': None, 'error': error}
+
+    def run(self, http_pool: HttpSessionPool, requests_by_key: dict):
+        # requests_by_key: key -> request; returns key -> result of execute
+        if not requests_by_key:
+            return {}
+        host_semaphores = {}
+        by_host = {}
+        for key, request in requests_by_key.items():
+            host = HttpSessionPool.get_key(request['url'])
+            host_semaphores.setdefault(host, threading.Semaphore(self.per_host_concurrency))
+            by_host.setdefault(host, []).append(key)
+        # the hosts take turns, so that the workers do not all wait for the same busy host
+        missing = object()
+        ordered = [key for keys in itertools.zip_longest(*by_host.values(), fillvalue=missing)
+                   for key in keys if key is not missing]
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(self.concurrency, len(ordered)),
+                                                   thread_name_prefix="http-check") as executor:
+            futures = {key: executor.submit(HttpCheckEngine._run_one,
+                                            host_semaphores[HttpSessionPool.get_key(requests_by_key[key]['url'])],
+                                            http_pool, requests_by_key[key])
+                       for key in ordered}
+        return {key: futures[key].result() for key in requests_by_key}
+
+    @staticmethod
+    def _run_one(host_semaphore, http_pool, request):
+        with host_semaphore:
+            return HttpCheckEngine.execute(http_pool, request)
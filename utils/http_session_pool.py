@@ -0,0 +1,201 @@
+import logging
+import os
+import socket
+import threading
+import time
+import urllib.parse
+
+import requests
+import requests.adapters
+import urllib3.connection
+import urllib3.connectionpool
+import urllib3.util.connection
+
+from utils.version import __version__
+
+# timings of the connection set up by the current request, collected per thread
+_connect_timings = threading.local()
+_create_connection = urllib3.util.connection.create_connection
+
+
+def _timed_create_connection(address, *args, **kwargs):
+    # replaces urllib3's create_connection, timing only the requests of HttpSessionPool: the name
+    # is resolved once more beforehand, as urllib3 does it, to time the resolution; the original then
+    # connects unchanged (trying all addresses) and mostly gets the resolution from the resolver cache
+    if not getattr(_connect_timings, 'active', False):
+        return _create_connection(address, *args, **kwargs)
+    start = time.monotonic()
+    try:
+        socket.getaddrinfo(address[0], address[1], urllib3.util.connection.allowed_gai_family(), socket.SOCK_STREAM)
+    except OSError:
+        pass  # reported by the original
+    _connect_timings.namelookup = time.monotonic() - start
+    sock = _create_connection(address, *args, **kwargs)
+    _connect_timings.connect = time.monotonic() - start
+    return sock
+
+
+urllib3.util.connection.create_connection = _timed_create_connection
+
+
+class _TimedHTTPSConnection(urllib3.connection.HTTPSConnection):
+    def connect(self):
+        start = time.monotonic()
+        urllib3.connection.HTTPSConnection.connect(self)
+        if getattr(_connect_timings, 'active', False):
+            _connect_timings.appconnect = time.monotonic() - start
+
+
+class _TimedHTTPSConnectionPool(urllib3.connectionpool.HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedHTTPAdapter(requests.adapters.HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': urllib3.connectionpool.HTTPConnectionPool,
+                                                   'https': _TimedHTTPSConnectionPool}
+
+
+def _is_connection_refused(error):
+    # the refusal is wrapped by urllib3 (NewConnectionError, MaxRetryError) and requests
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, ConnectionRefusedError):
+            return True
+        seen.add(id(error))
+        cause = getattr(error, 'reason', None)
+        if not isinstance(cause, BaseException):
+            cause = error.args[0] if error.args and isinstance(error.args[0], BaseException) else None
+        error = cause if cause is not None else (error.__cause__ or error.__context__)
+    return False
+
+
+# keep-alive sessions shared by the HTTP checks, one per scheme and host
+class HttpSessionPool:
+    DEFAULT_CONNECT_TIMEOUT = 10  # seconds
+    DEFAULT_READ_TIMEOUT = 60  # seconds
+    DEFAULT_RETRIES = 1
+    DEFAULT_POOL_SIZE = 4  # connections kept per host
+    RETRY_BACKOFF = 0.5  # seconds, doubled on every retry
+    # methods whose requests can be sent again after a read timeout, the server may have processed them
+    IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE', 'TRACE')
+
+    def __init__(self, connect_timeout: float = None, read_timeout: float = None, retries: int = None,
+                 pool_size: int = DEFAULT_POOL_SIZE):
+        self.connect_timeout = connect_timeout if connect_timeout else \
+            float(os.getenv("HTTP_CONNECT_TIMEOUT", str(HttpSessionPool.DEFAULT_CONNECT_TIMEOUT)))
+        self.read_timeout = read_timeout if read_timeout else \
+            float(os.getenv("HTTP_READ_TIMEOUT", str(HttpSessionPool.DEFAULT_READ_TIMEOUT)))
+        self.retries = retries if retries is not None else \
+            int(os.getenv("HTTP_RETRIES", str(HttpSessionPool.DEFAULT_RETRIES)))
+        self.pool_size = pool_size
+        self.lock = threading.Lock()
+        self.sessions = {}  # (scheme, host:port) -> session
+        self.failures = {}  # (scheme, host:port) -> requests failed after all retries
+        self.retried = {}  # (scheme, host:port) -> retried requests
+
+    def request(self, method, url, connect_timeout=None, read_timeout=None, retries=None, **kwargs):
+        # connect timeouts and refused connections are retried, read timeouts only for idempotent methods;
+        # all attempts together take no longer than one attempt may. Any response, whatever its status,
+        # is returned with the timings of its last attempt in seconds from its start (as reported by curl -w)
+        key = HttpSessionPool.get_key(url)
+        session = self._get_session(key)
+        connect_timeout = connect_timeout if connect_timeout else self.connect_timeout
+        read_timeout = read_timeout if read_timeout else self.read_timeout
+        retries = retries if retries is not None else self.retries
+        deadline = time.monotonic() + connect_timeout + read_timeout
+
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                _connect_timings.namelookup = _connect_timings.connect = _connect_timings.appconnect = 0.0
+                _connect_timings.active = True
+                start = time.monotonic()
+                response = session.request(method, url, timeout=(min(connect_timeout, remaining),
+                                                                 min(read_timeout, remaining)), **kwargs)
+                # a reused connection costs neither name resolution nor connect
+                response.timings = {
+                    'time_namelookup': _connect_timings.namelookup,
+                    'time_connect': _connect_timings.connect,
+                    'time_appconnect': _connect_timings.appconnect,
+                    'time_starttransfer': response.elapsed.total_seconds(),
+                    'time_total': time.monotonic() - start
+                }
+                return response
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as error:
+                delay = HttpSessionPool.RETRY_BACKOFF * (2 ** attempt)
+                if attempt >= retries or not HttpSessionPool._is_retriable(method, error) \
+                        or time.monotonic() + delay >= deadline:
+                    with self.lock:
+                        self.failures[key] = self.failures.get(key, 0) + 1
+                    raise
+                logging.debug(f"retrying {url} in {delay} s: {error}")
+                with self.lock:
+                    self.retried[key] = self.retried.get(key, 0) + 1
+                time.sleep(delay)
+                attempt += 1
+            finally:
+                _connect_timings.active = False
+
+    def get_stats(self):
+        with self.lock:
+            sessions = dict(self.sessions)
+            failures = dict(self.failures)
+            retried = dict(self.retried)
+
+        ret = {}
+        for key, session in sessions.items():
+            num_requests = 0
+            num_connections = 0
+            open_connections = 0
+            pools = session.get_adapter(f"{key[0]}://{key[1]}").poolmanager.pools
+            for pool in [pools.get(pool_key, None) for pool_key in pools.keys()]:
+                if pool is None:
+                    continue
+                num_requests += pool.num_requests
+                num_connections += pool.num_connections
+                open_connections += sum(1 for conn in list(pool.pool.queue)
+                                        if conn is not None and getattr(conn, 'sock', None) is not None)
+            ret[f"{key[0]}://{key[1]}"] = {
+                'requests': num_requests,
+                'connections_created': num_connections,
+                'open_connections': open_connections,
+                'reuse_ratio': round(1.0 - num_connections / num_requests, 3) if num_requests else None,
+                'retried': retried.get(key, 0),
+                'failed': failures.get(key, 0)
+            }
+        return ret
+
+    def close(self):
+        with self.lock:
+            sessions = list(self.sessions.values())
+            self.sessions.clear()
+        for session in sessions:
+            session.close()
+
+    @staticmethod
+    def _is_retriable(method, error):
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+        if isinstance(error, requests.exceptions.ReadTimeout):
+            return method.upper() in HttpSessionPool.IDEMPOTENT_METHODS
+        return _is_connection_refused(error)
+
+    @staticmethod
+    def get_key(url):
+        parsed = urllib.parse.urlsplit(url)
+        port = parsed.port if parsed.port else (443 if parsed.scheme == 'https' else 80)
+        return parsed.scheme, f"{parsed.hostname}:{port}"
+
+    def _get_session(self, key):
+        with self.lock:
+            session = self.sessions.get(key, None)
+            if session is None:
+                session = requests.Session()
+                adapter = _TimedHTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount(f"{key[0]}://", adapter)
+                session.headers['User-Agent'] = 'EaDoMo/' + __version__
+                self.sessions[key] = session
+            return session
@@ -0,0 +1,290 @@
+import json
+import logging
+import os
+import select
+import shutil
+import struct
+import subprocess
+import threading
+import time
+import urllib.parse
+from typing import List
+
+import docker
+import docker.errors
+import jmxquery
+
+JMX_AGENT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'jmx_agent')
+JMX_AGENT_CLASS = "JmxQueryDaemon"
+JMX_AGENT_CONTAINER_CLASSPATH = "/opt/jmxquery"
+
+
+class JmxAgentUnavailable(RuntimeError):
+    pass
+
+
+def load_metrics(json_output: str) -> List[jmxquery.JMXQuery]:
+    # the JSON array printed by JMXQuery (and by the agent, in the same format)
+    metrics = []
+    for json_metric in json.loads(json_output):
+        metrics.append(jmxquery.JMXQuery(json_metric['mBeanName'],
+                                         json_metric['attribute'],
+                                         json_metric.get('attributeKey', None),
+                                         json_metric.get('value', None),
+                                         json_metric['attributeType'],
+                                         json_metric.get('metricName', None),
+                                         json_metric.get('metricLabels', None)))
+    return metrics
+
+
+# client side of the long-running JMX query agent (jmx_agent/JmxQueryDaemon.java);
+# the transport to the agent process is provided by the subclasses.
+# The agent is given up only if it cannot run at all (no java, agent missing in the image);
+# after any other failure it is restarted with a growing delay, meanwhile the queries are
+# reported as JmxAgentUnavailable so that the caller can use its fallback
+class JmxAgent:
+    RETRY_BACKOFF = 5  # seconds, doubled with every failure in a row
+    MAX_RETRY_BACKOFF = 300  # seconds
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buffer = b''
+        self.running = False
+        self.available = True
+        self.failures = 0  # failures in a row
+        self.retry_at = 0.0  # monotonic time of the next start after a failure
+
+    def request(self, connection_uri, username, password, queries: List[jmxquery.JMXQuery], timeout) -> str:
+        fields = [connection_uri, username, password]
+        line = "\t".join(urllib.parse.quote(x or '', safe='') for x in fields)
+        for query in queries:
+            line += "\t" + JmxAgent._encode_query(query)
+        line += "\n"
+
+        with self.lock:
+            if not self.available:
+                raise JmxAgentUnavailable("JMX agent is not available")
+            if time.monotonic() < self.retry_at:
+                raise JmxAgentUnavailable(f"JMX agent failed, restarting it in "
+                                          f"{self.retry_at - time.monotonic():.0f} s")
+            try:
+                if not self.running:
+                    self.buffer = b''
+                    self._start()
+                    self.running = True
+                self._write(line.encode('utf-8'))
+                response = self._read_line(timeout)
+                self.failures = 0
+            except TimeoutError as error:
+                # the agent may still answer later; start over with a fresh one
+                self.running = False
+                self._close()
+                raise RuntimeError(f"JMX agent failed: {error}") from error
+            except JmxAgentUnavailable:
+                self.available = False
+                raise
+            except (OSError, EOFError, docker.errors.DockerException) as error:
+                reason = self._get_unavailable_reason()  # pylint: disable=assignment-from-none
+                self.running = False
+                self._close()
+                if reason is not None:
+                    self.available = False
+                    raise JmxAgentUnavailable(f"JMX agent cannot run: {reason}") from error
+                self.failures += 1
+                backoff = min(JmxAgent.RETRY_BACKOFF * 2 ** (self.failures - 1), JmxAgent.MAX_RETRY_BACKOFF)
+                self.retry_at = time.monotonic() + backoff
+                raise JmxAgentUnavailable(f"JMX agent failed, restarting it in {backoff} s: {error}") from error
+
+        if response.startswith('['):
+            return response
+        try:
+            error = json.loads(response).get('error', response)
+        except ValueError:
+            error = response
+        raise RuntimeError(f"JMX query failed: {error}")
+
+    def close(self):
+        with self.lock:
+            if self.running:
+                self.running = False
+                self._close()
+
+    def _read_line(self, timeout):
+        deadline = time.monotonic() + timeout
+        while b'\n' not in self.buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("no response from JMX agent")
+            chunk = self._read(remaining)
+            if chunk is None:
+                continue
+            if not chunk:
+                raise EOFError("JMX agent exited")
+            self.buffer += chunk
+        line, self.buffer = self.buffer.split(b'\n', 1)
+        return line.decode('utf-8')
+
+    @staticmethod
+    def _encode_query(query: jmxquery.JMXQuery):
+        labels = "&".join(f"{urllib.parse.quote(k, safe='')}={urllib.parse.quote(str(v), safe='')}"
+                          for k, v in (query.metric_labels or {}).items())
+        return " ".join([urllib.parse.quote(x or '', safe='') for x in
+                         (query.mBeanName, query.attribute, query.attributeKey, query.metric_name)] + [labels])
+
+    def _start(self):
+        # raises JmxAgentUnavailable if the agent cannot run at all
+        raise NotImplementedError()
+
+    def _get_unavailable_reason(self):
+        # after the agent failed: why it cannot run at all, None if it may work when restarted
+        return None
+
+    def _write(self, data: bytes):
+        raise NotImplementedError()
+
+    def _read(self, timeout):
+        # returns the available bytes, None if nothing arrived in time, b'' at the end of the stream
+        raise NotImplementedError()
+
+    def _close(self):
+        raise NotImplementedError()
+
+
+# agent running as a child process of EaDoMo, for JMX URLs reachable directly
+class LocalJmxAgent(JmxAgent):
+    def __init__(self, java_path=jmxquery.DEFAULT_JAVA_PATH):
+        super().__init__()
+        self.java_path = java_path
+        self.process = None
+
+    def _start(self):
+        if shutil.which(self.java_path) is None:
+            raise JmxAgentUnavailable(f"{self.java_path} not found")
+        if os.path.exists(os.path.join(JMX_AGENT_DIR, f"{JMX_AGENT_CLASS}.class")):
+            command = [self.java_path, "-cp", JMX_AGENT_DIR, JMX_AGENT_CLASS]
+        elif not os.path.exists(os.path.join(JMX_AGENT_DIR, f"{JMX_AGENT_CLASS}.java")):
+            raise JmxAgentUnavailable(f"{JMX_AGENT_CLASS} not found in {JMX_AGENT_DIR}")
+        else:
+            # source-file mode, Java 11 or newer
+            command = [self.java_path, os.path.join(JMX_AGENT_DIR, f"{JMX_AGENT_CLASS}.java")]
+        logging.info(f"starting local JMX agent: {command}")
+        # the agent outlives this method, it is terminated by _close
+        self.process = subprocess.Popen(command,  # pylint: disable=consider-using-with
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL)
+
+    def _write(self, data: bytes):
+        self.process.stdin.write(data)
+        self.process.stdin.flush()
+
+    def _read(self, timeout):
+        ready, _, _ = select.select([self.process.stdout], [], [], timeout)
+        if not ready:
+            return None
+        return os.read(self.process.stdout.fileno(), 65536)
+
+    def _close(self):
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+            self.process.wait(5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+        self.process = None
+
+
+# agent running inside the JMX proxy container, talked to through an attached exec
+class DockerExecJmxAgent(JmxAgent):
+    STDOUT = 1
+    MAX_STDERR = 4096  # bytes of the error output kept to find out why the agent failed
+    COMMAND_NOT_FOUND = (126, 127)  # exit codes of an exec whose command cannot be run
+
+    def __init__(self, container):
+        super().__init__()
+        self.container = container
+        self.sock = None
+        self.exec_id = None
+        self.frames = b''
+        self.stderr = b''
+
+    def _start(self):
+        api = self.container.client.api
+        self.exec_id = api.exec_create(self.container.id,
+                                       ["java", "-cp", JMX_AGENT_CONTAINER_CLASSPATH, JMX_AGENT_CLASS],
+                                       stdin=True, stdout=True, stderr=True)['Id']
+        sock = api.exec_start(self.exec_id, socket=True)
+        self.sock = getattr(sock, '_sock', sock)
+        self.frames = b''
+        self.stderr = b''
+
+    def _get_unavailable_reason(self):
+        if self.exec_id is None:
+            return None
+        try:
+            exit_code = self.container.client.api.exec_inspect(self.exec_id).get('ExitCode', None)
+        except docker.errors.DockerException:
+            exit_code = None
+        if exit_code in DockerExecJmxAgent.COMMAND_NOT_FOUND:
+            return f"java not found in {self.container.name}"
+        if b"Could not find or load main class" in self.stderr:
+            return f"{JMX_AGENT_CLASS} not found in {self.container.name}"
+        return None
+
+    def _write(self, data: bytes):
+        self.sock.sendall(data)
+
+    def _read(self, timeout):
+        # without a tty the output is multiplexed: 8 bytes header (stream, size) + payload
+        while True:
+            if len(self.frames) >= 8:
+                stream, size = struct.unpack('>BxxxL', self.frames[:8])
+                if len(self.frames) >= 8 + size:
+                    payload = self.frames[8:8 + size]
+                    self.frames = self.frames[8 + size:]
+                    if stream == DockerExecJmxAgent.STDOUT:
+                        return payload
+                    self.stderr = (self.stderr + payload)[-DockerExecJmxAgent.MAX_STDERR:]
+                    logging.debug(f"JMX agent in {self.container.name}: {payload.decode('utf-8', 'replace')}")
+                    continue
+            ready, _, _ = select.select([self.sock], [], [], timeout)
+            if not ready:
+                return None
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                return b''
+            self.frames += chunk
+
+    def _close(self):
+        if self.sock is None:
+            return
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+        self.sock = None
+        self.exec_id = None
+
+
+class JmxAgentConnection(jmxquery.JMXConnection):
+    def __init__(self, agent: JmxAgent, connection_uri, jmx_username=None, jmx_password=None,
+                 fallback: jmxquery.JMXConnection = None):
+        super().__init__(connection_uri, jmx_username, jmx_password)
+        self.agent = agent
+        # per-poll JVM, used if the agent cannot be started
+        self.fallback = fallback
+
+    def query(self, queries: List[jmxquery.JMXQuery], timeout=jmxquery.DEFAULT_JAR_TIMEOUT) -> List[jmxquery.JMXQuery]:
+        if self.agent.available:
+            try:
+                json_output = self.agent.request(self.connection_uri, self.jmx_username, self.jmx_password,
+                                                 queries, timeout)
+                return load_metrics(json_output)
+            except JmxAgentUnavailable as error:
+                logging.warning(f"{error}; falling back to a JVM per query")
+        if self.fallback is None:
+            raise RuntimeError("JMX agent is not available")
+        return self.fallback.query(queries, timeout)
+
+    def close(self):
+        self.agent.close()
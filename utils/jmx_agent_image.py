@@ -0,0 +1,109 @@
+import hashlib
+import logging
+import os
+import tarfile
+import tempfile
+import threading
+import time
+
+import docker
+import docker.errors
+import requests
+
+from utils.dockers_pool import DockersPool
+from utils.jmx_agent import JMX_AGENT_CLASS, JMX_AGENT_DIR
+
+# build context of the JMX agent image: file -> name in the context
+JMX_AGENT_IMAGE_CONTEXT = {
+    "Dockerfile_jmx_agent": "Dockerfile",
+    "JMXQuery-0.1.8.jar": "JMXQuery-0.1.8.jar",
+    os.path.join(JMX_AGENT_DIR, f"{JMX_AGENT_CLASS}.java"): f"{JMX_AGENT_CLASS}.java"
+}
+
+
+def get_context_hash():
+    digest = hashlib.sha256()
+    for path, arcname in sorted(JMX_AGENT_IMAGE_CONTEXT.items(), key=lambda x: x[1]):
+        digest.update(arcname.encode('utf-8') + b'\0')
+        with open(path, 'rb') as file:
+            digest.update(hashlib.sha256(file.read()).digest())
+    return digest.hexdigest()
+
+
+# builds the JMX agent image in the background, once per docker host; the image is labelled
+# with the hash of its build context, so an image built from the same files is not rebuilt
+class JmxAgentImageBuilder:
+    LABEL_HASH = "eadomo.jmx-agent.hash"
+    RETRY_DELAY = 300  # seconds after a failed build
+
+    def __init__(self, dockers_pool: DockersPool, image: str):
+        self.dockers_pool = dockers_pool
+        self.image = image
+        self.context_hash = get_context_hash()
+        self.lock = threading.Lock()
+        self.ready = {}  # docker host id -> event set once the image is available
+        self.failed_at = {}  # docker host id -> monotonic time of the last failed build
+        self.building = set()
+
+    def start(self, docker_ids):
+        for docker_id in docker_ids:
+            self.is_ready(docker_id)
+
+    def is_ready(self, docker_id) -> bool:
+        # starts the build for the host if not done yet, never blocks
+        host_id = self.dockers_pool.resolve_id(docker_id)
+        with self.lock:
+            event = self.ready.setdefault(host_id, threading.Event())
+            if event.is_set():
+                return True
+            if host_id in self.building or \
+                    time.monotonic() - self.failed_at.get(host_id, -JmxAgentImageBuilder.RETRY_DELAY) \
+                    < JmxAgentImageBuilder.RETRY_DELAY:
+                return False
+            self.building.add(host_id)
+        threading.Thread(target=self._build, args=(host_id, docker_id), name=f"jmx-agent-image-{host_id}",
+                         daemon=True).start()
+        return False
+
+    def _build(self, host_id, docker_id):
+        succeeded = False
+        try:
+            docker_client = self.dockers_pool.get_client_for_id(docker_id) if docker_id \
+                else self.dockers_pool.get_default_client()
+            if docker_client is not None:
+                succeeded = self._is_built(docker_client) or self._build_int(docker_client)
+        except (docker.errors.DockerException, requests.exceptions.RequestException, OSError) as error:
+            logging.error(f"failed to build JMX agent image on {host_id}: {error}")
+        with self.lock:
+            self.building.discard(host_id)
+            if succeeded:
+                self.ready[host_id].set()
+            else:
+                self.failed_at[host_id] = time.monotonic()
+
+    def _is_built(self, docker_client):
+        try:
+            image = docker_client.images.get(f"{self.image}:latest")
+        except docker.errors.ImageNotFound:
+            return False
+        if (image.labels or {}).get(JmxAgentImageBuilder.LABEL_HASH, None) != self.context_hash:
+            return False
+        logging.debug(f"JMX agent image {self.context_hash[:12]} is up to date")
+        return True
+
+    def _build_int(self, docker_client):
+        logging.info(f"building JMX agent image {self.context_hash[:12]}")
+
+        with tempfile.TemporaryFile() as build_context:
+            with tarfile.open(fileobj=build_context, mode="w") as tar:
+                for path, arcname in JMX_AGENT_IMAGE_CONTEXT.items():
+                    tar.add(name=path, arcname=arcname)
+
+            build_context.seek(0, 0)
+
+            docker_client.images.build(
+                fileobj=build_context,
+                custom_context=True,
+                labels={JmxAgentImageBuilder.LABEL_HASH: self.context_hash},
+                tag=f"{self.image}:latest")
+        return True
@@ -0,0 +1,191 @@
+import logging
+import threading
+import time
+from typing import Callable
+
+import docker
+import docker.errors
+import requests
+
+from utils.docker_events import DockerEventsMonitor
+from utils.dockers_pool import DockersPool
+from utils.jmx_agent import DockerExecJmxAgent, JmxAgentConnection
+
+
+class JmxProxy:
+    def __init__(self, container, target: dict, port, connection: JmxAgentConnection):
+        self.container = container
+        self.target = target  # id, started_at (from inspect) and generation (from events) of the target
+        self.port = port
+        self.connection = connection
+        self.suspect = False  # a poll failed, the proxy is inspected before the next one
+
+
+# socat proxies living in the network namespace of the JMX targets; a proxy is tied to
+# one start of its target and is recreated together with its agent connection when the
+# target restarts
+class JmxProxyManager:
+    LABEL = "eadomo.jmxproxy"
+    LABEL_TARGET = "eadomo.jmxproxy.target"
+    LABEL_TARGET_KEY = "eadomo.jmxproxy.target-key"
+
+    GC_INTERVAL = 600  # seconds between removals of proxies of unknown targets
+
+    def __init__(self, dockers_pool: DockersPool, image: str, listen_port: int,
+                 fallback_factory: Callable = None, events_monitor: DockerEventsMonitor = None):
+        self.dockers_pool = dockers_pool
+        self.image = image
+        self.listen_port = listen_port
+        # builds the per-poll JVM connection used if the agent cannot be started in the proxy
+        self.fallback_factory = fallback_factory
+        self.events_monitor = events_monitor
+        self.lock = threading.Lock()
+        self.proxies = {}  # (docker host id, target container) -> proxy
+        self.last_gc = {}  # docker host id -> monotonic time
+
+    def get_connection(self, docker_id, docker_client, target_container, port) -> JmxAgentConnection:
+        host_id = self.dockers_pool.resolve_id(docker_id)
+        key = (host_id, target_container)
+
+        self._collect_garbage(host_id, docker_client)
+
+        with self.lock:
+            proxy = self.proxies.get(key, None)
+        if proxy is not None and proxy.port == port \
+                and self._is_target_unchanged(docker_id, docker_client, target_container, proxy) \
+                and self._is_alive(docker_id, proxy):
+            return proxy.connection
+
+        if proxy is not None:
+            logging.info(f"JMX proxy of {target_container} is outdated")
+            proxy.connection.agent.close()
+        proxy = self._create(docker_id, docker_client, target_container, port)
+        with self.lock:
+            self.proxies[key] = proxy
+        return proxy.connection
+
+    def report_failure(self, docker_id, target_container):
+        with self.lock:
+            proxy = self.proxies.get((self.dockers_pool.resolve_id(docker_id), target_container), None)
+        if proxy is not None:
+            proxy.suspect = True
+
+    def stop(self):
+        with self.lock:
+            proxies = list(self.proxies.values())
+        for proxy in proxies:
+            proxy.connection.agent.close()
+
+    @staticmethod
+    def get_proxy_name(target_container):
+        return target_container + "-docker-env-checker-jmxproxy"
+
+    def _get_generation(self, docker_id, name):
+        if self.events_monitor is None or not self.events_monitor.is_tracking(docker_id):
+            return None
+        state = self.events_monitor.get_state(docker_id, name)
+        return state['generation'] if state else None
+
+    @staticmethod
+    def _inspect_target(docker_client, target_container):
+        target = docker_client.containers.get(target_container)
+        return {'id': target.id, 'started_at': target.attrs['State'].get('StartedAt', None)}
+
+    def _is_target_unchanged(self, docker_id, docker_client, target_container, proxy: JmxProxy):
+        # the proxy shares the network namespace of one start of the target; without lifecycle
+        # events of the target since the proxy was created there is no need to ask docker
+        generation = self._get_generation(docker_id, target_container)
+        if generation is not None and generation == proxy.target['generation']:
+            return True
+        target = self._inspect_target(docker_client, target_container)
+        if target['id'] != proxy.target['id'] or target['started_at'] != proxy.target['started_at']:
+            return False
+        proxy.target['generation'] = generation
+        return True
+
+    def _is_alive(self, docker_id, proxy: JmxProxy):
+        if self.events_monitor and self.events_monitor.is_tracking(docker_id):
+            state = self.events_monitor.get_state(docker_id, proxy.container.name)
+            if state is not None and state['status'] in ('exited', 'removed'):
+                return False
+        if not proxy.suspect:
+            return True
+        try:
+            proxy.container.reload()
+        except docker.errors.NotFound:
+            return False
+        proxy.suspect = False
+        return proxy.container.status == 'running'
+
+    def _create(self, docker_id, docker_client, target_container, port):
+        proxy_name = JmxProxyManager.get_proxy_name(target_container)
+        generation = self._get_generation(docker_id, target_container)
+        target = JmxProxyManager._inspect_target(docker_client, target_container)
+        target['generation'] = generation
+        labels = {
+            JmxProxyManager.LABEL: "true",
+            JmxProxyManager.LABEL_TARGET: target_container,
+            JmxProxyManager.LABEL_TARGET_KEY: f"{target['id']}/{target['started_at']}/{port}"
+        }
+
+        container = None
+        try:
+            existing = docker_client.containers.get(proxy_name)
+            # a proxy left over by a previous run is reused if it belongs to the current start of the target
+            if existing.labels.get(JmxProxyManager.LABEL_TARGET_KEY, None) == labels[JmxProxyManager.LABEL_TARGET_KEY] \
+                    and existing.status == 'running':
+                container = existing
+            else:
+                logging.info(f"removing outdated JMX proxy {proxy_name}")
+                existing.remove(force=True)
+        except docker.errors.NotFound:
+            pass
+
+        if container is None:
+            logging.info(f"creating JMX proxy {proxy_name}")
+            container = docker_client.containers.run(
+                self.image,
+                f"socat tcp-listen:{self.listen_port},fork,reuseaddr tcp-connect:{target_container}:{port}",
+                name=proxy_name,
+                detach=True,
+                remove=True,
+                labels=labels,
+                network_mode=f"container:{target_container}")
+
+        connection = JmxAgentConnection(
+            DockerExecJmxAgent(container),
+            f"service:jmx:rmi:///jndi/rmi://localhost:{self.listen_port}/jmxrmi",
+            fallback=self.fallback_factory(container) if self.fallback_factory else None)
+        return JmxProxy(container, target, port, connection)
+
+    def _collect_garbage(self, host_id, docker_client):
+        now = time.monotonic()
+        with self.lock:
+            if now - self.last_gc.get(host_id, 0) < JmxProxyManager.GC_INTERVAL:
+                return
+            self.last_gc[host_id] = now
+            known = {key[1] for key in self.proxies if key[0] == host_id}
+
+        try:
+            containers = docker_client.containers.list(all=True, filters={'label': JmxProxyManager.LABEL})
+        except (docker.errors.DockerException, requests.exceptions.RequestException) as error:
+            logging.warning(f"failed to list JMX proxies: {error}")
+            return
+        configured = self._get_configured_targets(host_id)
+        for cont in containers:
+            target = cont.labels.get(JmxProxyManager.LABEL_TARGET, None)
+            if target in known or target in configured:
+                continue
+            logging.info(f"removing orphaned JMX proxy {cont.name}")
+            try:
+                cont.remove(force=True)
+            except docker.errors.DockerException as error:
+                logging.warning(f"failed to remove JMX proxy {cont.name}: {error}")
+
+    def _get_configured_targets(self, host_id):
+        targets = set()
+        for service in self.dockers_pool.config.get('jmx', []):
+            url_docker = service.get('url', {}).get('docker', None)
+            if url_docker and self.dockers_pool.resolve_id(service.get('docker', None)) == host_id:
+                targets.add(url_docker['container'])
+        return targets
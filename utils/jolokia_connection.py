@@ -0,0 +1,83 @@
+import logging
+from typing import List
+
+import jmxquery
+import requests
+import requests.adapters
+
+from utils.version import __version__
+
+
+# JMX over HTTP through a Jolokia agent: all mbeans of a poll are read by one bulk request
+# on a keep-alive session
+class JolokiaConnection(jmxquery.JMXConnection):
+    def __init__(self, url, username=None, password=None):
+        super().__init__(url, username, password)
+        self.url = url.rstrip('/') + '/'
+        self.session = requests.Session()
+        self.session.mount('http://', requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.session.headers['User-Agent'] = 'EaDoMo/' + __version__
+        if username:
+            self.session.auth = (username, password or '')
+
+    def query(self, queries: List[jmxquery.JMXQuery], timeout=jmxquery.DEFAULT_JAR_TIMEOUT) -> List[jmxquery.JMXQuery]:
+        if not queries:
+            return []
+        body = [JolokiaConnection._to_request(query) for query in queries]
+        try:
+            response = self.session.post(self.url, json=body, timeout=timeout)
+            response.raise_for_status()
+            results = response.json()
+        except (requests.exceptions.RequestException, ValueError) as error:
+            raise RuntimeError(f"Jolokia request to {self.url} failed: {error}") from error
+        if not isinstance(results, list) or len(results) != len(queries):
+            raise RuntimeError(f"unexpected Jolokia response from {self.url}")
+
+        metrics = []
+        for query, result in zip(queries, results):
+            if result.get('status', None) != 200:
+                # the mbean or attribute is not available in this JVM
+                logging.debug(f"Jolokia read of {query.mBeanName} failed: {result.get('error', result)}")
+                continue
+            value = result.get('value', None)
+            if '*' in query.mBeanName or '?' in query.mBeanName:
+                # patterns return the attributes of all matching mbeans by their names
+                for mbean_name, attributes in (value or {}).items():
+                    JolokiaConnection._add_metrics(metrics, query, mbean_name, attributes or {})
+            elif query.attribute:
+                JolokiaConnection._add_metrics(metrics, query, query.mBeanName, {query.attribute: value})
+            else:
+                JolokiaConnection._add_metrics(metrics, query, query.mBeanName, value or {})
+        return metrics
+
+    def close(self):
+        self.session.close()
+
+    @staticmethod
+    def _to_request(query: jmxquery.JMXQuery):
+        request = {'type': 'read', 'mbean': query.mBeanName}
+        if query.attribute:
+            request['attribute'] = query.attribute
+            if query.attributeKey:
+                request['path'] = query.attributeKey
+        return request
+
+    @staticmethod
+    def _add_metrics(metrics, query: jmxquery.JMXQuery, mbean_name, attributes: dict):
+        for attribute, attr_value in attributes.items():
+            if query.attributeKey:
+                metrics.append(JolokiaConnection._to_metric(query, mbean_name, attribute, query.attributeKey,
+                                                            attr_value))
+            elif isinstance(attr_value, dict):
+                # composite data: one metric per key, as returned by JMXQuery
+                for attribute_key, key_value in attr_value.items():
+                    metrics.append(JolokiaConnection._to_metric(query, mbean_name, attribute, attribute_key,
+                                                                key_value))
+            else:
+                metrics.append(JolokiaConnection._to_metric(query, mbean_name, attribute, None, attr_value))
+
+    @staticmethod
+    def _to_metric(query: jmxquery.JMXQuery, mbean_name, attribute, attribute_key, value):
+        return jmxquery.JMXQuery(mbean_name, attribute, attribute_key, value, type(value).__name__,
+                                 query.metric_name, query.metric_labels)
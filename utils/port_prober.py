@@ -0,0 +1,34 @@
+import shlex
+
+from utils.probe_manager import ProbeManager
+
+DEFAULT_TIMEOUT = 10  # seconds
+EXEC_TIMEOUT_MARGIN = 10  # seconds
+
+
+def probe_ports(probe_manager: ProbeManager, docker_client, hostname, ports, *, network_target=None,
+                target_key=None, timeout=DEFAULT_TIMEOUT):
+    # all ports are tested in parallel by one exec in the probe, so the closed ones cost
+    # one timeout in total; the latency is taken from /proc/uptime (10 ms resolution)
+    ports = list(dict.fromkeys(int(x) for x in ports))
+    if not ports:
+        return {}
+    script = f"for p in {' '.join(str(x) for x in ports)}; do (" \
+             f"s=$(cut -d' ' -f1 /proc/uptime); " \
+             f"if nc -zw{int(timeout)} {shlex.quote(hostname)} $p; then r=open; else r=closed; fi; " \
+             f"e=$(cut -d' ' -f1 /proc/uptime); " \
+             f"echo \"$p $r $s $e\") & done; wait"
+    output = probe_manager.run(docker_client, ProbeManager.BUSYBOX_IMAGE, ["sh", "-c", script],
+                               network_target=network_target, target_key=target_key,
+                               timeout=timeout + EXEC_TIMEOUT_MARGIN)
+
+    ret = {}
+    for line in output.decode('utf-8').split("\n"):
+        fields = line.split()
+        if len(fields) != 4 or not fields[0].isdigit() or int(fields[0]) not in ports:
+            continue
+        ret[int(fields[0])] = {
+            'open': fields[1] == 'open',
+            'latency_ms': round((float(fields[3]) - float(fields[2])) * 1000.0)
+        }
+    return ret
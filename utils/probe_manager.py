@@ -0,0 +1,180 @@
+import hashlib
+import logging
+import shlex
+import threading
+import time
+
+import docker
+import docker.errors
+import requests
+
+
+class Probe:
+    def __init__(self, container, target_key=None):
+        self.container = container
+        self.target_key = target_key
+        self.last_used = time.monotonic()
+
+
+# long-lived probe containers executing the check commands with exec instead of
+# creating, starting and removing a container for every single command:
+#  - one probe per docker host and image
+#  - one probe per target container sharing the network namespace of the target
+# the probes do not mount anything from the host: commands which need host paths run in a
+# short-lived container mounting only those paths (run_once)
+class ProbeManager:
+    BUSYBOX_IMAGE = "busybox:latest"
+    CURL_IMAGE = "curlimages/curl"
+    HOST_ROOT = "/host"
+
+    LABEL = "eadomo.probe"
+    LABEL_SPEC = "eadomo.probe.spec"
+    LABEL_TARGET = "eadomo.probe.target"
+
+    GC_INTERVAL = 600  # seconds between removals of probes which are not used anymore
+    DEFAULT_EXEC_TIMEOUT = 60  # seconds
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.probes = {}  # (docker host url, probe name) -> probe
+        self.host_locks = {}  # (docker host url, probe name) -> lock serializing probe (re)creation
+        self.last_gc = {}  # docker host url -> monotonic time
+
+    def run(self, docker_client, image, command, *, network_target=None, target_key=None, stdout=True,
+            stderr=False, timeout=DEFAULT_EXEC_TIMEOUT):
+        # same contract as containers.run(..., remove=True): returns the output,
+        # raises ContainerError on a non-zero exit status;
+        # target_key identifies the current start of network_target (e.g. id and start time), a restarted
+        # target gets a new network namespace and the probe has to follow it;
+        # exec_run cannot be interrupted, the command is killed by timeout inside the probe after
+        # timeout seconds instead (exit status 143), so that a hanging command does not block the checker
+        command = ["timeout", str(int(timeout))] + (shlex.split(command) if isinstance(command, str) else command)
+        try:
+            probe = self._get_probe(docker_client, image, network_target=network_target, target_key=target_key)
+            result = probe.container.exec_run(command, stdout=stdout, stderr=stderr)
+        except docker.errors.APIError as error:
+            # the probe died or was removed behind our back; recreate it once
+            logging.warning(f"probe exec failed, recreating the probe: {error}")
+            probe = self._get_probe(docker_client, image, network_target=network_target, target_key=target_key,
+                                    force_new=True)
+            result = probe.container.exec_run(command, stdout=stdout, stderr=stderr)
+        if result.exit_code is None:
+            raise docker.errors.APIError(f"exec in probe {probe.container.name} did not finish")
+        if result.exit_code != 0:
+            raise docker.errors.ContainerError(probe.container, result.exit_code, command, image,
+                                               result.output)
+        return result.output
+
+    @staticmethod
+    def run_once(docker_client, image, command, host_paths):
+        # runs the command in a container removed afterwards, with the given host paths
+        # mounted read-only below HOST_ROOT
+        volumes = {path: {'bind': ProbeManager.HOST_ROOT + path.rstrip('/'), 'mode': 'ro'}
+                   for path in dict.fromkeys(host_paths)}
+        return docker_client.containers.run(image, command, remove=True, volumes=volumes)
+
+    def stop(self):
+        with self.lock:
+            probes = list(self.probes.values())
+            self.probes.clear()
+        for probe in probes:
+            try:
+                probe.container.remove(force=True)
+            except (docker.errors.DockerException, requests.exceptions.RequestException) as error:
+                logging.warning(f"failed to remove probe {probe.container.name}: {error}")
+
+    def _get_probe(self, docker_client, image, *, network_target, target_key, force_new=False):
+        host_url = docker_client.api.base_url
+        image_name = image.split('/')[-1].split(':')[0]
+        name = f"eadomo-probe-{image_name}-{network_target}" if network_target else f"eadomo-probe-{image_name}"
+        key = (host_url, name)
+
+        self._collect_garbage(docker_client, host_url)
+
+        with self.lock:
+            creation_lock = self.host_locks.setdefault(key, threading.Lock())
+
+        with creation_lock:
+            if network_target and target_key is None:
+                target_key = self._get_target_key(docker_client, network_target)
+            with self.lock:
+                probe = self.probes.get(key, None)
+            if probe is not None and probe.target_key == target_key and not force_new:
+                probe.last_used = time.monotonic()
+                return probe
+
+            probe = Probe(self._create(docker_client, name, image, network_target=network_target,
+                                       target_key=target_key, force_new=force_new),
+                          target_key)
+            with self.lock:
+                self.probes[key] = probe
+            return probe
+
+    @staticmethod
+    def _get_target_key(docker_client, network_target):
+        # only for callers which do not know the target container
+        target = docker_client.containers.get(network_target)
+        return f"{target.id}/{target.attrs['State'].get('StartedAt', '')}"
+
+    @staticmethod
+    def _create(docker_client, name, image, *, network_target, target_key, force_new):
+        params = {
+            'name': name,
+            'entrypoint': ["tail", "-f", "/dev/null"],
+            'detach': True,
+            'auto_remove': False,
+            'labels': {ProbeManager.LABEL: "true"}
+        }
+        if network_target:
+            params['network_mode'] = f"container:{network_target}"
+            params['labels'][ProbeManager.LABEL_TARGET] = network_target
+        spec = hashlib.sha1(f"{image}|{target_key}".encode('utf-8')).hexdigest()[:12]
+        params['labels'][ProbeManager.LABEL_SPEC] = spec
+
+        # a probe left over by a previous run can be reused if it was made the same way
+        try:
+            existing = docker_client.containers.get(name)
+            if existing.labels.get(ProbeManager.LABEL_SPEC, None) == spec and existing.status == 'running' \
+                    and not force_new:
+                return existing
+            existing.remove(force=True)
+        except docker.errors.NotFound:
+            pass
+
+        logging.info(f"creating probe container {name}")
+        try:
+            return docker_client.containers.run(image, **params)
+        except docker.errors.ImageNotFound:
+            docker_client.images.pull(image)
+            return docker_client.containers.run(image, **params)
+
+    def _collect_garbage(self, docker_client, host_url):
+        now = time.monotonic()
+        with self.lock:
+            if now - self.last_gc.get(host_url, 0) < ProbeManager.GC_INTERVAL:
+                return
+            self.last_gc[host_url] = now
+
+        try:
+            containers = docker_client.containers.list(all=True, filters={'label': ProbeManager.LABEL})
+        except (docker.errors.DockerException, requests.exceptions.RequestException) as error:
+            logging.warning(f"failed to list probe containers: {error}")
+            return
+
+        # determined after listing: a probe created meanwhile is either registered
+        # already or its creation lock is still held
+        with self.lock:
+            for key, probe in list(self.probes.items()):
+                if key[0] == host_url and now - probe.last_used > ProbeManager.GC_INTERVAL:
+                    del self.probes[key]
+            in_use = {key[1] for key, probe in self.probes.items() if key[0] == host_url}
+            in_use.update(key[1] for key, lock in self.host_locks.items() if key[0] == host_url and lock.locked())
+
+        for cont in containers:
+            # probes of removed targets, of an older run or replaced ones
+            if cont.name not in in_use:
+                logging.info(f"removing unused probe container {cont.name}")
+                try:
+                    cont.remove(force=True)
+                except docker.errors.DockerException as error:
+                    logging.warning(f"failed to remove probe {cont.name}: {error}")
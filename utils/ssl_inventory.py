@@ -0,0 +1,128 @@
+import asyncio
+import datetime
+import logging
+import os
+import ssl
+import threading
+
+import OpenSSL
+
+from utils.async_tools import close_writer
+
+
+# certificates of the HTTPS endpoints, one per host and port; a certificate is fetched again only
+# when it may have been replaced: once a day, and on every check once it is in the warning window
+class SslInventory:
+    DEFAULT_CONCURRENCY = 32
+    DEFAULT_TIMEOUT = 10  # seconds
+    MAX_AGE = datetime.timedelta(days=1)
+
+    def __init__(self, warn_days: int, concurrency: int = None, timeout: float = None):
+        self.warn_window = datetime.timedelta(days=warn_days)
+        self.concurrency = concurrency if concurrency else \
+            int(os.getenv("SSL_CHECK_CONCURRENCY", str(SslInventory.DEFAULT_CONCURRENCY)))
+        self.timeout = timeout if timeout else \
+            float(os.getenv("SSL_CHECK_TIMEOUT", str(SslInventory.DEFAULT_TIMEOUT)))
+        self.lock = threading.Lock()
+        self.entries = {}  # (host, port) -> entry
+
+    def refresh(self, targets):
+        # targets: iterable of (host, port); fetches the stale ones concurrently
+        now = datetime.datetime.now(datetime.timezone.utc)
+        with self.lock:
+            stale = [target for target in dict.fromkeys(targets)
+                     if self._is_stale(self.entries.get(target, None), now)]
+        if not stale:
+            return
+        results = asyncio.run(self._fetch_all(stale))
+        with self.lock:
+            self.entries.update(results)
+
+    def get(self, host, port):
+        with self.lock:
+            return self.entries.get((host, port), None)
+
+    def get_inventory(self):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        with self.lock:
+            entries = list(self.entries.values())
+        return [{
+            'host': entry['host'],
+            'port': entry['port'],
+            'subject': entry['subject'],
+            'issuer': entry['issuer'],
+            'not_after': entry['not_after'].isoformat() if entry['not_after'] else None,
+            'days_left': (entry['not_after'] - now).days if entry['not_after'] else None,
+            'fetched_at': entry['fetched_at'].isoformat(),
+            'error': entry['error']
+        } for entry in sorted(entries, key=lambda x: (x['host'], x['port']))]
+
+    def _is_stale(self, entry, now):
+        if entry is None or entry['error'] is not None:
+            return True
+        if now - entry['fetched_at'] >= SslInventory.MAX_AGE:
+            return True
+        return entry['not_after'] - now < self.warn_window
+
+    async def _fetch_all(self, targets):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*[self._fetch_one(semaphore, host, port) for host, port in targets],
+                                       return_exceptions=True)
+        ret = {}
+        for (host, port), result in zip(targets, results):
+            if isinstance(result, Exception):
+                # one failing target must not abort the refresh of the others
+                logging.error(f"failed to fetch the certificate of {host}:{port}: {result}")
+                entry = SslInventory._new_entry(host, port)
+                entry['error'] = str(result)
+                result = entry
+            ret[(host, port)] = result
+        return ret
+
+    async def _fetch_one(self, semaphore, host, port):
+        entry = SslInventory._new_entry(host, port)
+        # the certificate is only read, not verified: an expired or self-signed one is reported too
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        async with semaphore:
+            try:
+                _, writer = await asyncio.wait_for(
+                    asyncio.open_connection(host, port, ssl=context, server_hostname=host), self.timeout)
+                try:
+                    der = writer.get_extra_info('ssl_object').getpeercert(binary_form=True)
+                finally:
+                    await close_writer(writer)
+            except asyncio.TimeoutError:
+                entry['error'] = f"timeout after {self.timeout} s"
+                return entry
+            except (OSError, ssl.SSLError) as err:
+                entry['error'] = str(err)
+                return entry
+
+        if not der:
+            entry['error'] = "no certificate presented"
+            return entry
+        try:
+            x509_cert = OpenSSL.crypto.load_certificate(OpenSSL.crypto.FILETYPE_ASN1, der)
+            not_after_str = x509_cert.get_notAfter().decode("utf-8")
+            entry['not_after'] = datetime.datetime.strptime(not_after_str, '%Y%m%d%H%M%S%z')
+            # a certificate without a common name (e.g. only subject alternative names) has None here
+            entry['subject'] = x509_cert.get_subject().commonName
+            entry['issuer'] = x509_cert.get_issuer().commonName
+        except (OpenSSL.crypto.Error, ValueError, AttributeError) as err:
+            entry['not_after'] = None
+            entry['error'] = f"invalid certificate: {err}"
+        return entry
+
+    @staticmethod
+    def _new_entry(host, port):
+        return {
+            'host': host,
+            'port': port,
+            'subject': None,
+            'issuer': None,
+            'not_after': None,
+            'fetched_at': datetime.datetime.now(datetime.timezone.utc),
+            'error': None
+        }
@@ -0,0 +1,103 @@
+import logging
+import os
+import threading
+from typing import Optional
+
+import docker
+import docker.errors
+import requests
+
+
+class ContainerStatsCollector:
+    # one-shot: the daemon returns a single sample immediately; CPU usage is computed
+    # against our own previous sample instead of letting the daemon wait for a second one
+    MODE_ONE_SHOT = 'oneshot'
+    # stream: a background reader per container drains the stats stream of the daemon
+    # and keeps the latest sample, which is then read without any API call
+    MODE_STREAM = 'stream'
+
+    def __init__(self, mode: str = None):
+        self.mode = mode if mode else os.getenv('CONTAINER_STATS_MODE', ContainerStatsCollector.MODE_ONE_SHOT)
+        if self.mode not in (ContainerStatsCollector.MODE_ONE_SHOT, ContainerStatsCollector.MODE_STREAM):
+            raise ValueError(f"unknown container stats mode {self.mode}")
+        self.lock = threading.Lock()
+        self.stop_flag = False
+        self.prev_samples = {}  # container id -> previous one-shot sample
+        self.latest_samples = {}  # container id -> latest streamed sample
+        self.readers = {}  # container id -> reader thread
+        self.one_shot_supported = True
+
+    def get_stats(self, cont) -> Optional[dict]:
+        # returns a stats sample whose precpu_stats can be used to compute CPU usage
+        # (precpu_stats is empty if there is no previous sample yet)
+        if cont.status != 'running':
+            return None
+
+        if self.mode == ContainerStatsCollector.MODE_STREAM:
+            self._ensure_reader(cont)
+            with self.lock:
+                sample = self.latest_samples.get(cont.id, None)
+            if sample is not None:
+                return sample
+            # the reader has not delivered anything yet
+
+        return self._get_one_shot(cont)
+
+    def retain(self, container_ids):
+        # forgets containers which are not monitored anymore (removed, recreated with a new id)
+        with self.lock:
+            for cont_id in list(self.prev_samples):
+                if cont_id not in container_ids:
+                    del self.prev_samples[cont_id]
+            for cont_id in list(self.latest_samples):
+                if cont_id not in container_ids:
+                    del self.latest_samples[cont_id]
+            for cont_id in list(self.readers):
+                if cont_id not in container_ids:
+                    del self.readers[cont_id]  # the reader stops once it notices it
+
+    def stop(self):
+        self.stop_flag = True
+
+    def _get_one_shot(self, cont):
+        sample = None
+        if self.one_shot_supported:
+            try:
+                sample = cont.client.api.stats(cont.id, stream=False, one_shot=True)
+            except docker.errors.InvalidVersion:
+                logging.warning("docker API does not support one-shot stats; falling back to blocking stats")
+                self.one_shot_supported = False
+        if sample is None:
+            return cont.stats(stream=False)
+
+        with self.lock:
+            prev = self.prev_samples.get(cont.id, None)
+            self.prev_samples[cont.id] = sample
+        sample['precpu_stats'] = prev['cpu_stats'] if prev else {}
+        return sample
+
+    def _ensure_reader(self, cont):
+        with self.lock:
+            if self.stop_flag or cont.id in self.readers:
+                return
+            thread = threading.Thread(target=self._read_stream, args=(cont,),
+                                      name=f"stats-{cont.name}", daemon=True)
+            self.readers[cont.id] = thread
+        thread.start()
+
+    def _read_stream(self, cont):
+        try:
+            for sample in cont.client.api.stats(cont.id, decode=True, stream=True):
+                with self.lock:
+                    if self.stop_flag or self.readers.get(cont.id, None) is not threading.current_thread():
+                        break
+                    self.latest_samples[cont.id] = sample
+        except (docker.errors.DockerException, requests.exceptions.RequestException, OSError) as error:
+            logging.warning(f"stats stream of {cont.name} failed: {error}")
+        finally:
+            with self.lock:
+                # the stream ends when the container stops; a new reader is started on demand.
+                # A reader which has already been replaced leaves the samples of its successor alone
+                if self.readers.get(cont.id, None) is threading.current_thread():
+                    del self.readers[cont.id]
+                    self.latest_samples.pop(cont.id, None)
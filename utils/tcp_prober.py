@@ -0,0 +1,59 @@
+import asyncio
+import errno
+import os
+import time
+
+from utils.async_tools import close_writer
+
+
+# TCP connect probes run from the EaDoMo process itself, all at once
+class TcpProber:
+    STATE_OPEN = 'open'
+    STATE_REFUSED = 'refused'  # the host answered with a reset
+    STATE_TIMEOUT = 'timeout'  # no answer at all, e.g. filtered by a firewall
+    STATE_CLOSED = 'closed'  # any other failure: unknown host, unreachable network, ...
+
+    DEFAULT_CONCURRENCY = 256
+    DEFAULT_TIMEOUT = 10  # seconds
+
+    def __init__(self, concurrency: int = None, timeout: float = None):
+        self.concurrency = concurrency if concurrency else \
+            int(os.getenv("TCP_PROBE_CONCURRENCY", str(TcpProber.DEFAULT_CONCURRENCY)))
+        self.timeout = timeout if timeout else \
+            float(os.getenv("TCP_PROBE_TIMEOUT", str(TcpProber.DEFAULT_TIMEOUT)))
+
+    def probe(self, targets):
+        # targets: iterable of (host, port); returns (host, port) -> result
+        targets = list(dict.fromkeys((host, int(port)) for host, port in targets))
+        if not targets:
+            return {}
+        return asyncio.run(self._probe_all(targets))
+
+    async def _probe_all(self, targets):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*[self._probe_one(semaphore, host, port) for host, port in targets])
+        return dict(zip(targets, results))
+
+    async def _probe_one(self, semaphore, host, port):
+        async with semaphore:
+            start = time.monotonic()
+            state = TcpProber.STATE_OPEN
+            error = None
+            try:
+                _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), self.timeout)
+                latency_ms = (time.monotonic() - start) * 1000.0
+                await close_writer(writer)
+            except asyncio.TimeoutError:
+                state = TcpProber.STATE_TIMEOUT
+                latency_ms = None
+            except OSError as err:
+                refused = isinstance(err, ConnectionRefusedError) or err.errno == errno.ECONNREFUSED
+                state = TcpProber.STATE_REFUSED if refused else TcpProber.STATE_CLOSED
+                error = str(err)
+                latency_ms = (time.monotonic() - start) * 1000.0 if refused else None
+
+            return {
+                'state': state,
+                'latency_ms': round(latency_ms, 2) if latency_ms is not None else None,
+                'error': error
+            }
@@ -0,0 +1,99 @@
+import datetime
+import logging
+
+import pymongo.errors
+
+
+# status history of containers / services: one measurement per entity and check cycle in a MongoDB
+# time-series collection with the entity name as metaField, so that the history of one entity is
+# read without touching the others; on MongoDB older than 5.0 a regular collection with the same
+# documents and an (entity, timestamp) index is used instead.
+# The query results keep the layout of the former whole-fleet snapshots: {timestamp, status: {entity: ...}};
+# the history older than the first measurement is still read from those snapshots.
+class StatusTimeseriesStorage:
+    META_FIELD = 'entity'
+    TIME_FIELD = 'timestamp'
+
+    def __init__(self, mongo_db, legacy_collection: str):
+        self.mongo_db = mongo_db
+        # snapshots of the whole fleet, not written anymore
+        self.legacy_collection = legacy_collection
+        self.collection = legacy_collection + '_ts'
+        self.first_timestamp = None  # of the first measurement, once there is one
+
+        if self.collection not in mongo_db.list_collection_names(filter={'name': self.collection}):
+            try:
+                mongo_db.create_collection(self.collection, timeseries={
+                    'timeField': StatusTimeseriesStorage.TIME_FIELD,
+                    'metaField': StatusTimeseriesStorage.META_FIELD,
+                    'granularity': 'seconds'
+                })
+            except pymongo.errors.CollectionInvalid:
+                pass  # created in the meantime
+            except pymongo.errors.OperationFailure as err:
+                logging.warning(f"time-series collections are not supported ({err}), "
+                                f"{self.collection} is a regular collection")
+        mongo_db[self.collection].create_index([(StatusTimeseriesStorage.META_FIELD, 1),
+                                                (StatusTimeseriesStorage.TIME_FIELD, 1)])
+
+    def store(self, statuses: dict):
+        timestamp = datetime.datetime.now(datetime.timezone.utc)
+        measurements = [{
+            StatusTimeseriesStorage.TIME_FIELD: timestamp,
+            StatusTimeseriesStorage.META_FIELD: entity,
+            'status': status
+        } for entity, status in list(statuses.items())]
+        if measurements:
+            self.mongo_db[self.collection].insert_many(measurements)
+
+    def get_last(self, entity):
+        last = self.mongo_db[self.collection].find_one({StatusTimeseriesStorage.META_FIELD: entity},
+                                                       sort=[(StatusTimeseriesStorage.TIME_FIELD, -1)])
+        if last:
+            return last.get('status', {})
+
+        last_snapshot = self.mongo_db[self.legacy_collection].find_one(
+            {f'status.{entity}': {'$exists': True}}, sort=[('timestamp', -1)])
+        if last_snapshot:
+            return last_snapshot['status'][entity]
+        return None
+
+    def get_timeseries(self, entity, field, time_from):
+        # field: path inside the status of the entity, e.g. stats.cpu_usage_percent
+        return self._get_legacy_timeseries(time_from, f'status.{entity}.{field}') + \
+            [{'timestamp': x[StatusTimeseriesStorage.TIME_FIELD], 'status': {entity: x.get('status', {})}}
+             for x in self.mongo_db[self.collection].find(
+                {StatusTimeseriesStorage.META_FIELD: entity,
+                 StatusTimeseriesStorage.TIME_FIELD: {'$gt': time_from}},
+                {'_id': 0, StatusTimeseriesStorage.TIME_FIELD: 1, f'status.{field}': 1},
+                sort=[(StatusTimeseriesStorage.TIME_FIELD, 1)])]
+
+    def get_status_timeseries(self, time_from):
+        # status of all entities, one point per measurement
+        return self._get_legacy_timeseries(time_from, 'status') + \
+            [{'timestamp': x[StatusTimeseriesStorage.TIME_FIELD],
+              'status': {x[StatusTimeseriesStorage.META_FIELD]: x.get('status', {})}}
+             for x in self.mongo_db[self.collection].find(
+                {StatusTimeseriesStorage.TIME_FIELD: {'$gt': time_from}},
+                {'_id': 0, StatusTimeseriesStorage.TIME_FIELD: 1, StatusTimeseriesStorage.META_FIELD: 1,
+                 'status.status': 1},
+                sort=[(StatusTimeseriesStorage.TIME_FIELD, 1)])]
+
+    def _get_legacy_timeseries(self, time_from, projection):
+        # snapshots between time_from and the first measurement, in the same layout
+        first_timestamp = self._get_first_timestamp()
+        if first_timestamp is not None and time_from >= first_timestamp:
+            return []
+        time_filter = {'$gt': time_from}
+        if first_timestamp is not None:
+            time_filter['$lt'] = first_timestamp
+        return list(self.mongo_db[self.legacy_collection].find({'timestamp': time_filter},
+                                                               {'_id': 0, 'timestamp': 1, projection: 1},
+                                                               sort=[('timestamp', 1)]))
+
+    def _get_first_timestamp(self):
+        if self.first_timestamp is None:
+            first = self.mongo_db[self.collection].find_one({}, sort=[(StatusTimeseriesStorage.TIME_FIELD, 1)])
+            if first:
+                self.first_timestamp = first[StatusTimeseriesStorage.TIME_FIELD]
+        return self.first_timestamp
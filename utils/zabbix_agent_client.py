@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import os
+
+from utils.async_tools import close_writer
+from utils.zabbix_protocol import ZabbixProtocolError, pack_frame, read_frame
+
+DEFAULT_ZABBIX_AGENT_PORT = 10050
+
+
+# client of Zabbix passive agents: the agent answers one key per connection, so the keys of
+# all hosts are requested over concurrent connections, limited in total and per host
+class ZabbixAgentClient:
+    DEFAULT_CONCURRENCY = 256
+    DEFAULT_PER_HOST_CONCURRENCY = 8
+    DEFAULT_TIMEOUT = 5  # seconds per key
+
+    def __init__(self, concurrency: int = None, per_host_concurrency: int = None, timeout: float = None):
+        self.concurrency = concurrency if concurrency else \
+            int(os.getenv("ZABBIX_CONCURRENCY", str(ZabbixAgentClient.DEFAULT_CONCURRENCY)))
+        self.per_host_concurrency = per_host_concurrency if per_host_concurrency else \
+            int(os.getenv("ZABBIX_PER_HOST_CONCURRENCY", str(ZabbixAgentClient.DEFAULT_PER_HOST_CONCURRENCY)))
+        self.timeout = timeout if timeout else \
+            float(os.getenv("ZABBIX_TIMEOUT", str(ZabbixAgentClient.DEFAULT_TIMEOUT)))
+
+    def get_values(self, requests_by_key: dict):
+        # requests_by_key: key -> (host, port, list of item keys);
+        # returns key -> item key -> value as a string, None if it could not be read
+        if not requests_by_key:
+            return {}
+        return asyncio.run(self._get_all(requests_by_key))
+
+    async def _get_all(self, requests_by_key):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        host_semaphores = {}
+        tasks = []
+        for host, port, item_keys in requests_by_key.values():
+            host_semaphore = host_semaphores.setdefault((host, port), asyncio.Semaphore(self.per_host_concurrency))
+            tasks.append(asyncio.gather(*[self._get_one(semaphore, host_semaphore, host, port, item_key)
+                                          for item_key in item_keys]))
+        results = await asyncio.gather(*tasks)
+        return {key: dict(zip(request[2], values))
+                for (key, request), values in zip(requests_by_key.items(), results)}
+
+    async def _get_one(self, semaphore, host_semaphore, host, port, item_key):
+        async with host_semaphore:
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(self._request(host, port, item_key), self.timeout)
+                except asyncio.TimeoutError:
+                    logging.error(f"zabbix agent at {host} did not answer {item_key} in {self.timeout} s")
+                except (OSError, asyncio.IncompleteReadError, ZabbixProtocolError) as error:
+                    logging.error(f"failed to get {item_key} from zabbix at {host}: {error}")
+                return None
+
+    @staticmethod
+    async def _request(host, port, item_key):
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            writer.write(pack_frame((item_key + "\n").encode()))
+            await writer.drain()
+            content = (await read_frame(reader)).decode('utf-8', 'replace')
+            logging.debug(f'{item_key}={content}')
+            return content
+        finally:
+            await close_writer(writer)
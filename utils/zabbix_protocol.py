@@ -0,0 +1,56 @@
+import asyncio
+import logging
+import struct
+import zlib
+
+ZBXD_MAGIC = b"ZBXD"
+FLAG_ZABBIX = 0x01
+FLAG_COMPRESSED = 0x02
+FLAG_LARGE = 0x04
+MAX_FRAME_SIZE = 128 * 1024 * 1024  # bytes, as the Zabbix server accepts
+
+
+class ZabbixProtocolError(ValueError):
+    pass
+
+
+def pack_frame(data: bytes) -> bytes:
+    # header: magic, flags, data length and reserved (uncompressed length, unused without compression)
+    return ZBXD_MAGIC + bytes([FLAG_ZABBIX]) + struct.pack("<II", len(data), 0) + data
+
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes:
+    header = await reader.readexactly(5)
+    if header[:4] != ZBXD_MAGIC:
+        raise ZabbixProtocolError(f"incorrect header {header}")
+    flags = header[4]
+    if flags & FLAG_LARGE:
+        data_len, uncompressed_len = struct.unpack("<QQ", await reader.readexactly(16))
+    else:
+        data_len, uncompressed_len = struct.unpack("<II", await reader.readexactly(8))
+    if data_len > MAX_FRAME_SIZE:
+        raise ZabbixProtocolError(f"frame of {data_len} bytes is too large")
+    data = await reader.readexactly(data_len)
+    if flags & FLAG_COMPRESSED:
+        data = zlib.decompress(data)
+        if len(data) != uncompressed_len:
+            raise ZabbixProtocolError("incorrect length of the decompressed data")
+    return data
+
+
+def parse_value(str_val):
+    # numeric value of a Zabbix item, None if it is not available or not numeric
+    if str_val is None:
+        return None
+    try:
+        return int(str_val)
+    except ValueError:
+        pass
+    try:
+        return float(str_val)
+    except ValueError:
+        pass
+    if str_val.startswith('ZBX_NOTSUPPORTED'):
+        err_text = str_val.split('\x00')[1] if '\x00' in str_val else str_val
+        logging.error(f"zabbix error: {err_text}")
+    return None
@@ -0,0 +1,139 @@
+import asyncio
+import ipaddress
+import json
+import logging
+import os
+import threading
+import time
+
+from utils.zabbix_protocol import ZabbixProtocolError, pack_frame, read_frame
+
+
+# Zabbix server side of the active agent / sender protocol: agents ask for the items to send
+# ("active checks") and push their values ("agent data", "sender data"); the latest value of
+# every item is kept per host. The protocol has no authentication: only the configured peers
+# are served, and only the values of the items requested from the configured hosts are kept
+class ZabbixReceiver:
+    DEFAULT_PORT = 10051
+    DEFAULT_BIND = "127.0.0.1"
+    DEFAULT_DELAY = 60  # seconds between two values of an item, told to the agents
+    READ_TIMEOUT = 30  # seconds
+
+    def __init__(self, port: int = DEFAULT_PORT, bind: str = None, allowed_peers: str = None,
+                 delay: int = DEFAULT_DELAY):
+        self.port = port
+        self.bind = bind if bind else os.getenv("ZABBIX_RECEIVER_BIND", ZabbixReceiver.DEFAULT_BIND)
+        # comma-separated addresses or networks, e.g. 10.0.0.0/24; any peer if empty
+        allowed_peers = allowed_peers if allowed_peers else os.getenv("ZABBIX_RECEIVER_ALLOWED_PEERS", "")
+        self.allowed_peers = [ipaddress.ip_network(x.strip(), strict=False)
+                              for x in allowed_peers.split(',') if x.strip()]
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.items = {}  # host -> item keys requested from its active agent
+        self.values = {}  # host -> item key -> (value, monotonic time of reception)
+        self.loop = None
+        self.server = None
+        self.thread = None
+
+    def set_items(self, host, item_keys):
+        with self.lock:
+            self.items[host] = list(dict.fromkeys(self.items.get(host, []) + list(item_keys)))
+
+    def get_values(self, host, item_keys, max_age=None):
+        # item key -> latest value as a string; None if not received or older than max_age seconds
+        max_age = max_age if max_age is not None else 3 * self.delay
+        now = time.monotonic()
+        with self.lock:
+            host_values = self.values.get(host, {})
+            ret = {}
+            for item_key in item_keys:
+                value, received_at = host_values.get(item_key, (None, None))
+                ret[item_key] = value if received_at is not None and now - received_at <= max_age else None
+            return ret
+
+    def is_allowed(self, peer_address: str):
+        if not self.allowed_peers:
+            return True
+        try:
+            address = ipaddress.ip_address(peer_address.split('%', 1)[0])
+        except ValueError:
+            return False
+        if address.version == 6 and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+        return any(address in network for network in self.allowed_peers)
+
+    def start(self):
+        started = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(started,), name="zabbix-receiver", daemon=True)
+        self.thread.start()
+        started.wait()
+
+    def stop(self):
+        if self.loop is not None and self.server is not None:
+            self.loop.call_soon_threadsafe(self.server.close)
+
+    def _run(self, started):
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.server = self.loop.run_until_complete(asyncio.start_server(self._handle, self.bind, self.port))
+            logging.info(f"zabbix receiver listening on {self.bind}:{self.port}")
+        except OSError as error:
+            logging.error(f"failed to start zabbix receiver on {self.bind}:{self.port}: {error}")
+            return
+        finally:
+            started.set()
+        try:
+            self.loop.run_until_complete(self.server.serve_forever())
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.loop.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = writer.get_extra_info('peername')
+        if not peer or not self.is_allowed(peer[0]):
+            logging.warning(f"zabbix receiver: connection from {peer} refused")
+            writer.close()
+            return
+        try:
+            request = json.loads(await asyncio.wait_for(read_frame(reader), ZabbixReceiver.READ_TIMEOUT))
+            response = self._process(request)
+            writer.write(pack_frame(json.dumps(response).encode()))
+            await writer.drain()
+        except asyncio.TimeoutError:
+            logging.warning(f"zabbix receiver: no request from {peer}")
+        except (OSError, asyncio.IncompleteReadError, ZabbixProtocolError, ValueError, AttributeError) as error:
+            logging.warning(f"zabbix receiver: invalid request from {peer}: {error}")
+        finally:
+            writer.close()
+
+    def _process(self, request: dict):
+        request_type = request.get('request', None)
+        if request_type == 'active checks':
+            with self.lock:
+                item_keys = self.items.get(request.get('host', None), [])
+            return {
+                'response': 'success',
+                'data': [{'key': item_key, 'delay': self.delay, 'lastlogsize': 0, 'mtime': 0}
+                         for item_key in item_keys]
+            }
+        if request_type in ('agent data', 'sender data'):
+            start = time.monotonic()
+            processed = 0
+            failed = 0
+            with self.lock:
+                for item in request.get('data', []):
+                    host = item.get('host', None)
+                    item_key = item.get('key', None)
+                    if item_key not in self.items.get(host, []) or 'value' not in item:
+                        # not asked for: unknown host, item of no check, malformed item
+                        failed += 1
+                        continue
+                    self.values.setdefault(host, {})[item_key] = (str(item['value']), time.monotonic())
+                    processed += 1
+            return {
+                'response': 'success',
+                'info': f"processed: {processed}; failed: {failed}; total: {processed + failed}; "
+                        f"seconds spent: {time.monotonic() - start:.6f}"
+            }
+        return {'response': 'failed', 'info': f"unsupported request {request_type}"}
@@ -0,0 +1,47 @@
+import argparse
+import json
+import socket
+import struct
+import time
+
+from utils.zabbix_protocol import ZBXD_MAGIC, pack_frame
+
+# minimal zabbix_sender: pushes item values to a Zabbix server or to the EaDoMo receiver, e.g.
+#   python -m utils.zabbix_sender -z localhost -s myhost system.uptime=1234 vm.memory.size=8000000000
+
+
+def send_values(server, port, host, values: dict, timeout=10):
+    now = time.time()
+    request = {
+        'request': 'sender data',
+        'data': [{'host': host, 'key': key, 'value': str(value), 'clock': int(now), 'ns': int(now % 1 * 1e9)}
+                 for key, value in values.items()]
+    }
+    with socket.create_connection((server, port), timeout) as sock:
+        sock.sendall(pack_frame(json.dumps(request).encode()))
+        data = b''
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    if data[:4] != ZBXD_MAGIC or len(data) < 13:
+        raise ValueError(f"incorrect response {data[:13]}")
+    data_len = struct.unpack("<I", data[5:9])[0]
+    return json.loads(data[13:13 + data_len])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="send item values using the Zabbix sender protocol")
+    parser.add_argument("-z", "--zabbix-server", required=True)
+    parser.add_argument("-p", "--port", type=int, default=10051)
+    parser.add_argument("-s", "--host", required=True, help="host name as configured in Zabbix (or EaDoMo)")
+    parser.add_argument("values", nargs="+", help="key=value")
+    args = parser.parse_args()
+
+    values = dict(x.split("=", 1) for x in args.values)
+    print(send_values(args.zabbix_server, args.port, args.host, values))
+
+
+if __name__ == "__main__":
+    main()